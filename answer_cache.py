@@ -0,0 +1,118 @@
+"""
+Normalized-question answer cache for the OrbitX chatbot
+
+Many chat turns are the same FAQ-style question worded slightly
+differently ("how much is a logo?", "How much is a logo"). Answers are
+cached under a normalized form of the message, a coarse fingerprint of
+the conversation context and a hash of the bot's previous reply, so
+repeats skip the OpenAI round trip while a follow-up like "tell me more"
+is only reused after the same reply it follows up on.
+
+Messages carrying personal data, quote confirmations and long free-form
+descriptions are never cached, and an answer that mentions the user's
+name, email or phone is never stored.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Filler words dropped when normalizing a question
+FILLER_WORDS = {'please', 'the', 'a', 'an', 'pls', 'plz', 'kindly'}
+
+NON_WORD = re.compile(r"[^a-z0-9\s]+")
+WHITESPACE = re.compile(r'\s+')
+DIGIT = re.compile(r'\d')
+
+
+class AnswerCache:
+    """LRU/TTL cache of bot answers keyed on normalized questions"""
+
+    def __init__(self, max_size: int = 500, ttl: int = 3600, max_words: int = 15):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_words = max_words
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'skipped': 0}
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Lowercase, strip punctuation and filler words, collapse whitespace"""
+        text = NON_WORD.sub(' ', message.lower())
+        return ' '.join(word for word in WHITESPACE.split(text) if word and word not in FILLER_WORDS)
+
+    def key_for(self, message: str, analysis: Dict, context: Dict, previous_reply: str = None) -> Optional[str]:
+        """Build the cache key for a turn, or None if the turn must not be cached
+
+        ``previous_reply`` is the bot's last message in the conversation,
+        None for an opening question.
+        """
+        if (analysis['email'] or analysis['phone'] or analysis['name']
+                or analysis['confirms_quote'] or '@' in message or DIGIT.search(message)):
+            self._count('skipped')
+            return None
+
+        normalized = self.normalize(message)
+        if not normalized or len(normalized.split()) > self.max_words:
+            self._count('skipped')
+            return None
+
+        services = ','.join(sorted(set(analysis['services']) | set(context.get('services_interested', []))))
+        has_contact = int(bool(context.get('user_name') or context.get('user_email')))
+        follows = hashlib.sha1(previous_reply.encode('utf-8')).hexdigest()[:16] if previous_reply else ''
+        return f"{normalized}|{services}|{has_contact}|{follows}"
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key: str, answer: str, context: Dict):
+        # Never store an answer that echoes the user's details back
+        answer_lower = answer.lower()
+        for field in ('user_name', 'user_email', 'user_phone'):
+            value = context.get(field)
+            if value and str(value).lower() in answer_lower:
+                self._count('skipped')
+                return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def stats(self) -> Dict:
+        """Hit-rate metrics for monitoring"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def build_answer_cache() -> AnswerCache:
+    """Build the answer cache from environment configuration"""
+    return AnswerCache(
+        max_size=int(os.environ.get('CHATBOT_ANSWER_CACHE_SIZE', 500)),
+        ttl=int(os.environ.get('CHATBOT_ANSWER_CACHE_TTL', 3600))
+    )
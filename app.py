@@ -1,7 +1,14 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, Response, stream_with_context
 from flask_pymongo import PyMongo
 from flask_mail import Mail, Message
 from models_mongodb import DatabaseModels
+from rate_limiter import build_rate_limiter, client_ip
+from quote_analyzer import QuoteAnalysisStore, get_analysis_engine
+from job_queue import build_job_worker_pool, job_workers_in_process
+from notification_outbox import build_notification_outbox
+from mail_sender import build_email_sender
+from sms_dispatcher import get_sms_dispatcher
+from notification_digest import DIGEST_JOB_TYPE, build_digest_message, build_notification_digest
 from forms import ContactForm, QuoteForm
 from pymongo import MongoClient
 import os
@@ -12,8 +19,10 @@ import urllib.parse
 import webbrowser
 import asyncio
 import openai
-from twilio.rest import Client
 import uuid
+import json
+import math
+import hmac
 
 # Load environment variables
 load_dotenv()
@@ -47,12 +56,36 @@ app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 *
 mongo = PyMongo(app)
 mail = Mail(app)
 
+# Emails are delivered in the background over a shared SMTP connection
+email_sender = build_email_sender(mail, app)
+
 # Initialize MongoDB models
 db_models = DatabaseModels(mongo.db)
 
 # Initialize OpenAI client
 openai_client = None
 
+# Connection pool and timeouts for the OpenAI HTTP client. One pooled client is
+# shared by every request in the worker so chat turns reuse a warm TLS connection.
+OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+OPENAI_MAX_KEEPALIVE = int(os.environ.get('OPENAI_MAX_KEEPALIVE', 10))
+OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 120))
+OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+OPENAI_READ_TIMEOUT = float(os.environ.get('OPENAI_READ_TIMEOUT', 30))
+
+def build_openai_http_client(**kwargs):
+    """Build a pooled, keep-alive httpx client for the OpenAI SDK"""
+    import httpx
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(OPENAI_READ_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        **kwargs
+    )
+
 def init_openai_client():
     """Initialize OpenAI client with environment cleanup"""
     global openai_client
@@ -70,8 +103,11 @@ def init_openai_client():
 
         api_key = os.getenv('OPENAI_API_KEY')
         if api_key and api_key.strip() and not api_key.startswith('REPLACE_WITH'):
-            # Initialize with absolutely minimal configuration
-            openai_client = openai.OpenAI(api_key=api_key.strip())
+            openai_client = openai.OpenAI(
+                api_key=api_key.strip(),
+                http_client=build_openai_http_client(),
+                max_retries=0  # Retries and hedging are done by the LLM guard
+            )
             print("OpenAI client initialized successfully")
             return True
         else:
@@ -86,11 +122,10 @@ def init_openai_client():
             api_key = os.getenv('OPENAI_API_KEY')
             if api_key and not api_key.startswith('REPLACE_WITH'):
                 # Force disable any proxy usage
-                import httpx
-                client = httpx.Client(proxies={})
                 openai_client = openai.OpenAI(
                     api_key=api_key.strip(),
-                    http_client=client
+                    http_client=build_openai_http_client(proxies={}),
+                    max_retries=0
                 )
                 print("OpenAI client initialized with proxy disabled")
                 return True
@@ -108,62 +143,20 @@ def init_openai_client():
 # Initialize OpenAI
 init_openai_client()
 
-# Initialize Twilio client
-twilio_client = None
-if os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN'):
-    twilio_client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
+# Shared Twilio SMS dispatcher (None when Twilio is not configured)
+sms_dispatcher = get_sms_dispatcher()
 
 # AI Analysis Functions
+# Shared with the SMS, WhatsApp and MCP integrations; quotes arriving close
+# together share one JSON-mode OpenAI call
+analysis_engine = get_analysis_engine()
+
 def analyze_quote_with_ai(quote_data):
     """Analyze quote with OpenAI for priority and value estimation"""
-    if not openai_client:
-        return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
-
-    try:
-        prompt = f"""Analyze this design quote briefly:
-        Client: {quote_data.get('client_name')}
-        Service: {quote_data.get('services_requested')}
-        Budget: {quote_data.get('budget_range', 'Not specified')}
-        Description: {quote_data.get('project_description', '')[:200]}
-
-        Provide priority (1-10) and estimated value in rupees in this format:
-        Priority: X/10
-        Value: Rs X,XXX-X,XXX"""
-
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=100
-        )
+    return analysis_engine.analyze_sync(quote_data)
 
-        result = response.choices[0].message.content
-
-        # Extract priority and value
-        priority = 5
-        value = "Rs 5,000-15,000"
-
-        lines = result.split('\n')
-        for line in lines:
-            if 'Priority:' in line or 'priority:' in line.lower():
-                try:
-                    priority = int(line.split(':')[1].split('/')[0].strip())
-                except:
-                    pass
-            if 'Value:' in line or 'value:' in line.lower():
-                try:
-                    value = line.split(':')[1].strip()
-                except:
-                    pass
-
-        return {
-            "priority": priority,
-            "estimated_value": value,
-            "strategy": "AI-analyzed response"
-        }
-
-    except Exception as e:
-        app.logger.error(f"AI analysis error: {e}")
-        return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
+# Analyses are stored on the quote request and reused for identical submissions
+quote_analyses = QuoteAnalysisStore(db_models.quote_requests, analyze_quote_with_ai)
 
 async def generate_ai_enhanced_whatsapp_message(quote_data, analysis):
     """Generate enhanced WhatsApp message with AI insights"""
@@ -195,7 +188,7 @@ async def generate_ai_enhanced_whatsapp_message(quote_data, analysis):
 
 def send_sms_notification(quote_data, analysis):
     """Send SMS notification via Twilio"""
-    if not twilio_client:
+    if not sms_dispatcher:
         app.logger.warning("Twilio not configured - SMS notification skipped")
         return False
 
@@ -218,20 +211,32 @@ Description: {quote_data.get('project_description', '')[:100]}...
 
 Action: Send quote to {quote_data.get('email')}"""
 
-        # Send SMS
-        sms = twilio_client.messages.create(
-            body=message,
-            from_=os.getenv('TWILIO_PHONE_NUMBER'),
-            to=os.getenv('TARGET_PHONE_NUMBER')
-        )
-
-        app.logger.info(f"SMS sent successfully - SID: {sms.sid}, Status: {sms.status}")
-        return True
+        return send_sms_message(message, quote_ids=[quote_data['id']] if quote_data.get('id') else None)
 
     except Exception as e:
         app.logger.error(f"Failed to send SMS: {e}")
         return False
 
+def send_sms_message(message: str, quote_ids: list = None) -> bool:
+    """Send an SMS to the team number, recording the outcome on the given quotes"""
+    if not sms_dispatcher:
+        app.logger.warning("Twilio not configured - SMS notification skipped")
+        return False
+
+    result = sms_dispatcher.send(message)
+    if quote_ids:
+        try:
+            db_models.quote_requests.record_notification(quote_ids, 'sms', result)
+        except Exception as e:
+            app.logger.error(f"Failed to record SMS outcome: {e}")
+
+    if result['success']:
+        app.logger.info(f"SMS sent successfully - SID: {result['message_sid']}, Status: {result['status']}")
+        return True
+
+    app.logger.error(f"Failed to send SMS: {result['error']}")
+    return False
+
 # Routes
 @app.route('/')
 def index():
@@ -331,9 +336,9 @@ Message:
 Reply to this inquiry as soon as possible.
                         """
                     )
-                    mail.send(msg)
+                    email_sender.send(msg)
                 except Exception as e:
-                    app.logger.error(f"Failed to send email: {e}")
+                    app.logger.error(f"Failed to queue email: {e}")
 
             flash('Thank you for your message! We\'ll get back to you within 24 hours.', 'success')
             return redirect(url_for('contact'))
@@ -352,7 +357,7 @@ def quote():
     if request.method == 'POST':
         try:
             # Create quote request from raw form data
-            quote_request_id = db_models.quote_requests.create_quote_request(
+            quote_request = db_models.quote_requests.insert_quote_request(
                 client_name=request.form.get('client_name'),
                 email=request.form.get('email'),
                 phone=request.form.get('phone'),
@@ -362,60 +367,11 @@ def quote():
                 budget_range=request.form.get('budget_range'),
                 timeline=request.form.get('timeline'),
                 additional_requirements=request.form.get('additional_requirements'),
-                status='pending'
+                status='pending',
+                # AI-enhanced WhatsApp notification, relayed to the job workers
+                notification='quote_whatsapp'
             )
 
-            # Get the created quote request for further processing
-            quote_request = db_models.quote_requests.get_by_id(quote_request_id)
-
-            # Send AI-enhanced WhatsApp notification
-            try:
-                # Prepare quote data for AI analysis
-                quote_data = {
-                    'client_name': quote_request.get('client_name'),
-                    'email': quote_request.get('email'),
-                    'phone': quote_request.get('phone'),
-                    'company_name': quote_request.get('company_name'),
-                    'services_requested': quote_request.get('services_requested'),
-                    'project_description': quote_request.get('project_description'),
-                    'budget_range': quote_request.get('budget_range'),
-                    'timeline': quote_request.get('timeline'),
-                    'additional_requirements': quote_request.get('additional_requirements')
-                }
-
-                # Run AI analysis and generate enhanced message
-                def run_ai_analysis():
-                    try:
-                        # Analyze quote with AI
-                        analysis = analyze_quote_with_ai(quote_data)
-
-                        # Generate AI-enhanced message
-                        ai_message = asyncio.run(generate_ai_enhanced_whatsapp_message(quote_data, analysis))
-
-                        # URL encode the message for WhatsApp
-                        encoded_message = urllib.parse.quote(ai_message)
-                        whatsapp_url = f"https://wa.me/{os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')}?text={encoded_message}"
-
-                        # Open WhatsApp Web
-                        webbrowser.open(whatsapp_url)
-
-                        app.logger.info(f"AI-enhanced WhatsApp URL opened for {quote_request.get('client_name')} - Priority: {analysis['priority']}/10")
-
-                    except Exception as e:
-                        app.logger.error(f"AI analysis failed: {e}")
-                        # Fallback to basic message
-                        basic_message = f"NEW QUOTE REQUEST - OrbitX\nClient: {quote_request.get('client_name')}\nEmail: {quote_request.get('email')}\nService: {quote_request.get('services_requested')}"
-                        encoded_message = urllib.parse.quote(basic_message)
-                        whatsapp_url = f"https://wa.me/{os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')}?text={encoded_message}"
-                        webbrowser.open(whatsapp_url)
-
-                # Run AI analysis in background thread
-                from threading import Thread
-                Thread(target=run_ai_analysis, daemon=True).start()
-
-            except Exception as e:
-                app.logger.error(f"Failed to process AI-enhanced WhatsApp: {e}")
-
             flash('Thank you! We\'ve received your quote request. Our team will contact you within 2 hours via WhatsApp/Email with a detailed proposal.', 'success')
             return redirect(url_for('quote'))
 
@@ -440,7 +396,7 @@ def simple_quote_submission():
         else:
             data = request.form
 
-        quote_request_id = db_models.quote_requests.create_quote_request(
+        quote_request = db_models.quote_requests.insert_quote_request(
             client_name=data.get('client_name'),
             email=data.get('email'),
             phone=data.get('phone'),
@@ -450,57 +406,15 @@ def simple_quote_submission():
             budget_range=data.get('budget_range'),
             timeline=data.get('timeline'),
             additional_requirements=data.get('additional_requirements'),
-            status='pending'
+            status='pending',
+            # AI-enhanced SMS notification, relayed to the job workers
+            notification='quote_sms'
         )
 
-        # Get the created quote request
-        quote_request = db_models.quote_requests.get_by_id(quote_request_id)
-
-        # Process with AI-enhanced messaging
-        quote_data = {
-            'client_name': quote_request.get('client_name'),
-            'email': quote_request.get('email'),
-            'phone': quote_request.get('phone'),
-            'company_name': quote_request.get('company_name'),
-            'services_requested': quote_request.get('services_requested'),
-            'project_description': quote_request.get('project_description'),
-            'budget_range': quote_request.get('budget_range'),
-            'timeline': quote_request.get('timeline'),
-            'additional_requirements': quote_request.get('additional_requirements')
-        }
-
-        # Background AI processing with SMS
-        def process_quote():
-            try:
-                # AI analysis
-                analysis = analyze_quote_with_ai(quote_data)
-
-                # Send SMS notification
-                sms_sent = send_sms_notification(quote_data, analysis)
-
-                if sms_sent:
-                    app.logger.info(f"SMS quote notification sent for {quote_request.get('client_name')} - Priority: {analysis['priority']}/10")
-                else:
-                    app.logger.warning(f"SMS failed for {quote_request.get('client_name')} - using fallback")
-                    # Fallback to WhatsApp if SMS fails
-                    ai_message = asyncio.run(generate_ai_enhanced_whatsapp_message(quote_data, analysis))
-                    import urllib.parse
-                    encoded_message = urllib.parse.quote(ai_message)
-                    whatsapp_url = f"https://wa.me/{os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')}?text={encoded_message}"
-                    import webbrowser
-                    webbrowser.open(whatsapp_url)
-                    app.logger.info(f"WhatsApp fallback used for {quote_request.get('client_name')}")
-
-            except Exception as e:
-                app.logger.error(f"Quote processing failed: {e}")
-
-        from threading import Thread
-        Thread(target=process_quote, daemon=True).start()
-
         return jsonify({
             "success": True,
             "message": "Quote submitted successfully",
-            "quote_id": quote_request_id
+            "quote_id": quote_request['id']
         })
 
     except Exception as e:
@@ -510,6 +424,124 @@ def simple_quote_submission():
             "error": str(e)
         }), 500
 
+def quote_notification_data(quote_id: str) -> dict:
+    """Load a quote request for a notification job, or None if it was already notified
+
+    The bulk backlog tool (process_quote_backlog.py) may have notified the
+    team about the quote since the job was queued.
+    """
+    quote_request = db_models.quote_requests.get_by_id(quote_id)
+    if quote_request is None:
+        raise LookupError(f"Quote request {quote_id} not found")
+    if quote_request.get('status') != 'pending':
+        app.logger.info(f"Quote {quote_id} is already {quote_request.get('status')}, skipping notification")
+        return None
+    return quote_request
+
+def open_whatsapp_message(message: str, quote_ids: list):
+    """Open WhatsApp Web with a message for the team number, recording it on the quotes"""
+    encoded_message = urllib.parse.quote(message)
+    whatsapp_url = f"https://wa.me/{os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')}?text={encoded_message}"
+    webbrowser.open(whatsapp_url)
+    db_models.quote_requests.record_notification(quote_ids, 'whatsapp', {'success': True})
+
+def process_quote_whatsapp_job(payload: dict):
+    """Job handler: open the AI-enhanced WhatsApp message for a website quote"""
+    quote_request = quote_notification_data(payload['quote_id'])
+    if quote_request is None:
+        return
+    try:
+        # Stored AI analysis, analyzing the quote on first use
+        analysis = quote_analyses.get(quote_request)
+
+        # Lower-priority quotes wait for the next digest
+        if quote_digest.defer(quote_request['id'], analysis['priority']):
+            return
+
+        # Generate AI-enhanced message
+        ai_message = asyncio.run(generate_ai_enhanced_whatsapp_message(quote_request, analysis))
+    except Exception as e:
+        app.logger.error(f"AI analysis failed: {e}")
+        # Fallback to basic message
+        ai_message = f"NEW QUOTE REQUEST - OrbitX\nClient: {quote_request.get('client_name')}\nEmail: {quote_request.get('email')}\nService: {quote_request.get('services_requested')}"
+
+    # Open WhatsApp Web
+    open_whatsapp_message(ai_message, [quote_request['id']])
+    app.logger.info(f"WhatsApp URL opened for quote {payload['quote_id']} from {quote_request.get('client_name')}")
+
+def process_quote_sms_job(payload: dict):
+    """Job handler: SMS notification for a simple quote, with WhatsApp as the fallback"""
+    quote_request = quote_notification_data(payload['quote_id'])
+    if quote_request is None:
+        return
+
+    # Stored AI analysis, analyzing the quote on first use
+    analysis = quote_analyses.get(quote_request)
+
+    # Lower-priority quotes wait for the next digest
+    if quote_digest.defer(quote_request['id'], analysis['priority']):
+        return
+
+    # Send SMS notification
+    if send_sms_notification(quote_request, analysis):
+        app.logger.info(f"SMS quote notification sent for {quote_request.get('client_name')} - Priority: {analysis['priority']}/10")
+        return
+
+    app.logger.warning(f"SMS failed for {quote_request.get('client_name')} - using fallback")
+    # Fallback to WhatsApp if SMS fails
+    open_whatsapp_message(asyncio.run(generate_ai_enhanced_whatsapp_message(quote_request, analysis)), [quote_request['id']])
+    app.logger.info(f"WhatsApp fallback used for {quote_request.get('client_name')}")
+
+def process_chatbot_quote_job(payload: dict):
+    """Job handler: notification for a quote created by the chatbot
+
+    WhatsApp Web can only be opened on a desktop, so in production the
+    team gets an SMS; a failed SMS raises so the job is retried.
+    """
+    quote_request = quote_notification_data(payload['quote_id'])
+    if quote_request is None:
+        return
+    if quote_digest.defer(quote_request['id'], payload.get('priority', 5)):
+        return
+
+    from chatbot import chatbot_quote_message
+    message = chatbot_quote_message(quote_request, payload.get('priority', 5))
+    if os.getenv('FLASK_ENV') == 'production':
+        if not send_sms_message(message, quote_ids=[quote_request['id']]):
+            raise RuntimeError(f"SMS notification for chatbot quote {quote_request['id']} failed")
+        return
+
+    open_whatsapp_message(message, [quote_request['id']])
+    app.logger.info(f"📱 WhatsApp notification sent for chatbot quote {quote_request['id']}")
+
+def process_quote_digest_job(payload: dict):
+    """Job handler: one SMS (or WhatsApp) message listing the quotes held for the digest"""
+    quotes = quote_digest.claim(payload['digest_id'])
+    if not quotes:
+        return
+
+    message = build_digest_message(quotes)
+    if send_sms_message(message, quote_ids=[quote['id'] for quote in quotes]):
+        app.logger.info(f"Quote digest sent by SMS with {len(quotes)} quotes")
+    else:
+        open_whatsapp_message(message, [quote['id'] for quote in quotes])
+        app.logger.info(f"Quote digest opened in WhatsApp with {len(quotes)} quotes")
+    quote_digest.finish(payload['digest_id'])
+
+# Quotes below the immediate priority are notified in periodic digests
+quote_digest = build_notification_digest(db_models.quote_requests, db_models.jobs)
+
+# Quote notifications are durable jobs processed by a bounded worker pool
+job_workers = build_job_worker_pool(db_models.jobs, {
+    'quote_whatsapp': process_quote_whatsapp_job,
+    'quote_sms': process_quote_sms_job,
+    'chatbot_quote_notification': process_chatbot_quote_job,
+    DIGEST_JOB_TYPE: process_quote_digest_job
+}, app=app)
+
+# Quote notifications are written with the quote and relayed to the job queue
+notification_outbox = build_notification_outbox(db_models.quote_requests, db_models.jobs)
+
 @app.route('/admin/whatsapp/<string:quote_id>')
 def admin_whatsapp_quote(quote_id):
     """Admin route to open WhatsApp with quote details"""
@@ -534,7 +566,19 @@ def admin_whatsapp_quote(quote_id):
 
 📋 Additional Requirements:
 {quote_request.get('additional_requirements') or 'None specified'}
+"""
 
+    # Include the stored AI analysis; the admin view never calls the model
+    analysis = quote_request.get('ai_analysis')
+    if analysis:
+        whatsapp_message += f"""
+🤖 AI Analysis:
+• Priority: {analysis.get('priority')}/10
+• Est. Value: {analysis.get('estimated_value')}
+• Strategy: {analysis.get('strategy')}
+"""
+
+    whatsapp_message += f"""
 ⚡ Action Required: Prepare and send detailed quote to {quote_request.get('email')}"""
 
     # URL encode the message for WhatsApp
@@ -589,6 +633,24 @@ def internal_error(error):
     app.logger.error(f"Internal server error: {error}")
     return render_template('errors/500.html'), 500
 
+# Per-conversation and per-IP token buckets for chat turns
+chat_rate_limiter = build_rate_limiter()
+
+def chat_rate_limit_response(conversation_id):
+    """Return a 429 response if this chat turn is over its rate limit, else None"""
+    retry_after = chat_rate_limiter.check(conversation=conversation_id, ip=client_ip(request))
+    if not retry_after:
+        return None
+
+    response = jsonify({
+        'success': False,
+        'error': 'Too many messages',
+        'bot_response': "You're sending messages a little too quickly. Please wait a moment and try again."
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
 # Chatbot API endpoints
 @app.route('/api/chatbot/message', methods=['POST'])
 def chatbot_message():
@@ -605,6 +667,10 @@ def chatbot_message():
         if not user_message:
             return jsonify({'success': False, 'error': 'Message is required'}), 400
 
+        limited = chat_rate_limit_response(data.get('conversation_id'))
+        if limited:
+            return limited
+
         # Import chatbot here to avoid circular imports
         from chatbot import get_chatbot
         chatbot = get_chatbot()
@@ -622,25 +688,124 @@ def chatbot_message():
             'bot_response': "I apologize, but I'm experiencing technical difficulties. Please try again or contact us directly."
         }), 500
 
+@app.route('/api/chatbot/message/stream', methods=['POST'])
+def chatbot_message_stream():
+    """Handle chatbot messages, streaming the reply as Server-Sent Events"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'error': 'No data provided'}), 400
+
+    user_message = data.get('message', '').strip()
+    conversation_id = data.get('conversation_id') or str(uuid.uuid4())
+    user_info = data.get('user_info', {})
+
+    if not user_message:
+        return jsonify({'success': False, 'error': 'Message is required'}), 400
+
+    limited = chat_rate_limit_response(data.get('conversation_id'))
+    if limited:
+        return limited
+
+    try:
+        from chatbot import get_chatbot
+        chatbot = get_chatbot()
+    except Exception as e:
+        app.logger.error(f"Chatbot API error: {e}")
+        return jsonify({
+            'success': False,
+            'error': 'Internal server error',
+            'bot_response': "I apologize, but I'm experiencing technical difficulties. Please try again or contact us directly."
+        }), 500
+
+    def generate():
+        for event in chatbot.process_message_stream(conversation_id, user_message, user_info):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/chatbot/history/<conversation_id>')
 def chatbot_history(conversation_id):
-    """Get conversation history"""
+    """Get conversation history, or only new messages with ?since=<message_id>
+
+    The ETag is the id of the newest message, so a client that is already
+    up to date gets a 304 without the history being read.
+    """
     try:
         from chatbot import get_chatbot
         chatbot = get_chatbot()
 
-        history = chatbot.get_conversation_history(conversation_id)
+        latest_id = db_models.chat_messages.get_latest_id(conversation_id)
+        if latest_id and request.if_none_match.contains(latest_id):
+            response = Response(status=304)
+            response.set_etag(latest_id)
+            return response
 
-        return jsonify({
+        since = request.args.get('since')
+        history = chatbot.get_conversation_history(conversation_id, since=since)
+
+        # Messages may have landed since latest_id was read; the cursor follows what was sent
+        messages = history['messages']
+        last_message_id = messages[-1]['id'] if messages else (None if history['full'] else since)
+
+        response = jsonify({
             'success': True,
             'conversation_id': conversation_id,
-            'messages': history
+            'full': history['full'],
+            'last_message_id': last_message_id,
+            'messages': messages
         })
+        if last_message_id:
+            response.set_etag(last_message_id)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
 
     except Exception as e:
         app.logger.error(f"Chatbot history error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def stats_request_authorized() -> bool:
+    """Whether the request carries STATS_API_TOKEN as a bearer token"""
+    token = os.environ.get('STATS_API_TOKEN')
+    if not token:
+        return False
+    supplied = request.headers.get('Authorization', '')
+    return supplied.startswith('Bearer ') and hmac.compare_digest(supplied[len('Bearer '):], token)
+
+@app.route('/api/chatbot/stats')
+def chatbot_stats():
+    """Get chatbot answer cache, admission control, OpenAI call, job queue, email, SMS and quote analysis metrics
+
+    Internal figures, so only served with ``Authorization: Bearer <STATS_API_TOKEN>``;
+    without STATS_API_TOKEN set the endpoint is disabled.
+    """
+    if not stats_request_authorized():
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+
+    try:
+        from chatbot import get_chatbot
+        chatbot = get_chatbot()
+
+        return jsonify({
+            'success': True,
+            'answer_cache': chatbot.answer_cache.stats(),
+            'rate_limit': chat_rate_limiter.stats(),
+            'llm_admission': chatbot.llm_admission.stats(),
+            'llm': chatbot.llm_guard.stats(),
+            'jobs': {**job_workers.stats(), 'queue': db_models.jobs.status_counts()},
+            'notification_outbox': notification_outbox.stats(),
+            'email': email_sender.stats(),
+            'sms': sms_dispatcher.stats() if sms_dispatcher else None,
+            'quote_analysis': analysis_engine.stats()
+        })
+
+    except Exception as e:
+        app.logger.error(f"Chatbot stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/chatbot/services')
 def chatbot_services():
     """Get available services for chatbot"""
@@ -755,9 +920,27 @@ try:
 except Exception as e:
     print(f"Database initialization error: {e}")
 
+def start_background_workers():
+    """Relay and run queued jobs in this process unless a separate worker.py handles them
+
+    Called by gunicorn's post_worker_init hook and by the development
+    server, never on import, so tests and scripts that import the app
+    don't start threads.
+    """
+    if job_workers_in_process():
+        notification_outbox.start()
+        job_workers.start()
+
+def is_reloader_parent() -> bool:
+    """Whether this is the debug reloader's file-watching parent, which serves no requests"""
+    return os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+
 if __name__ == '__main__':
     # Run app based on environment
     if os.environ.get('FLASK_ENV') == 'production':
+        start_background_workers()
         app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
     else:
+        if not is_reloader_parent():
+            start_background_workers()
         app.run(debug=True)
\ No newline at end of file
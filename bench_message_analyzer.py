@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled MessageAnalyzer against the original chatbot matchers
+
+The legacy functions below are the keyword loops and per-call regexes that
+OrbitXChatbot._detect_intent and _update_context used before the analyzer.
+Run with: python bench_message_analyzer.py
+"""
+
+import re
+import timeit
+
+from message_analyzer import MessageAnalyzer, QUOTE_CONFIRMATIONS, QUOTE_KEYWORDS, SERVICE_KEYWORDS
+
+SAMPLE_MESSAGES = [
+    "Hi there!",
+    "How much does a logo cost?",
+    "My name is Priya and I need a website for my bakery",
+    "You can reach me at priya.sharma@example.com or +91 9876543210",
+    "We are launching a skincare line and need product packaging, a brochure and social media posts for Instagram",
+    "yes, please go ahead and create quote",
+    "I'm Rahul, call me on 987-654-3210. Looking for a full branding package with visual identity and business cards.",
+    "What services do you offer?",
+]
+
+
+def legacy_detect_intent(message):
+    message_lower = message.lower()
+    intent = {'services': [], 'wants_quote': False, 'has_contact_info': False}
+    for service_type, keywords in SERVICE_KEYWORDS.items():
+        if any(keyword in message_lower for keyword in keywords):
+            intent['services'].append(service_type)
+    if any(keyword in message_lower for keyword in QUOTE_KEYWORDS):
+        intent['wants_quote'] = True
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    if re.search(email_pattern, message) or '@' in message:
+        intent['has_contact_info'] = True
+    return intent
+
+
+def legacy_update_context(message):
+    message_lower = message.lower()
+    context = {}
+    name_patterns = [r"my name is (\w+)", r"i'm (\w+)", r"i am (\w+)", r"call me (\w+)"]
+    for pattern in name_patterns:
+        match = re.search(pattern, message_lower)
+        if match:
+            context['user_name'] = match.group(1).title()
+            break
+    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    email_match = re.search(email_pattern, message)
+    if email_match:
+        context['user_email'] = email_match.group()
+    phone_patterns = [r'(\+91[\s\-]?\d{10})', r'(\d{10})', r'(\d{3}[\s\-]?\d{3}[\s\-]?\d{4})']
+    for pattern in phone_patterns:
+        match = re.search(pattern, message)
+        if match:
+            context['user_phone'] = match.group()
+            break
+    context['confirms_quote'] = any(phrase in message_lower for phrase in QUOTE_CONFIRMATIONS)
+    return context
+
+
+def legacy_turn(message):
+    return legacy_detect_intent(message), legacy_update_context(message)
+
+
+def check_equivalence(analyzer):
+    """Fail loudly if the analyzer disagrees with the legacy matchers"""
+    for message in SAMPLE_MESSAGES:
+        intent, context = legacy_turn(message)
+        result = analyzer.analyze(message)
+        assert result['services'] == intent['services'], message
+        assert result['wants_quote'] == intent['wants_quote'], message
+        assert result['has_contact_info'] == intent['has_contact_info'], message
+        assert result['confirms_quote'] == context['confirms_quote'], message
+        assert (result['name'] or '').title() == context.get('user_name', ''), message
+        assert result['email'] == context.get('user_email'), message
+        assert result['phone'] == context.get('user_phone'), message
+
+
+def main():
+    analyzer = MessageAnalyzer()
+    check_equivalence(analyzer)
+
+    rounds = 2000
+    legacy = timeit.timeit(lambda: [legacy_turn(m) for m in SAMPLE_MESSAGES], number=rounds)
+    compiled = timeit.timeit(lambda: [analyzer.analyze(m) for m in SAMPLE_MESSAGES], number=rounds)
+    per_message = rounds * len(SAMPLE_MESSAGES)
+
+    print(f"Legacy matchers:   {legacy / per_message * 1e6:8.2f} us/message")
+    print(f"MessageAnalyzer:   {compiled / per_message * 1e6:8.2f} us/message")
+    print(f"Speedup:           {legacy / compiled:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,29 @@
+import copy
 import json
+import os
 import uuid
 import asyncio
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from flask import current_app
 from models_mongodb import DatabaseModels
+from chatbot_state import ConversationStateStore, RECENT_MESSAGE_WINDOW
+from message_analyzer import MessageAnalyzer
+from answer_cache import build_answer_cache
+from fast_responder import FastPathResponder, ServiceCatalog
+from prompt_builder import build_prompt_builder
+from rate_limiter import build_llm_admission
+from llm_client import get_llm_guard
+from pymongo import InsertOne
 import openai
-import re
+import threading
 
 class OrbitXChatbot:
     def __init__(self, openai_client, db_models):
         self.openai_client = openai_client
         self.db_models = db_models
+        self.state_store = ConversationStateStore(db_models)
+        self.answer_cache = build_answer_cache()
         self.system_prompt = """You are OrbitX AI Assistant, a helpful and professional chatbot for OrbitX Design - a digital marketing and design agency.
 
 Your capabilities:
@@ -61,199 +73,326 @@ Response Style:
 
 Remember: Your goal is to efficiently convert conversations into quote requests while providing excellent customer service."""
 
-        # Service keywords for detection
-        self.service_keywords = {
-            'logo': ['logo', 'brand mark', 'brand identity'],
-            'website': ['website', 'web design', 'site', 'online presence'],
-            'social media': ['social media', 'instagram', 'facebook', 'social posts'],
-            'branding': ['branding', 'brand package', 'brand identity', 'visual identity'],
-            'packaging': ['packaging', 'product packaging', 'box design'],
-            'print': ['print', 'brochure', 'flyer', 'business card', 'stationery']
-        }
+        # Service, quote and contact detection compiled from the services catalog
+        self.catalog = ServiceCatalog(db_models.services)
+        try:
+            self.analyzer = MessageAnalyzer.from_catalog(self.catalog.get())
+        except Exception as e:
+            current_app.logger.error(f"Failed to load service keywords from catalog: {e}")
+            self.analyzer = MessageAnalyzer()
 
-        # Quote trigger keywords
-        self.quote_keywords = [
-            'quote', 'price', 'pricing', 'cost', 'how much', 'estimate',
-            'proposal', 'budget', 'charge', 'fee', 'rates'
-        ]
+        # Catalog and quote-workflow answers that don't need the LLM
+        self.fast_responder = FastPathResponder(self.catalog, self.analyzer)
+
+        # Token-budgeted prompt assembly
+        self.prompt_builder = build_prompt_builder(self.system_prompt)
 
-    def _detect_intent(self, message: str, context: Dict) -> Dict:
-        """Detect user intent from message"""
-        message_lower = message.lower()
+        # Cap on OpenAI calls in flight in this worker
+        self.llm_admission = build_llm_admission()
 
+        # Deadline, hedging and circuit breaker shared by every OpenAI call
+        self.llm_guard = get_llm_guard()
+        self.llm_deadline = float(os.environ.get('CHATBOT_LLM_DEADLINE', 12))
+
+        # Reply used when the OpenAI call fails
+        self.fallback_response = "I'm having some technical difficulties. Let me connect you with our team directly. Please share your contact details and project requirements."
+
+    def _detect_intent(self, analysis: Dict, context: Dict) -> Dict:
+        """Detect user intent from the analyzed message"""
         intent = {
             'type': 'general',
             'confidence': 0.5,
-            'services': [],
-            'wants_quote': False,
-            'has_contact_info': False
+            'services': list(analysis['services']),
+            'wants_quote': analysis['wants_quote'],
+            'has_contact_info': analysis['has_contact_info']
         }
 
         # Service type detection
-        for service_type, keywords in self.service_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                intent['services'].append(service_type)
-                intent['type'] = 'service_inquiry'
-                intent['confidence'] = 0.8
+        if intent['services']:
+            intent['type'] = 'service_inquiry'
+            intent['confidence'] = 0.8
 
         # Quote intent detection
-        if any(keyword in message_lower for keyword in self.quote_keywords):
-            intent['wants_quote'] = True
+        if intent['wants_quote']:
             intent['type'] = 'quote_request'
             intent['confidence'] = 0.9
 
-        # Contact info detection
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        if re.search(email_pattern, message) or '@' in message:
-            intent['has_contact_info'] = True
-
         return intent
 
     def process_message(self, conversation_id: str, user_message: str, user_info: Dict = None) -> Dict:
         """Process user message and return bot response"""
         try:
-            # Get or create conversation
-            conversation = self.db_models.chat_conversations.find_one({'_id': conversation_id})
-            if not conversation:
-                self.db_models.chat_conversations.create_conversation(
-                    conversation_id=conversation_id,
-                    user_session_id=user_info.get('session_id') if user_info else None,
-                    user_name=user_info.get('name') if user_info else None,
-                    user_email=user_info.get('email') if user_info else None,
-                    user_phone=user_info.get('phone') if user_info else None,
-                    context_data=json.dumps({})
-                )
-                # Re-fetch to get the created conversation
-                conversation = self.db_models.chat_conversations.find_one({'_id': conversation_id})
-
-            # Save user message
-            self.db_models.chat_messages.create_message(
-                conversation_id=conversation_id,
-                sender='user',
-                message=user_message,
-                message_type='text'
-            )
+            turn = self._begin_turn(conversation_id, user_message, user_info)
 
-            # Get conversation context
-            context_data = json.loads(conversation.get('context_data', '{}'))
-
-            # Get recent messages for context
-            recent_messages = self.db_models.chat_messages.get_by_conversation(conversation_id, limit=10)
+            bot_response = self._local_answer(turn)
+            if bot_response is None and not self.llm_admission.acquire():
+                current_app.logger.warning("OpenAI concurrency cap reached, answering with fallback")
+                bot_response = self.fallback_response
+            elif bot_response is None:
+                try:
+                    response = self.llm_guard.call(
+                        lambda timeout: self.openai_client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=turn['messages_for_ai'],
+                            max_tokens=300,
+                            temperature=0.7,
+                            timeout=timeout
+                        ),
+                        deadline=self.llm_deadline
+                    )
+                    bot_response = response.choices[0].message.content
+                    self._remember_answer(turn, bot_response)
+                except Exception as e:
+                    current_app.logger.error(f"OpenAI API error: {e}")
+                    bot_response = self.fallback_response
+                finally:
+                    self.llm_admission.release()
 
-            # Detect intent
-            intent = self._detect_intent(user_message, context_data)
+            return self._finish_turn(turn, bot_response)
 
-            # Update context with extracted information
-            context_data = self._update_context(user_message, context_data, intent)
+        except Exception as e:
+            current_app.logger.error(f"Chatbot error: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'bot_response': "I apologize, but I'm experiencing technical difficulties. Please try again or contact us directly."
+            }
 
-            # Generate response
-            messages_for_ai = self._prepare_messages_for_ai(recent_messages, context_data)
+    def process_message_stream(self, conversation_id: str, user_message: str, user_info: Dict = None) -> Iterator[Dict]:
+        """Process user message and yield response tokens as they are generated.
 
-            try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages_for_ai,
-                    max_tokens=300,
-                    temperature=0.7
-                )
-                bot_response = response.choices[0].message.content
-            except Exception as e:
-                current_app.logger.error(f"OpenAI API error: {e}")
-                bot_response = "I'm having some technical difficulties. Let me connect you with our team directly. Please share your contact details and project requirements."
-
-            # Handle quote creation
-            quote_request_id = None
-            if self._should_create_quote(user_message, context_data, intent):
-                try:
-                    analysis = self._analyze_user_intent(user_message, context_data)
-                    quote_request_id = self._create_quote_request(conversation, context_data, analysis)
-
-                    if quote_request_id:
-                        current_app.logger.info(f"🚀 Creating quote for: {context_data.get('user_name')} - Services: {analysis['services']}")
-
-                        # Get created quote for notifications
-                        quote_request = self.db_models.quote_requests.get_by_id(quote_request_id)
-                        if quote_request:
-                            try:
-                                self._send_quote_notifications(quote_request, analysis)
-                            except Exception as notification_error:
-                                current_app.logger.error(f"Quote notification failed: {notification_error}")
-
-                        bot_response += f"\n\n✅ Perfect! I've created quote #{quote_request_id} for your project. Our team will review your requirements and contact you via WhatsApp within 2 hours with a detailed proposal."
-
-                except Exception as quote_error:
-                    current_app.logger.error(f"Quote creation failed: {quote_error}")
-                    bot_response += "\n\n⚠️ I encountered an issue creating your quote, but don't worry! Our team has been notified and will contact you directly."
-
-            # Save bot response
-            self.db_models.chat_messages.create_message(
-                conversation_id=conversation_id,
-                sender='bot',
-                message=bot_response,
-                message_type='text',
-                message_metadata=json.dumps({
-                    'intent': intent,
-                    'quote_request_id': quote_request_id
-                }) if quote_request_id else None
-            )
+        Yields ``{'type': 'token', 'content': ...}`` events while the model is
+        generating, followed by a single ``{'type': 'done', ...}`` event carrying
+        the same payload ``process_message`` returns once the turn is persisted.
+        """
+        turn = None
+        chunks = []
+        try:
+            turn = self._begin_turn(conversation_id, user_message, user_info)
 
-            # Update conversation context
-            self.db_models.chat_conversations.update_one(
-                {'_id': conversation_id},
-                {'context_data': json.dumps(context_data)}
-            )
+            local_answer = self._local_answer(turn)
+            if local_answer is None and not self.llm_admission.acquire():
+                current_app.logger.warning("OpenAI concurrency cap reached, answering with fallback")
+                local_answer = self.fallback_response
 
-            return {
-                'success': True,
-                'bot_response': bot_response,
-                'conversation_id': conversation_id,
-                'quote_request_id': quote_request_id,
-                'intent': intent
-            }
+            if local_answer is not None:
+                chunks.append(local_answer)
+                yield {'type': 'token', 'content': local_answer}
+            else:
+                try:
+                    # A half-streamed reply cannot be hedged, so only the deadline and breaker apply
+                    stream = self.llm_guard.call(
+                        lambda timeout: self.openai_client.chat.completions.create(
+                            model="gpt-4o-mini",
+                            messages=turn['messages_for_ai'],
+                            max_tokens=300,
+                            temperature=0.7,
+                            stream=True,
+                            timeout=timeout
+                        ),
+                        deadline=self.llm_deadline,
+                        hedge=False
+                    )
+                    for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        token = chunk.choices[0].delta.content
+                        if token:
+                            chunks.append(token)
+                            yield {'type': 'token', 'content': token}
+                    self._remember_answer(turn, ''.join(chunks))
+                except Exception as e:
+                    current_app.logger.error(f"OpenAI API error: {e}")
+                    if not chunks:
+                        chunks.append(self.fallback_response)
+                        yield {'type': 'token', 'content': self.fallback_response}
+                finally:
+                    self.llm_admission.release()
+
+            result = self._finish_turn(turn, ''.join(chunks))
+            turn = None
+            yield {'type': 'done', **result}
+
+        except GeneratorExit:
+            # The client went away mid-reply: store the turn with the part it was sent
+            if turn is not None:
+                try:
+                    self._finish_turn(turn, ''.join(chunks))
+                except Exception as e:
+                    current_app.logger.error(f"Failed to save interrupted chatbot turn: {e}")
+            raise
 
         except Exception as e:
             current_app.logger.error(f"Chatbot error: {e}")
-            return {
+            yield {
+                'type': 'done',
                 'success': False,
                 'error': str(e),
                 'bot_response': "I apologize, but I'm experiencing technical difficulties. Please try again or contact us directly."
             }
 
-    def _update_context(self, message: str, context: Dict, intent: Dict) -> Dict:
-        """Update conversation context with extracted information"""
-        message_lower = message.lower()
+    def _local_answer(self, turn: Dict) -> Optional[str]:
+        """Answer from the fast path or the answer cache, or None to call the LLM"""
+        if turn['fast_response'] is not None:
+            return turn['fast_response']
+        if not turn['answer_key']:
+            return None
+        return self.answer_cache.get(turn['answer_key'])
+
+    def _remember_answer(self, turn: Dict, bot_response: str):
+        """Cache a freshly generated answer when the turn is cacheable"""
+        if turn['answer_key'] and bot_response:
+            self.answer_cache.set(turn['answer_key'], bot_response, turn['context_data'])
+
+    def _begin_turn(self, conversation_id: str, user_message: str, user_info: Dict = None) -> Dict:
+        """Record the user message and build everything needed to generate a reply"""
+        # Get or create conversation state (cached for active conversations)
+        state = self.state_store.load(conversation_id, user_info)
+
+        # Record user message (written together with the bot reply at the end of the turn)
+        self._record_message(state, 'user', user_message)
+        user_message_doc = self.db_models.chat_messages.build_message(
+            conversation_id=conversation_id,
+            sender='user',
+            message=user_message,
+            message_type='text'
+        )
+
+        # Detect intent and extract details in a single pass over the message
+        analysis = self.analyzer.analyze(user_message)
+        intent = self._detect_intent(analysis, state.context_data)
+
+        # Update context with extracted information, remembering what it was
+        context_before = copy.deepcopy(state.context_data)
+        state.context_data = self._update_context(user_message, state.context_data, intent, analysis)
+
+        creates_quote = self._should_create_quote(analysis, state.context_data, intent)
+
+        # Catalog questions and workflow steps are answered without the LLM
+        try:
+            fast_response = self.fast_responder.respond(user_message, analysis, state.context_data, creates_quote)
+        except Exception as e:
+            current_app.logger.error(f"Fast path responder error: {e}")
+            fast_response = None
+
+        # Turns that create a quote depend on this conversation, so never share their answers
+        answer_key = None
+        if fast_response is None and not creates_quote:
+            previous_reply = next(
+                (msg['message'] for msg in reversed(state.recent_messages) if msg['sender'] == 'bot'), None
+            )
+            answer_key = self.answer_cache.key_for(user_message, analysis, state.context_data, previous_reply)
 
+        return {
+            'conversation_id': conversation_id,
+            'state': state,
+            'creates_quote': creates_quote,
+            'fast_response': fast_response,
+            'answer_key': answer_key,
+            'user_message': user_message,
+            'user_message_doc': user_message_doc,
+            'context_data': state.context_data,
+            'context_before': context_before,
+            'intent': intent,
+            'analysis': analysis,
+            'messages_for_ai': self._prepare_messages_for_ai(state.recent_messages, state.context_data, state.summary)
+        }
+
+    def _finish_turn(self, turn: Dict, bot_response: str) -> Dict:
+        """Create a quote if needed, persist the bot response and build the API result"""
+        conversation_id = turn['conversation_id']
+        state = turn['state']
+        user_message = turn['user_message']
+        context_data = turn['context_data']
+        intent = turn['intent']
+
+        # Handle quote creation
+        quote_request_id = None
+        if turn['creates_quote']:
+            try:
+                analysis = self._analyze_user_intent(user_message, context_data)
+                quote_request = self._create_quote_request(conversation_id, context_data, analysis)
+                quote_request_id = quote_request['id']
+
+                if quote_request_id:
+                    current_app.logger.info(f"🚀 Creating quote for: {context_data.get('user_name')} - Services: {analysis['services']}")
+
+                    state.quote_request_id = quote_request_id
+                    bot_response += f"\n\n✅ Perfect! I've created quote #{quote_request_id} for your project. Our team will review your requirements and contact you via WhatsApp within 2 hours with a detailed proposal."
+
+            except Exception as quote_error:
+                current_app.logger.error(f"Quote creation failed: {quote_error}")
+                bot_response += "\n\n⚠️ I encountered an issue creating your quote, but don't worry! Our team has been notified and will contact you directly."
+
+        # Save both messages and the conversation update as two batched writes
+        self._record_message(state, 'bot', bot_response)
+        bot_message_doc = self.db_models.chat_messages.build_message(
+            conversation_id=conversation_id,
+            sender='bot',
+            message=bot_response,
+            message_type='text',
+            message_metadata=json.dumps({
+                'intent': intent,
+                'quote_request_id': quote_request_id
+            }) if quote_request_id else None
+        )
+        for message_doc in (turn['user_message_doc'], bot_message_doc):
+            self.state_store.persist(self.db_models.chat_messages.collection, InsertOne(message_doc))
+
+        # Update conversation context with only what this turn changed
+        context_before = turn['context_before']
+        context_changes = {
+            key: value for key, value in context_data.items()
+            if key != 'services_interested' and context_before.get(key) != value
+        }
+        new_services = [
+            service for service in context_data.get('services_interested', [])
+            if service not in context_before.get('services_interested', [])
+        ]
+        conversations = self.db_models.chat_conversations
+        turn_update = dict(
+            context_changes=context_changes,
+            messages=state.recent_messages[-2:],
+            recent_limit=RECENT_MESSAGE_WINDOW,
+            quote_request_id=quote_request_id,
+            services=new_services
+        )
+        expected_version = state.version
+        state.version += 1
+        # Cache first, so a conflicting write can evict this copy after it is stored
+        self.state_store.save(state)
+        self.state_store.persist_turn(
+            conversations.collection,
+            conversation_id,
+            conversations.turn_update(conversation_id, summary=state.summary,
+                                      version=expected_version, **turn_update),
+            # Another worker moved the conversation on; keep this turn's fields
+            # but not a summary built from a stale window
+            conversations.turn_update(conversation_id, **turn_update)
+        )
+
+        return {
+            'success': True,
+            'bot_response': bot_response,
+            'conversation_id': conversation_id,
+            'message_id': str(bot_message_doc['_id']),
+            'quote_request_id': quote_request_id,
+            'intent': intent
+        }
+
+    def _update_context(self, message: str, context: Dict, intent: Dict, analysis: Dict) -> Dict:
+        """Update conversation context with extracted information"""
         # Extract name if not present
-        if not context.get('user_name'):
-            name_patterns = [
-                r"my name is (\w+)",
-                r"i'm (\w+)",
-                r"i am (\w+)",
-                r"call me (\w+)"
-            ]
-            for pattern in name_patterns:
-                match = re.search(pattern, message_lower)
-                if match:
-                    context['user_name'] = match.group(1).title()
-                    break
+        if not context.get('user_name') and analysis['name']:
+            context['user_name'] = analysis['name'].title()
 
         # Extract email
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, message)
-        if email_match:
-            context['user_email'] = email_match.group()
+        if analysis['email']:
+            context['user_email'] = analysis['email']
 
         # Extract phone
-        phone_patterns = [
-            r'(\+91[\s\-]?\d{10})',
-            r'(\d{10})',
-            r'(\d{3}[\s\-]?\d{3}[\s\-]?\d{4})'
-        ]
-        for pattern in phone_patterns:
-            match = re.search(pattern, message)
-            if match:
-                context['user_phone'] = match.group()
-                break
+        if analysis['phone']:
+            context['user_phone'] = analysis['phone']
 
         # Update services
         if intent['services']:
@@ -269,7 +408,7 @@ Remember: Your goal is to efficiently convert conversations into quote requests
 
         return context
 
-    def _should_create_quote(self, message: str, context: Dict, intent: Dict) -> bool:
+    def _should_create_quote(self, analysis: Dict, context: Dict, intent: Dict) -> bool:
         """Determine if a quote should be created"""
         # Must have minimum required info
         has_name = bool(context.get('user_name'))
@@ -277,8 +416,7 @@ Remember: Your goal is to efficiently convert conversations into quote requests
         has_service = bool(context.get('services_interested'))
 
         # User explicitly requests quote
-        quote_confirmations = ['yes', 'create quote', 'generate quote', 'proceed', 'go ahead']
-        wants_quote = any(phrase in message.lower() for phrase in quote_confirmations)
+        wants_quote = analysis['confirms_quote']
 
         return has_name and has_email and has_service and (wants_quote or intent['wants_quote'])
 
@@ -292,11 +430,11 @@ Remember: Your goal is to efficiently convert conversations into quote requests
             'priority': 7 if context.get('user_email') else 5
         }
 
-    def _create_quote_request(self, conversation: dict, context_data: Dict, analysis: Dict) -> str:
-        """Create a quote request in the database"""
+    def _create_quote_request(self, conversation_id: str, context_data: Dict, analysis: Dict) -> Dict:
+        """Create a quote request in the database and return the stored document"""
         try:
-            # Create quote request
-            quote_request_id = self.db_models.quote_requests.create_quote_request(
+            # The conversation's quote_request_id is saved with the turn's conversation update
+            return self.db_models.quote_requests.insert_quote_request(
                 client_name=analysis.get('user_name', 'Unknown'),
                 email=analysis.get('user_email', ''),
                 phone=context_data.get('user_phone', ''),
@@ -306,33 +444,59 @@ Remember: Your goal is to efficiently convert conversations into quote requests
                 budget_range=context_data.get('budget_range', ''),
                 timeline=context_data.get('timeline', ''),
                 additional_requirements=f"Created via AI chatbot. Priority: {analysis.get('priority', 5)}/10",
-                status='pending'
+                status='pending',
+                # Team notification, written with the quote and relayed to the job workers
+                notification='chatbot_quote_notification',
+                notification_payload={'priority': analysis.get('priority', 5)}
             )
 
-            # Update conversation with quote request ID
-            self.db_models.chat_conversations.update_one(
-                {'_id': conversation['id']},
-                {'quote_request_id': quote_request_id}
-            )
-
-            return quote_request_id
-
         except Exception as e:
             current_app.logger.error(f"Failed to create quote request: {e}")
             raise
 
-    def _send_quote_notifications(self, quote_request: Dict, analysis: Dict):
-        """Send notifications for new quote request"""
+    def _record_message(self, state, sender: str, message: str):
+        """Add a message to the recent window, folding evicted ones into the summary"""
+        evicted = state.add_message(sender, message)
+        if evicted:
+            state.summary = self.prompt_builder.summarize(state.summary, evicted)
+
+    def _prepare_messages_for_ai(self, recent_messages: List[Dict], context_data: Dict,
+                                 summary: Optional[str] = None) -> List[Dict]:
+        """Prepare messages for OpenAI API within the prompt token budget"""
+        return self.prompt_builder.build(recent_messages, context_data, summary)
+
+    def get_conversation_history(self, conversation_id: str, since: str = None) -> Dict:
+        """Get conversation history, or only the messages after ``since``
+
+        ``full`` is True when the whole transcript is returned, including
+        when ``since`` is unknown and the client must replace its copy.
+        """
         try:
-            import os
-            import urllib.parse
-            import webbrowser
-            from threading import Thread
+            messages = self.db_models.chat_messages.get_since(conversation_id, since)
+            full = not since or messages is None
+            if messages is None:
+                messages = self.db_models.chat_messages.get_since(conversation_id)
 
-            def send_notification():
-                try:
-                    # Generate WhatsApp message
-                    message = f"""🤖 NEW AI CHATBOT QUOTE - OrbitX
+            return {
+                'full': full,
+                'messages': [
+                    {
+                        'id': str(msg['_id']),
+                        'sender': msg.get('sender'),
+                        'message': msg.get('message'),
+                        'created_at': msg['created_at'].isoformat() if msg.get('created_at') else None,
+                        'message_type': msg.get('message_type', 'text')
+                    }
+                    for msg in messages
+                ]
+            }
+        except Exception as e:
+            current_app.logger.error(f"Failed to get conversation history: {e}")
+            return {'full': True, 'messages': []}
+
+def chatbot_quote_message(quote_request: Dict, priority: int = 5) -> str:
+    """Team notification text for a quote created by the chatbot"""
+    return f"""🤖 NEW AI CHATBOT QUOTE - OrbitX
 
 👤 Client: {quote_request.get('client_name')}
 📧 Email: {quote_request.get('email')}
@@ -341,74 +505,26 @@ Remember: Your goal is to efficiently convert conversations into quote requests
 🛠️ Services: {quote_request.get('services_requested')}
 📝 Description: {quote_request.get('project_description')}
 
-🤖 AI Priority: {analysis.get('priority', 5)}/10
+🤖 AI Priority: {priority}/10
 💡 Created via: AI Chatbot
 
 ⚡ Action: Send detailed quote to {quote_request.get('email')}"""
 
-                    # URL encode for WhatsApp
-                    encoded_message = urllib.parse.quote(message)
-                    whatsapp_url = f"https://wa.me/{os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')}?text={encoded_message}"
-
-                    # Open WhatsApp (in development)
-                    if os.getenv('FLASK_ENV') != 'production':
-                        try:
-                            webbrowser.open(whatsapp_url)
-                        except:
-                            pass  # Fail silently if can't open browser
-
-                    current_app.logger.info(f"📱 WhatsApp notification sent for quote {quote_request.get('id')}")
-
-                except Exception as e:
-                    current_app.logger.error(f"Notification sending failed: {e}")
-
-            # Send in background thread
-            Thread(target=send_notification, daemon=True).start()
-
-        except Exception as e:
-            current_app.logger.error(f"Failed to setup notifications: {e}")
+# Process-wide chatbot instance, built once per worker and shared by all requests
+_chatbot = None
+_chatbot_lock = threading.Lock()
 
-    def _prepare_messages_for_ai(self, recent_messages: List[Dict], context_data: Dict) -> List[Dict]:
-        """Prepare messages for OpenAI API"""
-        messages = [{"role": "system", "content": self.system_prompt}]
-
-        # Add context information
-        if context_data:
-            context_summary = f"User context: {json.dumps(context_data, indent=2)}"
-            messages.append({"role": "system", "content": context_summary})
-
-        # Add recent conversation history
-        for msg in recent_messages[-6:]:  # Last 6 messages for context
-            role = "user" if msg.get('sender') == 'user' else "assistant"
-            messages.append({
-                "role": role,
-                "content": msg.get('message', '')
-            })
-
-        return messages
-
-    def get_conversation_history(self, conversation_id: str) -> List[Dict]:
-        """Get conversation history"""
-        try:
-            messages = self.db_models.chat_messages.get_by_conversation(conversation_id)
-            return [
-                {
-                    'id': msg.get('id'),
-                    'sender': msg.get('sender'),
-                    'message': msg.get('message'),
-                    'created_at': msg.get('created_at').isoformat() if msg.get('created_at') else None,
-                    'message_type': msg.get('message_type', 'text')
-                }
-                for msg in messages
-            ]
-        except Exception as e:
-            current_app.logger.error(f"Failed to get conversation history: {e}")
-            return []
-
-# Initialize chatbot instance
 def get_chatbot():
-    """Get chatbot instance with OpenAI client and db_models"""
+    """Get the shared chatbot instance with OpenAI client and db_models"""
+    global _chatbot
     from app import openai_client, db_models
     if not openai_client:
         raise Exception("OpenAI client not configured")
-    return OrbitXChatbot(openai_client, db_models)
\ No newline at end of file
+
+    chatbot = _chatbot
+    if chatbot is None or chatbot.openai_client is not openai_client:
+        with _chatbot_lock:
+            if _chatbot is None or _chatbot.openai_client is not openai_client:
+                _chatbot = OrbitXChatbot(openai_client, db_models)
+            chatbot = _chatbot
+    return chatbot
@@ -0,0 +1,335 @@
+"""
+Conversation state cache for the OrbitX chatbot
+
+Keeps the parsed context and the recent-message window of active
+conversations in memory so a hot conversation does not reload its
+context and messages every turn. Writes go through to Mongo on a
+background writer thread, and a cache miss falls back to loading the
+conversation from Mongo.
+
+The default store is a per-worker LRU. Under several gunicorn workers a
+conversation can hop between processes, so every turn bumps a ``version``
+counter on the conversation and writes only while Mongo is still at the
+version the turn loaded. A write that finds the conversation moved on
+merges the turn's fields anyway and evicts the stale cache entry, so the
+next turn reloads from Mongo. Set CHATBOT_STATE_REDIS_URL to share state
+across workers through Redis instead.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+# Number of recent messages kept per conversation for the LLM prompt;
+# older messages are folded into the conversation's running summary
+RECENT_MESSAGE_WINDOW = 6
+
+
+class ConversationState:
+    """Parsed context and recent messages of one conversation"""
+
+    def __init__(self, conversation_id: str, context_data: Dict = None,
+                 recent_messages: List[Dict] = None, quote_request_id: str = None,
+                 summary: str = None, version: int = 0):
+        self.conversation_id = conversation_id
+        self.context_data = context_data or {}
+        self.recent_messages = list(recent_messages or [])[-RECENT_MESSAGE_WINDOW:]
+        self.quote_request_id = quote_request_id
+        self.summary = summary
+        self.version = version
+
+    def add_message(self, sender: str, message: str) -> List[Dict]:
+        """Append a message to the recent-message window and return evicted messages"""
+        self.recent_messages.append({'sender': sender, 'message': message})
+        evicted = self.recent_messages[:-RECENT_MESSAGE_WINDOW]
+        del self.recent_messages[:-RECENT_MESSAGE_WINDOW]
+        return evicted
+
+    def to_dict(self) -> Dict:
+        return {
+            'conversation_id': self.conversation_id,
+            'context_data': self.context_data,
+            'recent_messages': self.recent_messages,
+            'quote_request_id': self.quote_request_id,
+            'summary': self.summary,
+            'version': self.version
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ConversationState':
+        # The per-worker cache hands out its own entry; turns must not edit it in place
+        data = copy.deepcopy(data)
+        return cls(
+            conversation_id=data['conversation_id'],
+            context_data=data.get('context_data'),
+            recent_messages=data.get('recent_messages'),
+            quote_request_id=data.get('quote_request_id'),
+            summary=data.get('summary'),
+            version=data.get('version', 0)
+        )
+
+
+class LocalStateCache:
+    """Per-worker LRU cache with TTL eviction"""
+
+    def __init__(self, max_size: int = 1000, ttl: int = 1800):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < time.monotonic():
+                del self._entries[conversation_id]
+                return None
+            self._entries.move_to_end(conversation_id)
+            return data
+
+    def set(self, conversation_id: str, data: Dict):
+        with self._lock:
+            self._entries[conversation_id] = (time.monotonic() + self.ttl, data)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, conversation_id: str):
+        with self._lock:
+            self._entries.pop(conversation_id, None)
+
+
+class RedisStateCache:
+    """Shared cache so conversation state holds across gunicorn workers"""
+
+    def __init__(self, url: str, ttl: int = 1800, prefix: str = 'orbitx:chat_state:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, conversation_id: str) -> Optional[Dict]:
+        raw = self.client.get(self.prefix + conversation_id)
+        return json.loads(raw) if raw else None
+
+    def set(self, conversation_id: str, data: Dict):
+        self.client.setex(self.prefix + conversation_id, self.ttl, json.dumps(data))
+
+    def delete(self, conversation_id: str):
+        self.client.delete(self.prefix + conversation_id)
+
+
+class ConversationStateStore:
+    """Cache-aside store for conversation state with write-behind persistence
+
+    Queued writes are drained in batches and applied with one ordered
+    ``bulk_write`` per collection, so a chat turn costs two Mongo writes
+    (its messages and its conversation update) and concurrent turns share
+    round trips. Version-checked turn writes are applied one at a time,
+    since each needs its own match count.
+    """
+
+    def __init__(self, db_models, cache=None, max_batch: int = 100,
+                 write_attempts: int = 5, retry_backoff: float = 0.5):
+        self.db_models = db_models
+        self.cache = cache or build_state_cache()
+        self.max_batch = max_batch
+        self.write_attempts = write_attempts
+        self.retry_backoff = retry_backoff
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='chat-state-writer', daemon=True)
+        self._writer.start()
+        _stores.append(self)
+
+    def load(self, conversation_id: str, user_info: Dict = None) -> ConversationState:
+        """Get conversation state from the cache, falling back to Mongo on a miss"""
+        try:
+            cached = self.cache.get(conversation_id)
+        except Exception as e:
+            logger.error(f"Conversation state cache read failed: {e}")
+            cached = None
+        if cached:
+            return ConversationState.from_dict(cached)
+
+        # One upsert both loads an existing conversation and creates a new one
+        conversation = self.db_models.chat_conversations.get_or_create(
+            conversation_id=conversation_id,
+            user_session_id=user_info.get('session_id') if user_info else None,
+            user_name=user_info.get('name') if user_info else None,
+            user_email=user_info.get('email') if user_info else None,
+            user_phone=user_info.get('phone') if user_info else None
+        )
+
+        recent_messages = conversation.get('recent_messages')
+        if recent_messages is None:
+            # Conversations created before the embedded window was added
+            recent_messages = [
+                {'sender': msg.get('sender'), 'message': msg.get('message', '')}
+                for msg in self.db_models.chat_messages.get_recent(conversation_id, limit=RECENT_MESSAGE_WINDOW)
+            ]
+
+        # Context written field by field, over the JSON blob of older conversations
+        context_data = json.loads(conversation.get('context_data') or '{}')
+        context_data.update(conversation.get('context') or {})
+
+        return ConversationState(
+            conversation_id=conversation_id,
+            context_data=context_data,
+            recent_messages=recent_messages,
+            quote_request_id=conversation.get('quote_request_id'),
+            summary=conversation.get('summary'),
+            version=conversation.get('version', 0)
+        )
+
+    def save(self, state: ConversationState):
+        """Store conversation state in the cache"""
+        try:
+            self.cache.set(state.conversation_id, state.to_dict())
+        except Exception as e:
+            logger.error(f"Conversation state cache write failed: {e}")
+
+    def persist(self, collection, operation):
+        """Queue a pymongo write operation (InsertOne, UpdateOne, ...) for ``collection``"""
+        self._writes.put((collection, operation, None))
+
+    def persist_turn(self, collection, conversation_id: str, operation, on_conflict):
+        """Queue a version-checked turn write
+
+        If ``operation`` matches nothing, another worker has written the
+        conversation since this worker loaded it: ``on_conflict`` is
+        applied instead and the cached state is evicted.
+        """
+        self._writes.put((collection, operation, (conversation_id, on_conflict)))
+
+    def flush(self, timeout: float = None):
+        """Block until every queued write has been applied"""
+        if timeout is None:
+            self._writes.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._writes.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Group by collection, keeping queue order within each collection
+            grouped = OrderedDict()
+            for collection, operation, conflict in batch:
+                grouped.setdefault(collection.name, (collection, []))[1].append((operation, conflict))
+
+            for collection, entries in grouped.values():
+                operations = []
+                for operation, conflict in entries:
+                    if conflict is None:
+                        operations.append(operation)
+                        continue
+                    self._apply(collection, operations)
+                    operations = []
+                    self._apply_turn(collection, operation, *conflict)
+                self._apply(collection, operations)
+
+            for _ in batch:
+                self._writes.task_done()
+
+    def _apply(self, collection, operations: List):
+        """Write a batch, retrying with backoff from the first operation that failed"""
+        attempt = 0
+        while operations:
+            try:
+                collection.bulk_write(operations, ordered=True)
+                return
+            except BulkWriteError as e:
+                errors = e.details.get('writeErrors') or [{'index': 0}]
+                index = errors[0]['index']
+                if errors[0].get('code') == 11000:
+                    # Inserted by an earlier attempt whose reply was lost
+                    operations = operations[index + 1:]
+                    continue
+                operations = operations[index:]
+                error = e
+            except Exception as e:
+                error = e
+
+            attempt += 1
+            if attempt >= self.write_attempts:
+                logger.error(f"Conversation state write to {collection.name} failed, "
+                             f"dropping {len(operations)} operations: {error}")
+                return
+            logger.warning(f"Conversation state write to {collection.name} failed (attempt {attempt}): {error}")
+            time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _apply_turn(self, collection, operation, conversation_id: str, on_conflict):
+        """Apply a version-checked turn write, falling back to ``on_conflict``"""
+        for attempt in range(1, self.write_attempts + 1):
+            try:
+                result = collection.bulk_write([operation], ordered=True)
+                if result.matched_count:
+                    return
+                logger.info(f"Conversation {conversation_id} changed in another worker, reloading it")
+                self._evict(conversation_id)
+                self._apply(collection, [on_conflict])
+                return
+            except Exception as e:
+                if attempt >= self.write_attempts:
+                    logger.error(f"Conversation state write to {collection.name} failed, "
+                                 f"dropping turn of {conversation_id}: {e}")
+                    return
+                logger.warning(f"Conversation state write to {collection.name} failed (attempt {attempt}): {e}")
+                time.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    def _evict(self, conversation_id: str):
+        try:
+            self.cache.delete(conversation_id)
+        except Exception as e:
+            logger.error(f"Conversation state cache eviction failed: {e}")
+
+
+# Every store in this process, so queued writes can be flushed on shutdown
+_stores = []
+
+
+def flush_pending_writes(timeout: float = 10):
+    """Wait up to ``timeout`` seconds for every store's queued writes"""
+    deadline = time.monotonic() + timeout
+    for store in _stores:
+        store.flush(max(deadline - time.monotonic(), 0))
+
+
+# The writer is a daemon thread, so drain it before the interpreter exits
+atexit.register(flush_pending_writes)
+
+
+def build_state_cache():
+    """Build the configured conversation state cache"""
+    ttl = int(os.environ.get('CHATBOT_STATE_TTL', 1800))
+    redis_url = os.environ.get('CHATBOT_STATE_REDIS_URL')
+    if redis_url:
+        try:
+            return RedisStateCache(redis_url, ttl=ttl)
+        except Exception as e:
+            logger.error(f"Redis state cache unavailable, using per-worker cache: {e}")
+    return LocalStateCache(
+        max_size=int(os.environ.get('CHATBOT_STATE_MAX_CONVERSATIONS', 1000)),
+        ttl=ttl
+    )
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI and Twilio APIs
+
+Serves the subset of both APIs the app, the SMS and WhatsApp integrations
+and the MCP server use, so the chatbot and the quote pipeline can be load
+tested offline without paid API calls:
+
+- POST /v1/chat/completions: plain, streaming (SSE) and JSON mode replies
+- POST /2010-04-01/Accounts/<sid>/Messages.json: Twilio message sends
+
+Latency, stalls and errors are injected according to the command line
+(or FAKE_API_* environment variables) and can be changed at runtime with
+POST /_fake/config. Request counts are at GET /_fake/stats.
+
+Point the clients at it with:
+
+    OPENAI_API_KEY=sk-fake
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    TWILIO_ACCOUNT_SID=ACfake
+    TWILIO_AUTH_TOKEN=fake
+    TWILIO_API_BASE_URL=http://127.0.0.1:8900
+
+Run with: python fake_api_server.py --latency-ms 400 --jitter-ms 300 --error-rate 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+app = Flask(__name__)
+
+config = {
+    'latency_ms': float(os.environ.get('FAKE_API_LATENCY_MS', 300)),
+    'jitter_ms': float(os.environ.get('FAKE_API_JITTER_MS', 200)),
+    'token_delay_ms': float(os.environ.get('FAKE_API_TOKEN_DELAY_MS', 15)),
+    'error_rate': float(os.environ.get('FAKE_API_ERROR_RATE', 0)),
+    'rate_limit_rate': float(os.environ.get('FAKE_API_RATE_LIMIT_RATE', 0)),
+    'stall_rate': float(os.environ.get('FAKE_API_STALL_RATE', 0)),
+    'stall_ms': float(os.environ.get('FAKE_API_STALL_MS', 30000))
+}
+
+stats = {'chat_completions': 0, 'streams': 0, 'json_mode': 0, 'twilio_messages': 0,
+         'errors': 0, 'rate_limited': 0, 'stalls': 0}
+stats_lock = threading.Lock()
+
+CHAT_REPLIES = [
+    "Great question! We design logos, websites, branding, social media creatives and print. "
+    "Which of these fits your project best?",
+    "Happy to help with that. Could you share a bit more about your business and what you have in mind?",
+    "That sounds like an exciting project! To prepare a quote I'll need your name and email address.",
+    "Our team usually delivers a first concept within a week. Would you like me to create a quote for you?"
+]
+
+# Batched quote analysis prompts end with the quotes as a JSON list
+BATCH_QUOTES_MARKER = 'Quotes:\n'
+
+
+def count(name: str):
+    with stats_lock:
+        stats[name] += 1
+
+
+def inject_faults(kind: str):
+    """Sleep for the configured latency and return an error response, or None"""
+    delay = config['latency_ms'] + random.uniform(0, config['jitter_ms'])
+    if random.random() < config['stall_rate']:
+        count('stalls')
+        delay = config['stall_ms']
+    time.sleep(delay / 1000)
+
+    if random.random() < config['rate_limit_rate']:
+        count('rate_limited')
+        return error_response(kind, 429, 'Injected rate limit')
+    if random.random() < config['error_rate']:
+        count('errors')
+        return error_response(kind, 500, 'Injected server error')
+    return None
+
+
+def error_response(kind: str, status: int, message: str):
+    if kind == 'twilio':
+        body = {'code': 20000 + status, 'message': message, 'status': status}
+    else:
+        body = {'error': {'message': message, 'type': 'server_error' if status >= 500 else 'rate_limit_error'}}
+    response = jsonify(body)
+    response.status_code = status
+    return response
+
+
+def seeded(text: str) -> int:
+    """Stable number derived from text, so replies are deterministic per prompt"""
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def reply_for(messages, json_mode: bool) -> str:
+    prompt = messages[-1].get('content', '') if messages else ''
+    seed = seeded(prompt)
+
+    if json_mode and BATCH_QUOTES_MARKER in prompt:
+        # Batched quote analysis: one result per quote in the prompt's JSON list
+        results = []
+        for quote in json.loads(prompt.split(BATCH_QUOTES_MARKER, 1)[1]):
+            quote_seed = seeded(json.dumps(quote))
+            results.append({
+                'id': quote.get('id'),
+                'priority': quote_seed % 10 + 1,
+                'estimated_value': f"Rs {(quote_seed % 5 + 1) * 5},000-{(quote_seed % 5 + 2) * 10},000"
+            })
+        return json.dumps({'results': results})
+
+    if json_mode:
+        # Single-quote analysis, as in whatsapp-mcp-server/test_openai.py
+        return json.dumps({
+            'priority': seed % 10 + 1,
+            'estimated_value': f"₹{(seed % 5 + 1) * 5},000 - ₹{(seed % 5 + 2) * 10},000",
+            'strategy': 'Respond within 2 hours with a tailored proposal',
+            'urgency': ('low', 'medium', 'high')[seed % 3]
+        }, ensure_ascii=False)
+
+    return CHAT_REPLIES[seed % len(CHAT_REPLIES)]
+
+
+def completion_envelope(model: str, completion_id: str, created: int, **fields) -> dict:
+    return {'id': completion_id, 'created': created, 'model': model, **fields}
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    count('chat_completions')
+    fault = inject_faults('openai')
+    if fault is not None:
+        return fault
+
+    data = request.get_json(force=True)
+    model = data.get('model', 'gpt-4o-mini')
+    json_mode = (data.get('response_format') or {}).get('type') == 'json_object'
+    if json_mode:
+        count('json_mode')
+
+    content = reply_for(data.get('messages', []), json_mode)
+    completion_id = f"chatcmpl-fake-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    prompt_tokens = sum(len((m.get('content') or '').split()) for m in data.get('messages', []))
+    usage = {
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': len(content.split()),
+        'total_tokens': prompt_tokens + len(content.split())
+    }
+
+    if not data.get('stream'):
+        return jsonify(completion_envelope(
+            model, completion_id, created,
+            object='chat.completion',
+            choices=[{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            usage=usage
+        ))
+
+    count('streams')
+
+    def generate():
+        tokens = re.findall(r'\S+\s*', content)
+        for index, token in enumerate(tokens):
+            delta = {'content': token}
+            if index == 0:
+                delta['role'] = 'assistant'
+            chunk = completion_envelope(
+                model, completion_id, created,
+                object='chat.completion.chunk',
+                choices=[{'index': 0, 'delta': delta, 'finish_reason': None}]
+            )
+            yield f"data: {json.dumps(chunk)}\n\n"
+            time.sleep(config['token_delay_ms'] / 1000)
+        final = completion_envelope(
+            model, completion_id, created,
+            object='chat.completion.chunk',
+            choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        )
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+
+@app.route('/2010-04-01/Accounts/<account_sid>/Messages.json', methods=['POST'])
+def twilio_messages(account_sid):
+    count('twilio_messages')
+    fault = inject_faults('twilio')
+    if fault is not None:
+        return fault
+
+    now = datetime.utcnow().strftime('%a, %d %b %Y %H:%M:%S +0000')
+    sid = f"SM{uuid.uuid4().hex}"
+    response = jsonify({
+        'sid': sid,
+        'account_sid': account_sid,
+        'to': request.form.get('To'),
+        'from': request.form.get('From'),
+        'body': request.form.get('Body'),
+        'status': 'queued',
+        'direction': 'outbound-api',
+        'num_segments': '1',
+        'date_created': now,
+        'date_updated': now,
+        'price': None,
+        'error_code': None,
+        'error_message': None,
+        'uri': f"/2010-04-01/Accounts/{account_sid}/Messages/{sid}.json"
+    })
+    response.status_code = 201
+    return response
+
+
+@app.route('/_fake/config', methods=['GET', 'POST'])
+def fake_config():
+    """Read or change fault injection settings at runtime"""
+    if request.method == 'POST':
+        for key, value in (request.get_json(force=True) or {}).items():
+            if key in config:
+                config[key] = float(value)
+    return jsonify(config)
+
+
+@app.route('/_fake/stats')
+def fake_stats():
+    with stats_lock:
+        return jsonify(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the OpenAI and Twilio APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('FAKE_API_PORT', 8900)))
+    parser.add_argument('--latency-ms', type=float, help='base response latency')
+    parser.add_argument('--jitter-ms', type=float, help='random extra latency, uniform 0..jitter')
+    parser.add_argument('--token-delay-ms', type=float, help='delay between streamed tokens')
+    parser.add_argument('--error-rate', type=float, help='fraction of requests answered with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, help='fraction of requests answered with a 429')
+    parser.add_argument('--stall-rate', type=float, help='fraction of requests that stall for --stall-ms')
+    parser.add_argument('--stall-ms', type=float, help='duration of an injected stall')
+    args = parser.parse_args()
+
+    for key in config:
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+
+    print(f"Fake OpenAI/Twilio API on http://{args.host}:{args.port} with {config}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Rule-based fast path for the OrbitX chatbot
+
+Answers the turns that have one exact answer without calling OpenAI:
+service listings and prices straight from the ``services`` catalog, and
+the name -> email -> confirm steps of the quote workflow described in the
+system prompt. Anything open-ended returns None and falls through to the
+LLM.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+SERVICE_LIST_PATTERN = re.compile(
+    r"\b(?:what|which)\s+(?:other\s+)?services?\b"
+    r"|\bservices\s+(?:do|does|can)\s+you\b"
+    r"|\bwhat\s+(?:do|can)\s+you\s+(?:offer|do|provide)\b"
+    r"|\blist\b.*\bservices\b"
+)
+
+# Only an explicit introduction is a name answer; "i'm"/"i am" usually start a sentence
+NAME_ANSWER_PATTERN = re.compile(r"\b(?:my name is|call me)\s+\w+")
+
+# Short messages are the ones a canned reply can answer completely
+MAX_FAST_PATH_WORDS = 15
+
+
+class ServiceCatalog:
+    """Active services from Mongo, cached for ``ttl`` seconds"""
+
+    def __init__(self, services_model, ttl: int = 600):
+        self.services_model = services_model
+        self.ttl = ttl
+        self._services = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> List[Dict]:
+        with self._lock:
+            if self._services is None or time.monotonic() - self._loaded_at > self.ttl:
+                self._services = self.services_model.get_active_services()
+                self._loaded_at = time.monotonic()
+            return self._services
+
+
+class FastPathResponder:
+    """Deterministic replies for catalog questions and quote collection steps"""
+
+    def __init__(self, catalog: ServiceCatalog, analyzer):
+        self.catalog = catalog
+        self.analyzer = analyzer
+        self._key_map = (None, {})
+
+    def respond(self, message: str, analysis: Dict, context: Dict, creates_quote: bool) -> Optional[str]:
+        """Return a canned reply for this turn, or None to use the LLM"""
+        if len(message.split()) > MAX_FAST_PATH_WORDS:
+            return None
+
+        if creates_quote:
+            return f"Thanks, {context.get('user_name')}! ✨ I have everything I need."
+
+        lowered = message.lower()
+        if SERVICE_LIST_PATTERN.search(lowered):
+            return self._service_list()
+
+        if analysis['wants_quote'] and analysis['services']:
+            prices = self._price_lines(analysis['services'])
+            if prices:
+                return '\n'.join(prices) + '\n\n' + self._next_step(context)
+
+        # A plain name or email answer; questions and anything else go to the LLM
+        gives_name = bool(analysis['name']) and bool(NAME_ANSWER_PATTERN.search(lowered))
+        if ((gives_name or analysis['email']) and '?' not in message
+                and not analysis['services'] and not analysis['wants_quote']):
+            name = context.get('user_name')
+            greeting = f"Nice to meet you, {name}! 👋" if gives_name and name else "Thanks! 📧"
+            return f"{greeting} {self._next_step(context)}"
+
+        return None
+
+    def _service_list(self) -> Optional[str]:
+        services = self.catalog.get()
+        if not services:
+            return None
+        lines = ["Here's what we offer: 🎨"]
+        for service in services:
+            line = f"• **{service.get('name')}**"
+            if service.get('price_range'):
+                line += f" ({service.get('price_range')})"
+            if service.get('short_description'):
+                line += f" - {service.get('short_description')}"
+            lines.append(line)
+        lines.append('')
+        lines.append("Which service are you interested in?")
+        return '\n'.join(lines)
+
+    def _price_lines(self, service_keys: List[str]) -> List[str]:
+        """Price lines for every detected service, or [] if any is not in the catalog"""
+        by_key = self._services_by_key()
+        lines = []
+        for key in service_keys:
+            service = by_key.get(key)
+            if not service or not service.get('price_range'):
+                return []
+            lines.append(f"💡 **{service.get('name')}**: {service.get('price_range')}")
+        return lines
+
+    def _services_by_key(self) -> Dict[str, Dict]:
+        """Map analyzer service keys to the most specific catalog service"""
+        services = self.catalog.get()
+        if self._key_map[0] is services:
+            return self._key_map[1]
+
+        matches = {}
+        for service in services:
+            keys = self.analyzer.analyze(service.get('name') or '')['services']
+            for key in keys:
+                current = matches.get(key)
+                if current is None or len(keys) < current[0]:
+                    matches[key] = (len(keys), service)
+        by_key = {key: service for key, (_, service) in matches.items()}
+        self._key_map = (services, by_key)
+        return by_key
+
+    @staticmethod
+    def _next_step(context: Dict) -> str:
+        """Next question of the quote workflow"""
+        if not context.get('user_name'):
+            return "What's your name?"
+        if not context.get('user_email'):
+            return "What's your email address?"
+        if not context.get('services_interested'):
+            return "Which service are you interested in?"
+        return "Should I create a quote for this project?"
@@ -0,0 +1,34 @@
+"""
+Gunicorn configuration for OrbitX Digital Marketing Website
+
+Chatbot and quote-analysis requests spend most of their time waiting on
+OpenAI. Each worker therefore runs a thread pool (gthread) so a slow LLM
+call holds a single thread instead of a whole worker, and page rendering
+keeps flowing while chats are in progress.
+"""
+
+import os
+
+# Worker processes and threads per worker
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+# Workers split CHATBOT_MAX_CONCURRENT_LLM_CALLS between them when Redis is off
+os.environ['WEB_CONCURRENCY'] = str(workers)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# Long enough for a streamed chatbot reply, short enough to recycle stuck workers
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    """Start the job workers and outbox relay once the worker has loaded the app"""
+    from app import start_background_workers
+    start_background_workers()
+
+
+def worker_exit(server, worker):
+    """Store queued chat turns before a worker exits (restart or max_requests recycle)"""
+    from chatbot_state import flush_pending_writes
+    flush_pending_writes(timeout=graceful_timeout)
@@ -0,0 +1,146 @@
+"""
+Background job workers for OrbitX
+
+Quote notifications used to run in a fresh daemon thread per submission,
+so a restart lost them and a burst of quotes meant a burst of threads.
+They are now stored in the ``jobs`` collection (see JobModel) and run by
+a fixed pool of workers that claim one job at a time with an atomic
+``find_one_and_update``. A failed job is retried with exponential backoff
+until it runs out of attempts; a job whose worker dies is picked up again
+once its visibility timeout runs out.
+
+The pool runs inside each web worker by default. Set
+JOB_WORKERS_IN_PROCESS=false and run ``python worker.py`` to process jobs
+in a separate process instead.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import uuid
+from typing import Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorkerPool:
+    """A bounded set of threads that claim and run jobs from a JobModel"""
+
+    def __init__(self, jobs, handlers: Dict[str, Callable[[Dict], None]], concurrency: int = 2,
+                 poll_interval: float = 2.0, visibility_timeout: float = 300.0,
+                 base_backoff: float = 5.0, max_backoff: float = 600.0, app=None):
+        self.jobs = jobs
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.app = app
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._threads = []
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'completed': 0, 'retried': 0, 'failed': 0, 'lost_leases': 0}
+        jobs.listeners.append(self.wake)
+
+    def start(self):
+        """Start the worker threads (once)"""
+        if self._threads:
+            return
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run, args=(f"{self.worker_prefix}:{index}",),
+                                      name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Started {self.concurrency} job workers")
+
+    def stop(self, timeout: float = None):
+        """Stop claiming jobs and wait for the running ones to finish"""
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def wake(self):
+        """Skip the poll wait, e.g. right after a job is enqueued"""
+        self._wakeup.set()
+
+    def run_once(self, worker_id: str = None) -> bool:
+        """Claim and run a single job; return False if none was due"""
+        worker_id = worker_id or f"{self.worker_prefix}:once"
+        job = self.jobs.claim(worker_id, self.visibility_timeout, list(self.handlers))
+        if job is None:
+            return False
+        self._process(job, worker_id)
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['workers'] = len(self._threads)
+        return stats
+
+    def _run(self, worker_id: str):
+        while not self._stopping.is_set():
+            try:
+                if self.run_once(worker_id):
+                    continue
+            except Exception as e:
+                # Mongo unavailable; back off like an empty queue
+                logger.error(f"Job worker {worker_id} could not claim a job: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _process(self, job: Dict, worker_id: str):
+        job_id = job['_id']
+        handler = self.handlers[job['type']]
+        try:
+            if self.app is not None:
+                with self.app.app_context():
+                    handler(job['payload'])
+            else:
+                handler(job['payload'])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job['attempts'] >= job.get('max_attempts', 1):
+                logger.error(f"Job {job_id} ({job['type']}) failed after {job['attempts']} attempts: {error}")
+                self._settle(self.jobs.fail(job_id, worker_id, error), 'failed')
+            else:
+                delay = self._backoff(job['attempts'])
+                logger.warning(f"Job {job_id} ({job['type']}) attempt {job['attempts']} failed, "
+                               f"retrying in {delay:.0f}s: {error}")
+                self._settle(self.jobs.retry(job_id, worker_id, error, delay), 'retried')
+            return
+        self._settle(self.jobs.complete(job_id, worker_id), 'completed')
+
+    def _backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the given attempt number"""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _settle(self, updated: bool, outcome: str):
+        # The update is conditional on still holding the lease
+        with self._lock:
+            self._stats[outcome if updated else 'lost_leases'] += 1
+
+
+def build_job_worker_pool(jobs, handlers: Dict[str, Callable[[Dict], None]], app=None) -> JobWorkerPool:
+    """Build the job worker pool from environment configuration"""
+    return JobWorkerPool(
+        jobs, handlers,
+        concurrency=int(os.environ.get('JOB_WORKER_CONCURRENCY', 2)),
+        poll_interval=float(os.environ.get('JOB_POLL_INTERVAL', 2)),
+        visibility_timeout=float(os.environ.get('JOB_VISIBILITY_TIMEOUT', 300)),
+        base_backoff=float(os.environ.get('JOB_RETRY_BACKOFF', 5)),
+        max_backoff=float(os.environ.get('JOB_RETRY_MAX_BACKOFF', 600)),
+        app=app
+    )
+
+
+def job_workers_in_process() -> bool:
+    """Whether web workers should run the job pool themselves"""
+    return os.environ.get('JOB_WORKERS_IN_PROCESS', 'true').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,293 @@
+"""
+Resilient wrapper for OpenAI calls
+
+Every OpenAI call in the app, the SMS and WhatsApp integrations and the
+MCP server goes through one LLMGuard, which gives each call a deadline,
+hedges a second request when the first runs past the observed p95 latency
+(or retries once when it fails fast), and trips a circuit breaker after
+repeated failures so callers switch to their fallbacks immediately while
+the provider is degraded. Latency, error and breaker stats are exported
+with ``stats()``.
+
+Requests are passed as callables taking the remaining ``timeout`` in
+seconds, so the SDK call itself is bounded by the deadline:
+
+    response = get_llm_guard().call(
+        lambda timeout: client.chat.completions.create(..., timeout=timeout)
+    )
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth a second attempt; anything else in 4xx will fail again
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call is short-circuited, times out or fails"""
+
+
+class CircuitBreaker:
+    """Open after consecutive failures, then let one trial call through after ``reset_timeout``"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == 'half_open' or self._failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"LLM circuit breaker opened after {self._failures} failures")
+                self.state = 'open'
+                self._opened_at = time.monotonic()
+
+    def record_rejection(self):
+        """The API answered but rejected the request (400, 401, 422, ...)
+
+        Says nothing about provider health while closed, but a half-open
+        trial that got an answer shows the provider is back.
+        """
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'closed'
+                self._failures = 0
+
+    def release_trial(self):
+        """The half-open trial was abandoned without an answer; the next call becomes the trial"""
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'
+
+
+class LatencyWindow:
+    """Rolling window of recent call latencies"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class LLMGuard:
+    """Deadlines, hedged retries and a circuit breaker around LLM calls"""
+
+    def __init__(self, deadline: float = 20.0, min_hedge_delay: float = 1.5, min_samples: int = 20,
+                 max_attempts: int = 2, breaker: CircuitBreaker = None, max_workers: int = 32):
+        self.deadline = deadline
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.max_attempts = max_attempts
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyWindow()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-call')
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'timeouts': 0,
+            'short_circuited': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0
+        }
+
+    def call(self, request: Callable, deadline: float = None, hedge: bool = True):
+        """Run a blocking SDK request under the guard and return its response
+
+        Raises LLMUnavailableError if the breaker is open, the deadline
+        passes or every attempt fails.
+        """
+        start, end, hedge_at = self._begin(deadline, hedge)
+        futures = {self._executor.submit(request, end - start): 0}
+        launched = 1
+        last_error = None
+
+        while True:
+            now = time.monotonic()
+            if now >= end:
+                break
+            wait_for = end - now
+            if hedge_at is not None and launched < self.max_attempts:
+                wait_for = min(wait_for, max(0.0, hedge_at - now))
+
+            done, _ = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                attempt = futures.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self._succeed(start, attempt)
+                return response
+
+            if not self._should_launch(futures, launched, hedge_at, last_error):
+                if not futures:
+                    break
+                continue
+            futures[self._executor.submit(request, end - time.monotonic())] = launched
+            self._count('hedges' if len(futures) > 1 else 'retries')
+            launched += 1
+
+        self._fail(last_error, timed_out=bool(futures))
+
+    async def acall(self, request: Callable, deadline: float = None, hedge: bool = True):
+        """Async variant of ``call`` for AsyncOpenAI requests; losing attempts are cancelled"""
+        start, end, hedge_at = self._begin(deadline, hedge)
+        tasks = {asyncio.ensure_future(request(end - start)): 0}
+        launched = 1
+        last_error = None
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= end:
+                    break
+                wait_for = end - now
+                if hedge_at is not None and launched < self.max_attempts:
+                    wait_for = min(wait_for, max(0.0, hedge_at - now))
+
+                done, _ = await asyncio.wait(tasks, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = tasks.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    self._succeed(start, attempt)
+                    return response
+
+                if not self._should_launch(tasks, launched, hedge_at, last_error):
+                    if not tasks:
+                        break
+                    continue
+                tasks[asyncio.ensure_future(request(end - time.monotonic()))] = launched
+                self._count('hedges' if len(tasks) > 1 else 'retries')
+                launched += 1
+        except asyncio.CancelledError:
+            # CancelledError is not an Exception, so settle the breaker here
+            self.breaker.release_trial()
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        self._fail(last_error, timed_out=bool(tasks))
+
+    def stats(self) -> Dict:
+        """Call counters, breaker state and latency percentiles in milliseconds"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['breaker_state'] = self.breaker.state
+        for pct in (50, 95, 99):
+            value = self.latency.percentile(pct)
+            stats[f'p{pct}_ms'] = round(value * 1000, 1) if value is not None else None
+        return stats
+
+    def _begin(self, deadline: Optional[float], hedge: bool):
+        self._count('calls')
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise LLMUnavailableError("LLM circuit breaker is open")
+
+        start = time.monotonic()
+        hedge_at = None
+        if hedge and len(self.latency) >= self.min_samples:
+            hedge_at = start + max(self.min_hedge_delay, self.latency.percentile(95))
+        return start, start + (deadline or self.deadline), hedge_at
+
+    def _should_launch(self, pending, launched: int, hedge_at: Optional[float], last_error) -> bool:
+        """Launch another attempt after a retryable failure, or to hedge a slow one"""
+        if launched >= self.max_attempts:
+            return False
+        if not pending:
+            return self._retryable(last_error)
+        return hedge_at is not None and time.monotonic() >= hedge_at
+
+    @staticmethod
+    def _retryable(error) -> bool:
+        status = getattr(error, 'status_code', None)
+        return status is None or status in RETRYABLE_STATUS_CODES or status >= 500
+
+    def _succeed(self, start: float, attempt: int):
+        self.latency.add(time.monotonic() - start)
+        self.breaker.record_success()
+        self._count('successes')
+        if attempt:
+            self._count('hedge_wins')
+
+    def _fail(self, error, timed_out: bool):
+        # Requests the API rejects as invalid say nothing about provider health
+        if timed_out or self._retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_rejection()
+        if timed_out:
+            self._count('timeouts')
+            raise LLMUnavailableError("LLM call exceeded its deadline")
+        self._count('failures')
+        raise LLMUnavailableError(f"LLM call failed: {error}") from error
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+# Process-wide guard, so every caller shares one breaker and one latency window
+_llm_guard = None
+_llm_guard_lock = threading.Lock()
+
+
+def get_llm_guard() -> LLMGuard:
+    """Get the shared LLM guard, built from environment configuration"""
+    global _llm_guard
+    if _llm_guard is None:
+        with _llm_guard_lock:
+            if _llm_guard is None:
+                _llm_guard = LLMGuard(
+                    deadline=float(os.environ.get('OPENAI_CALL_DEADLINE', 20)),
+                    min_hedge_delay=float(os.environ.get('OPENAI_HEDGE_MIN_DELAY', 1.5)),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(os.environ.get('OPENAI_BREAKER_FAILURES', 5)),
+                        reset_timeout=float(os.environ.get('OPENAI_BREAKER_RESET', 30))
+                    )
+                )
+    return _llm_guard
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Concurrent-conversation load test for the OrbitX chatbot
+
+Simulates many chat sessions at once against a running app. Each session
+walks the quote workflow from the system prompt (name -> email -> service
+-> "yes, create quote") through /api/chatbot/message, then syncs its
+transcript through /api/chatbot/history the way the widget does (a full
+load, then a ?since= delta with If-None-Match).
+
+Reports p50/p95/p99 latency per endpoint and dialogue step, error and 429
+counts, fallback replies, quote-creation throughput and, with --mongo-uri,
+Mongo operations per chat turn from the server's opcounters.
+
+Run the app against a local Mongo and fake_api_server.py, e.g.:
+
+    python fake_api_server.py &
+    OPENAI_API_KEY=sk-fake OPENAI_BASE_URL=http://127.0.0.1:8900/v1 \\
+    MONGODB_URI=mongodb://localhost:27017/orbitx_load CHATBOT_TRUSTED_PROXIES=1 \\
+    gunicorn --config gunicorn.conf.py app:app &
+    python load_test_chatbot.py --sessions 300 --concurrency 200 \\
+        --mongo-uri mongodb://localhost:27017/orbitx_load
+
+Each session sends its own X-Forwarded-For address, so with
+CHATBOT_TRUSTED_PROXIES=1 the per-IP rate limit applies per simulated
+visitor instead of to the whole test.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Kabir', 'Meera', 'Arjun', 'Isha']
+
+SERVICE_REQUESTS = [
+    "I'm interested in a logo for my bakery",
+    "We need a new website for our clinic",
+    "Looking for social media posts for our cafe",
+    "I want branding for my clothing startup",
+    "Need packaging for our organic tea range",
+    "Could you do a brochure and business card for my firm"
+]
+
+CONFIRMATIONS = ['Yes, please go ahead', 'yes', 'Yes, create quote', 'Sure, proceed']
+
+FALLBACK_PREFIX = "I'm having some technical difficulties"
+
+
+def build_dialogue(rng: random.Random) -> List[tuple]:
+    """Scripted (step, message) turns for one session"""
+    name = rng.choice(FIRST_NAMES)
+    return [
+        ('name', f"Hi, my name is {name}"),
+        ('email', f"My email is {name.lower()}.{uuid.uuid4().hex[:8]}@example.com"),
+        ('service', rng.choice(SERVICE_REQUESTS)),
+        ('confirm', rng.choice(CONFIRMATIONS))
+    ]
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LoadTestResults:
+    """Latency samples and counters collected by all sessions"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def record(self, key: str, seconds: float):
+        self.latencies[key].append(seconds)
+
+    def count(self, key: str, amount: int = 1):
+        self.counters[key] += amount
+
+    def summary(self, elapsed: float, mongo_ops: Optional[int]) -> Dict:
+        latency = {}
+        for key in sorted(self.latencies):
+            samples = self.latencies[key]
+            latency[key] = {
+                'count': len(samples),
+                **{f'p{pct}_ms': round(percentile(samples, pct) * 1000, 1) for pct in (50, 95, 99)},
+                'max_ms': round(max(samples) * 1000, 1)
+            }
+
+        turns = self.counters['turns']
+        summary = {
+            'elapsed_s': round(elapsed, 2),
+            'sessions_completed': self.counters['sessions_completed'],
+            'turns': turns,
+            'turns_per_s': round(turns / elapsed, 2) if elapsed else None,
+            'quotes_created': self.counters['quotes_created'],
+            'quotes_per_s': round(self.counters['quotes_created'] / elapsed, 2) if elapsed else None,
+            'errors': self.counters['errors'],
+            'rate_limited': self.counters['rate_limited'],
+            'fallback_replies': self.counters['fallback_replies'],
+            'history_not_modified': self.counters['history_not_modified'],
+            'latency': latency
+        }
+        if mongo_ops is not None:
+            summary['mongo_ops'] = mongo_ops
+            summary['mongo_ops_per_turn'] = round(mongo_ops / turns, 2) if turns else None
+        return summary
+
+
+async def timed_request(client: httpx.AsyncClient, results: LoadTestResults, key: str, method: str,
+                        url: str, **kwargs) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        results.count('errors')
+        results.count(f'errors:{type(e).__name__}')
+        return None
+    elapsed = time.perf_counter() - start
+    results.record(key, elapsed)
+    results.record(key.split(':')[0] + ':all', elapsed)
+
+    if response.status_code == 429:
+        results.count('rate_limited')
+    elif response.status_code >= 500:
+        results.count('errors')
+    return response
+
+
+async def run_session(client: httpx.AsyncClient, results: LoadTestResults, rng: random.Random,
+                      think_time: float):
+    conversation_id = f"load_{uuid.uuid4().hex}"
+    headers = {'X-Forwarded-For': f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"}
+    user_info = {'session_id': conversation_id}
+
+    for step, message in build_dialogue(rng):
+        response = await timed_request(
+            client, results, f'message:{step}', 'POST', '/api/chatbot/message',
+            json={'message': message, 'conversation_id': conversation_id, 'user_info': user_info},
+            headers=headers
+        )
+        results.count('turns')
+        if response is None or response.status_code != 200:
+            return
+
+        data = response.json()
+        if data.get('bot_response', '').startswith(FALLBACK_PREFIX):
+            results.count('fallback_replies')
+        if data.get('quote_request_id'):
+            results.count('quotes_created')
+
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time))
+
+    # Widget transcript sync: full load, then a delta that should be a 304
+    response = await timed_request(
+        client, results, 'history:full', 'GET', f'/api/chatbot/history/{conversation_id}', headers=headers
+    )
+    if response is not None and response.status_code == 200:
+        last_message_id = response.json().get('last_message_id')
+        if last_message_id:
+            response = await timed_request(
+                client, results, 'history:since', 'GET', f'/api/chatbot/history/{conversation_id}',
+                params={'since': last_message_id},
+                headers={**headers, 'If-None-Match': f'"{last_message_id}"'}
+            )
+            if response is not None and response.status_code == 304:
+                results.count('history_not_modified')
+
+    results.count('sessions_completed')
+
+
+def mongo_op_count(mongo_uri: str) -> int:
+    """Total operations the Mongo server has executed, from serverStatus opcounters"""
+    from pymongo import MongoClient
+    client = MongoClient(mongo_uri)
+    try:
+        counters = client.admin.command('serverStatus')['opcounters']
+        # Approximate: also counts the serverStatus call itself and any other clients
+        return sum(counters[name] for name in ('insert', 'query', 'update', 'delete', 'getmore', 'command'))
+    finally:
+        client.close()
+
+
+async def run(args) -> Dict:
+    results = LoadTestResults()
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def session(index: int):
+            # Spread session starts over the ramp-up period
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up * index / args.sessions)
+            async with semaphore:
+                await run_session(client, results, random.Random(rng.random()), args.think_time)
+
+        mongo_before = mongo_op_count(args.mongo_uri) if args.mongo_uri else None
+        start = time.perf_counter()
+        await asyncio.gather(*(session(index) for index in range(args.sessions)))
+        elapsed = time.perf_counter() - start
+        mongo_after = mongo_op_count(args.mongo_uri) if args.mongo_uri else None
+
+    mongo_ops = mongo_after - mongo_before if args.mongo_uri else None
+    return results.summary(elapsed, mongo_ops)
+
+
+def print_report(summary: Dict):
+    print(f"\nSessions completed: {summary['sessions_completed']}  "
+          f"Turns: {summary['turns']} ({summary['turns_per_s']}/s)  "
+          f"Elapsed: {summary['elapsed_s']}s")
+    print(f"Quotes created: {summary['quotes_created']} ({summary['quotes_per_s']}/s)")
+    print(f"Errors: {summary['errors']}  Rate limited: {summary['rate_limited']}  "
+          f"Fallback replies: {summary['fallback_replies']}  "
+          f"History 304s: {summary['history_not_modified']}")
+    if 'mongo_ops' in summary:
+        print(f"Mongo ops: {summary['mongo_ops']} ({summary['mongo_ops_per_turn']} per turn)")
+
+    print(f"\n{'endpoint':<18}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for key, stats in summary['latency'].items():
+        print(f"{key:<18}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+              f"{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent-conversation load test for the OrbitX chatbot')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--sessions', type=int, default=200, help='chat sessions to run in total')
+    parser.add_argument('--concurrency', type=int, default=100, help='sessions in flight at once')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='seconds over which sessions start')
+    parser.add_argument('--think-time', type=float, default=0.5, help='max seconds a user pauses between turns')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--mongo-uri', help='report Mongo ops per turn from this server\'s opcounters')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='print the summary as JSON')
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == '__main__':
+    main()
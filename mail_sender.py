@@ -0,0 +1,124 @@
+"""
+Background email delivery for OrbitX
+
+Form submissions used to wait for an SMTP connect, TLS handshake, login
+and send inside the request. Messages are now handed to an EmailSender
+that delivers them from a background thread over one Flask-Mail
+connection (``mail.connect()``): a burst of messages shares a single
+authenticated session, which stays open for MAIL_KEEPALIVE seconds after
+the last message in case more arrive. Transient SMTP failures reconnect
+and retry with backoff; permanent ones (rejected recipients, 5xx replies)
+are logged and dropped.
+"""
+
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an SMTP failure is worth retrying on a fresh connection"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return False
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class EmailSender:
+    """Send Flask-Mail messages from a background thread over a shared SMTP connection"""
+
+    def __init__(self, mail, app, keepalive: float = 10.0, max_attempts: int = 3,
+                 retry_backoff: float = 2.0, max_queue: int = 1000):
+        self.mail = mail
+        self.app = app
+        self.keepalive = keepalive
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {'queued': 0, 'sent': 0, 'retried': 0, 'dropped': 0, 'connections': 0}
+        self._thread = threading.Thread(target=self._run, name='email-sender', daemon=True)
+        self._thread.start()
+
+    def send(self, message) -> bool:
+        """Queue a message for delivery; False if the queue is full"""
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            logger.error(f"Email queue full, dropping message: {message.subject}")
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            pending = [[self._queue.get(), 0]]
+            with self.app.app_context():
+                self._deliver(pending)
+
+    def _deliver(self, pending):
+        """Send ``pending`` and anything queued meanwhile, reconnecting on failures"""
+        while pending:
+            try:
+                with self.mail.connect() as connection:
+                    self._count('connections')
+                    while True:
+                        while pending:
+                            message = pending[0][0]
+                            try:
+                                connection.send(message)
+                                self._count('sent')
+                            except Exception as e:
+                                if is_transient(e):
+                                    raise
+                                # The session is still usable for the rest of the burst
+                                logger.error(f"Email '{message.subject}' rejected: {e}")
+                                self._count('dropped')
+                            pending.pop(0)
+                        # Keep the session open briefly for the rest of a burst
+                        try:
+                            pending.append([self._queue.get(timeout=self.keepalive), 0])
+                        except queue.Empty:
+                            return
+            except Exception as e:
+                if not pending:
+                    # Only closing the connection failed; everything was sent
+                    return
+                entry = pending[0]
+                entry[1] += 1
+                if entry[1] >= self.max_attempts:
+                    logger.error(f"Failed to send email '{entry[0].subject}' after {entry[1]} attempts: {e}")
+                    pending.pop(0)
+                    self._count('dropped')
+                    continue
+                logger.warning(f"Email send failed, reconnecting (attempt {entry[1]}): {e}")
+                self._count('retried')
+                time.sleep(self.retry_backoff * 2 ** (entry[1] - 1))
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+def build_email_sender(mail, app) -> EmailSender:
+    """Build the background email sender from environment configuration"""
+    return EmailSender(
+        mail, app,
+        keepalive=float(os.environ.get('MAIL_KEEPALIVE', 10)),
+        max_attempts=int(os.environ.get('MAIL_SEND_ATTEMPTS', 3)),
+        retry_backoff=float(os.environ.get('MAIL_RETRY_BACKOFF', 2))
+    )
@@ -0,0 +1,188 @@
+"""
+Compiled message analyzer for the OrbitX chatbot
+
+Detects services, quote intent, quote confirmations and contact details
+(email, phone, name) with one keyword scan per message. Every keyword is
+compiled into a single trie-shaped regex scanned with a lookahead, which
+finds every occurrence, including keywords nested inside longer ones, so
+results match the old per-keyword ``in`` checks. The keyword scan also
+decides which precompiled contact patterns need to run at all.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Default service synonyms, extended at runtime from the services catalog
+SERVICE_KEYWORDS = {
+    'logo': ['logo', 'brand mark', 'brand identity'],
+    'website': ['website', 'web design', 'site', 'online presence'],
+    'social media': ['social media', 'instagram', 'facebook', 'social posts'],
+    'branding': ['branding', 'brand package', 'brand identity', 'visual identity'],
+    'packaging': ['packaging', 'product packaging', 'box design'],
+    'print': ['print', 'brochure', 'flyer', 'business card', 'stationery']
+}
+
+# Quote trigger keywords
+QUOTE_KEYWORDS = [
+    'quote', 'price', 'pricing', 'cost', 'how much', 'estimate',
+    'proposal', 'budget', 'charge', 'fee', 'rates'
+]
+
+# Phrases confirming that the user wants a quote created
+QUOTE_CONFIRMATIONS = ['yes', 'create quote', 'generate quote', 'proceed', 'go ahead']
+
+# Words dropped from catalog service names to get their keyword phrase
+GENERIC_SERVICE_WORDS = {'design', 'development', 'solutions', 'services', 'service', '&', 'and'}
+
+# Name phrases, in priority order; the keyword scan tells us when to look for a name
+NAME_PHRASES = ['my name is', "i'm", 'i am', 'call me']
+
+# Contact patterns, in priority order within each kind
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+PHONE_PATTERNS = [
+    re.compile(r'(\+91[\s\-]?\d{10})'),
+    re.compile(r'(\d{10})'),
+    re.compile(r'(\d{3}[\s\-]?\d{3}[\s\-]?\d{4})')
+]
+NAME_PATTERNS = [re.compile(re.escape(phrase) + r' (\w+)') for phrase in NAME_PHRASES]
+DIGIT_RUN = re.compile(r'\d{3}')
+
+QUOTE_TAG = ('quote', None)
+CONFIRM_TAG = ('confirm', None)
+NAME_TAG = ('name', None)
+
+
+def build_trie_pattern(keywords: Iterable[str]) -> str:
+    """Build a regex matching any keyword, factored into a prefix trie
+
+    At each position the regex engine follows a single branch of the trie
+    instead of trying every keyword, and greedy optional suffixes make it
+    report the longest keyword starting there.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def emit(node):
+        terminal = '' in node
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return emit(trie)
+
+
+class MessageAnalyzer:
+    """Single-pass intent, service and contact extraction"""
+
+    def __init__(self, service_keywords: Dict[str, List[str]] = None,
+                 quote_keywords: Iterable[str] = None,
+                 confirmations: Iterable[str] = None):
+        self.service_keywords = {
+            service: list(keywords)
+            for service, keywords in (service_keywords or SERVICE_KEYWORDS).items()
+        }
+        self.quote_keywords = list(quote_keywords or QUOTE_KEYWORDS)
+        self.confirmations = list(confirmations or QUOTE_CONFIRMATIONS)
+        self._compile()
+
+    @classmethod
+    def from_catalog(cls, services: Iterable[Dict]) -> 'MessageAnalyzer':
+        """Build an analyzer whose service keywords include the services catalog"""
+        service_keywords = {service: list(keywords) for service, keywords in SERVICE_KEYWORDS.items()}
+
+        for service in services:
+            name = (service.get('name') or '').strip().lower()
+            if not name:
+                continue
+            phrase = ' '.join(word for word in name.split() if word not in GENERIC_SERVICE_WORDS) or name
+
+            # Attach the catalog name to every service it already describes
+            targets = [
+                key for key, keywords in service_keywords.items()
+                if phrase == key or phrase in keywords
+            ]
+            if not targets:
+                service_keywords[phrase] = []
+                targets = [phrase]
+
+            for key in targets:
+                for keyword in (phrase, name):
+                    if keyword not in service_keywords[key]:
+                        service_keywords[key].append(keyword)
+
+        return cls(service_keywords=service_keywords)
+
+    def _compile(self):
+        tags = {}
+        for service, keywords in self.service_keywords.items():
+            for keyword in keywords:
+                tags.setdefault(keyword.lower(), set()).add(('service', service))
+        for keyword in self.quote_keywords:
+            tags.setdefault(keyword.lower(), set()).add(QUOTE_TAG)
+        for keyword in self.confirmations:
+            tags.setdefault(keyword.lower(), set()).add(CONFIRM_TAG)
+        for phrase in NAME_PHRASES:
+            tags.setdefault(phrase, set()).add(NAME_TAG)
+
+        # A match on a keyword implies every keyword nested inside it
+        self._tags = {
+            keyword: set().union(*(tags[other] for other in tags if other in keyword))
+            for keyword in tags
+        }
+
+        # The leading character class lets the engine skip positions no keyword starts at
+        first_chars = re.escape(''.join(sorted({keyword[0] for keyword in tags})))
+        self._keyword_pattern = re.compile(f'(?=[{first_chars}])(?=({build_trie_pattern(tags)}))')
+
+        # Service order follows the keyword table, as the per-service loop did
+        self._service_order = {service: index for index, service in enumerate(self.service_keywords)}
+
+    def analyze(self, message: str) -> Dict:
+        """Extract services, intent flags and contact details from a message"""
+        found = set()
+        for match in self._keyword_pattern.finditer(message.lower()):
+            found |= self._tags[match.group(1)]
+
+        services = sorted(
+            (service for kind, service in found if kind == 'service'),
+            key=self._service_order.__getitem__
+        )
+
+        # Contact patterns only run when the message can contain a match
+        email_match = EMAIL_PATTERN.search(message) if '@' in message else None
+        email = email_match.group() if email_match else None
+
+        phone = None
+        if DIGIT_RUN.search(message):
+            phone = self._first_match(PHONE_PATTERNS, message, group=0)
+
+        name = None
+        if NAME_TAG in found:
+            name = self._first_match(NAME_PATTERNS, message.lower(), group=1)
+
+        return {
+            'services': services,
+            'wants_quote': QUOTE_TAG in found,
+            'confirms_quote': CONFIRM_TAG in found,
+            'email': email,
+            'phone': phone,
+            'name': name,
+            'has_contact_info': email is not None or '@' in message
+        }
+
+    @staticmethod
+    def _first_match(patterns: List, text: str, group: int) -> Optional[str]:
+        """Return the match of the first pattern, in priority order, that matches ``text``"""
+        for pattern in patterns:
+            match = pattern.search(text)
+            if match:
+                return match.group(group)
+        return None
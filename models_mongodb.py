@@ -5,9 +5,11 @@ This file replaces the SQLAlchemy models with MongoDB document structure.
 Using PyMongo for database operations.
 """
 
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Any
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 import json
 
 class MongoModel:
@@ -131,12 +133,31 @@ class QuoteRequestModel(MongoModel):
 
     def __init__(self, mongo_db):
         super().__init__('quote_requests', mongo_db)
+        self.listeners = []
 
     def create_quote_request(self, client_name: str, email: str, project_description: str,
                            phone: str = None, company_name: str = None, services_requested: str = None,
                            budget_range: str = None, timeline: str = None,
                            additional_requirements: str = None, status: str = 'pending') -> str:
         """Create a new quote request"""
+        return self.insert_quote_request(
+            client_name=client_name, email=email, project_description=project_description,
+            phone=phone, company_name=company_name, services_requested=services_requested,
+            budget_range=budget_range, timeline=timeline,
+            additional_requirements=additional_requirements, status=status
+        )['id']
+
+    def insert_quote_request(self, client_name: str, email: str, project_description: str,
+                             phone: str = None, company_name: str = None, services_requested: str = None,
+                             budget_range: str = None, timeline: str = None,
+                             additional_requirements: str = None, status: str = 'pending',
+                             notification: str = None, notification_payload: dict = None) -> dict:
+        """Create a new quote request and return the stored document (no re-read needed)
+
+        ``notification`` names the job that notifies the team. It is written
+        as a pending outbox entry in the same insert as the quote, so the
+        notification can't be lost between saving the quote and queueing it.
+        """
         quote_doc = {
             'client_name': client_name,
             'email': email,
@@ -150,12 +171,115 @@ class QuoteRequestModel(MongoModel):
             'status': status,
             'created_at': datetime.utcnow()
         }
-        return self.insert_one(quote_doc)
+        if notification:
+            quote_doc['notification'] = {
+                'job_type': notification,
+                'payload': notification_payload or {},
+                'status': 'pending'
+            }
+        quote_doc['id'] = self.insert_one(quote_doc)
+        if notification:
+            for listener in self.listeners:
+                listener()
+        return quote_doc
 
     def get_by_id(self, quote_id: str) -> Optional[dict]:
         """Get quote request by ID"""
         return self.find_one({'_id': quote_id})
 
+    def save_analysis(self, quote_id: str, analysis: dict, analysis_hash: str = None) -> bool:
+        """Store the AI analysis on a quote request
+
+        ``analysis_hash`` is only set for model results, so fallback analyses
+        are never reused for other submissions.
+        """
+        fields = {'ai_analysis': analysis, 'analyzed_at': datetime.utcnow()}
+        if analysis_hash:
+            fields['analysis_hash'] = analysis_hash
+        return self.update_one({'_id': quote_id}, fields)
+
+    def find_analysis_by_hash(self, analysis_hash: str) -> Optional[dict]:
+        """Get the most recent stored analysis of a quote with the same content"""
+        doc = self.collection.find_one(
+            {'analysis_hash': analysis_hash}, {'ai_analysis': 1},
+            sort=[('created_at', -1)]
+        )
+        return doc.get('ai_analysis') if doc else None
+
+    def pending_notifications(self, limit: int = 100) -> List[dict]:
+        """Oldest quotes whose notification outbox entry hasn't been relayed yet"""
+        return list(self.collection.find(
+            {'notification.status': 'pending'}, {'notification': 1}
+        ).sort('created_at', 1).limit(limit))
+
+    def mark_notifications_sent(self, quote_ids: List) -> int:
+        """Mark outbox entries as relayed to the job queue"""
+        result = self.collection.update_many(
+            {'_id': {'$in': quote_ids}, 'notification.status': 'pending'},
+            {'$set': {'notification.status': 'sent', 'notification.sent_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
+    def record_notification(self, quote_ids: List[str], channel: str, result: dict) -> int:
+        """Append a notification outcome to each quote's ``notifications`` history
+
+        A successful notification also moves ``pending`` quotes to ``notified``,
+        so ``pending`` quotes are exactly the ones the team hasn't heard about.
+        """
+        outcome = {
+            'channel': channel,
+            'success': result.get('success', False),
+            'message_sid': result.get('message_sid'),
+            'status': result.get('status'),
+            'error': result.get('error'),
+            'attempts': result.get('attempts'),
+            'sent_at': datetime.utcnow()
+        }
+        object_ids = [ObjectId(quote_id) if isinstance(quote_id, str) else quote_id for quote_id in quote_ids]
+        update = self.collection.update_many(
+            {'_id': {'$in': object_ids}},
+            {'$push': {'notifications': outcome}, '$set': {'updated_at': outcome['sent_at']}}
+        )
+        if outcome['success']:
+            self.collection.update_many(
+                {'_id': {'$in': object_ids}, 'status': 'pending'},
+                {'$set': {'status': 'notified'}}
+            )
+        return update.modified_count
+
+    def queue_for_digest(self, quote_id: str, priority: int) -> bool:
+        """Hold a quote's notification for the next digest"""
+        return self.update_one({'_id': quote_id}, {
+            'notification_digest': 'pending',
+            'digest_priority': priority,
+            'digest_queued_at': datetime.utcnow()
+        })
+
+    def claim_digest(self, digest_id: str) -> List[dict]:
+        """Assign every pending quote to a digest and return its quotes, highest priority first
+
+        Claiming again with the same ``digest_id`` (a retried digest) returns
+        the quotes it already holds plus any that arrived since.
+        """
+        self.collection.update_many(
+            {'notification_digest': 'pending'},
+            {'$set': {'notification_digest': digest_id}}
+        )
+        quotes = list(self.collection.find({'notification_digest': digest_id}).sort(
+            [('digest_priority', -1), ('created_at', 1)]
+        ))
+        for quote in quotes:
+            quote['id'] = str(quote['_id'])
+        return quotes
+
+    def finish_digest(self, digest_id: str) -> int:
+        """Mark the quotes of a delivered digest as notified"""
+        result = self.collection.update_many(
+            {'notification_digest': digest_id},
+            {'$set': {'notification_digest': 'sent', 'digest_sent_at': datetime.utcnow()}}
+        )
+        return result.modified_count
+
 class TestimonialModel(MongoModel):
     """Testimonial model for MongoDB"""
 
@@ -293,6 +417,73 @@ class ChatConversationModel(MongoModel):
         result = self.collection.insert_one(conversation_doc)
         return conversation_id
 
+    def get_by_id(self, conversation_id: str) -> Optional[dict]:
+        """Get conversation by its string ID"""
+        # Conversation IDs are client-generated strings, not ObjectIds
+        doc = self.collection.find_one({'_id': conversation_id})
+        if doc:
+            doc['id'] = doc['_id']
+        return doc
+
+    def get_or_create(self, conversation_id: str, user_session_id: str = None,
+                      user_name: str = None, user_email: str = None, user_phone: str = None) -> dict:
+        """Get a conversation, creating it if missing, in a single round trip"""
+        now = datetime.utcnow()
+        doc = self.collection.find_one_and_update(
+            {'_id': conversation_id},
+            {'$setOnInsert': {
+                'user_session_id': user_session_id,
+                'user_name': user_name,
+                'user_email': user_email,
+                'user_phone': user_phone,
+                'status': 'active',
+                'context': {},
+                'recent_messages': [],
+                'summary': None,
+                'quote_request_id': None,
+                'version': 0,
+                'created_at': now,
+                'updated_at': now
+            }},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        doc['id'] = doc['_id']
+        return doc
+
+    def turn_update(self, conversation_id: str, context_changes: dict, messages: List[dict],
+                    recent_limit: int = 10, quote_request_id: str = None,
+                    summary: str = None, services: List[str] = None,
+                    version: int = None) -> UpdateOne:
+        """Build the single write that records a chat turn on the conversation
+
+        Sets only the context fields the turn changed and adds any new
+        services, so a worker holding an older copy of the conversation
+        cannot erase what another worker recorded. Also saves the running
+        summary, pushes the turn's messages onto the embedded recent-message
+        window (trimmed to ``recent_limit`` entries) and bumps ``version``.
+        With ``version``, the write only matches while the conversation is
+        still at that version.
+        """
+        update = {f'context.{key}': value for key, value in context_changes.items()}
+        update['updated_at'] = datetime.utcnow()
+        if quote_request_id:
+            update['quote_request_id'] = quote_request_id
+        if summary:
+            update['summary'] = summary
+        operations = {
+            '$set': update,
+            '$push': {'recent_messages': {'$each': messages, '$slice': -recent_limit}},
+            '$inc': {'version': 1}
+        }
+        if services:
+            operations['$addToSet'] = {'context.services_interested': {'$each': services}}
+        query = {'_id': conversation_id}
+        if version is not None:
+            # Conversations created before the counter was added have no version field
+            query['version'] = version if version else {'$in': [0, None]}
+        return UpdateOne(query, operations)
+
 class ChatMessageModel(MongoModel):
     """Chat Message model for MongoDB"""
 
@@ -302,7 +493,18 @@ class ChatMessageModel(MongoModel):
     def create_message(self, conversation_id: str, sender: str, message: str,
                       message_type: str = 'text', message_metadata: str = None) -> str:
         """Create a new chat message"""
-        message_doc = {
+        return self.insert_one(self.build_message(conversation_id, sender, message,
+                                                  message_type, message_metadata))
+
+    def build_message(self, conversation_id: str, sender: str, message: str,
+                      message_type: str = 'text', message_metadata: str = None) -> dict:
+        """Build a chat message document for batched inserts
+
+        The id is assigned up front so it can be returned to the widget
+        before the write-behind insert has run.
+        """
+        return {
+            '_id': ObjectId(),
             'conversation_id': conversation_id,
             'sender': sender,
             'message': message,
@@ -310,13 +512,189 @@ class ChatMessageModel(MongoModel):
             'message_metadata': message_metadata,
             'created_at': datetime.utcnow()
         }
-        return self.insert_one(message_doc)
 
     def get_by_conversation(self, conversation_id: str, limit: int = None) -> List[dict]:
         """Get messages by conversation ID"""
         return self.find({'conversation_id': conversation_id}, limit=limit,
                         sort_by='created_at', sort_order=1)  # Ascending for chat history
 
+    def get_since(self, conversation_id: str, since_id: str = None) -> Optional[List[dict]]:
+        """Get the messages of a conversation after ``since_id``, oldest first
+
+        Served from the (conversation_id, created_at) index. Returns None if
+        ``since_id`` is not a message of this conversation, so the caller can
+        fall back to the full history.
+        """
+        projection = {'sender': 1, 'message': 1, 'message_type': 1, 'created_at': 1}
+        filter_dict = {'conversation_id': conversation_id}
+
+        if since_id:
+            if not ObjectId.is_valid(since_id):
+                return None
+            since_oid = ObjectId(since_id)
+            anchor = self.collection.find_one(
+                {'_id': since_oid, 'conversation_id': conversation_id}, {'created_at': 1}
+            )
+            if not anchor:
+                return None
+            filter_dict['$or'] = [
+                {'created_at': {'$gt': anchor['created_at']}},
+                {'created_at': anchor['created_at'], '_id': {'$gt': since_oid}}
+            ]
+
+        cursor = self.collection.find(filter_dict, projection).sort([('created_at', 1), ('_id', 1)])
+        return list(cursor)
+
+    def get_latest_id(self, conversation_id: str) -> Optional[str]:
+        """Get the id of the newest message of a conversation"""
+        doc = self.collection.find_one(
+            {'conversation_id': conversation_id}, {'_id': 1},
+            sort=[('created_at', -1), ('_id', -1)]
+        )
+        return str(doc['_id']) if doc else None
+
+    def get_recent(self, conversation_id: str, limit: int = 10) -> List[dict]:
+        """Get the most recent messages of a conversation, oldest first"""
+        messages = self.find({'conversation_id': conversation_id}, limit=limit,
+                             sort_by='created_at', sort_order=-1)
+        return list(reversed(messages))
+
+class JobModel(MongoModel):
+    """Durable background job queue for MongoDB
+
+    Jobs are claimed atomically with ``find_one_and_update``. A claimed job
+    holds a lease until ``lease_expires_at``; if its worker dies the lease
+    runs out and another worker picks the job up again.
+    """
+
+    def __init__(self, mongo_db):
+        super().__init__('jobs', mongo_db)
+        self.listeners = []
+
+    def enqueue(self, job_type: str, payload: dict, max_attempts: int = 5, delay: float = 0,
+                dedupe_key: str = None, job_id: str = None) -> Optional[str]:
+        """Queue a job and wake any in-process workers
+
+        With ``dedupe_key``, the job is only added if no job with the same
+        key is still queued; the id of the queued job is returned either way.
+        With ``job_id``, the job is only ever added once, whatever its status.
+        """
+        now = datetime.utcnow()
+        job_doc = {
+            'type': job_type,
+            'payload': payload,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': max_attempts,
+            'run_at': now + timedelta(seconds=delay),
+            'lease_expires_at': None,
+            'locked_by': None,
+            'last_error': None,
+            'created_at': now
+        }
+        if job_id is not None:
+            job_doc['_id'] = job_id
+            try:
+                self.insert_one(job_doc)
+            except DuplicateKeyError:
+                return job_id
+        elif dedupe_key is None:
+            job_id = self.insert_one(job_doc)
+        else:
+            job_doc['dedupe_key'] = dedupe_key
+            try:
+                job = self.collection.find_one_and_update(
+                    {'dedupe_key': dedupe_key, 'status': 'queued'},
+                    {'$setOnInsert': job_doc},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # Another process queued it first
+                job = self.collection.find_one({'dedupe_key': dedupe_key, 'status': 'queued'})
+            if job is None:
+                return None
+            job_id = str(job['_id'])
+        for listener in self.listeners:
+            listener()
+        return job_id
+
+    def claim(self, worker_id: str, visibility_timeout: float, job_types: List[str] = None) -> Optional[dict]:
+        """Atomically claim the next due job, or one whose lease has expired"""
+        now = datetime.utcnow()
+        filter_dict = {'$or': [
+            {'status': 'queued', 'run_at': {'$lte': now}},
+            {'status': 'running', 'lease_expires_at': {'$lte': now}}
+        ]}
+        if job_types:
+            filter_dict['type'] = {'$in': job_types}
+
+        return self.collection.find_one_and_update(
+            filter_dict,
+            {
+                '$set': {
+                    'status': 'running',
+                    'locked_by': worker_id,
+                    'lease_expires_at': now + timedelta(seconds=visibility_timeout),
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('run_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def complete(self, job_id, worker_id: str) -> bool:
+        """Mark a job done, unless its lease was lost to another worker"""
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'locked_by': worker_id},
+            {'$set': {'status': 'done', 'completed_at': now, 'updated_at': now, 'lease_expires_at': None}}
+        )
+        return result.modified_count > 0
+
+    def retry(self, job_id, worker_id: str, error: str, delay: float) -> bool:
+        """Put a failed job back in the queue to run again after ``delay`` seconds"""
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'locked_by': worker_id},
+            {'$set': {
+                'status': 'queued',
+                'run_at': now + timedelta(seconds=delay),
+                'last_error': error,
+                'lease_expires_at': None,
+                'locked_by': None,
+                'updated_at': now
+            }}
+        )
+        return result.modified_count > 0
+
+    def fail(self, job_id, worker_id: str, error: str) -> bool:
+        """Give up on a job after its last attempt"""
+        now = datetime.utcnow()
+        result = self.collection.update_one(
+            {'_id': job_id, 'status': 'running', 'locked_by': worker_id},
+            {'$set': {'status': 'failed', 'last_error': error, 'lease_expires_at': None,
+                      'completed_at': now, 'updated_at': now}}
+        )
+        return result.modified_count > 0
+
+    def active_quote_ids(self, quote_ids: List[str]) -> set:
+        """Which of ``quote_ids`` still have a queued or running job"""
+        return {
+            doc['payload']['quote_id'] for doc in self.collection.find(
+                {'status': {'$in': ['queued', 'running']}, 'payload.quote_id': {'$in': quote_ids}},
+                {'payload.quote_id': 1}
+            )
+        }
+
+    def status_counts(self) -> Dict[str, int]:
+        """Number of jobs in each status"""
+        return {
+            doc['_id']: doc['count']
+            for doc in self.collection.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}])
+        }
+
 # Database Models Manager
 class DatabaseModels:
     """Manager class for all MongoDB models"""
@@ -333,6 +711,7 @@ class DatabaseModels:
         self.portfolio = PortfolioModel(mongo_db)
         self.chat_conversations = ChatConversationModel(mongo_db)
         self.chat_messages = ChatMessageModel(mongo_db)
+        self.jobs = JobModel(mongo_db)
 
     def get_service_by_id(self, service_id: str) -> Optional[dict]:
         """Get service by ID - compatibility method"""
@@ -354,6 +733,9 @@ class DatabaseModels:
             self.quote_requests.collection.create_index([("email", 1)])
             self.quote_requests.collection.create_index([("status", 1)])
             self.quote_requests.collection.create_index([("created_at", -1)])
+            self.quote_requests.collection.create_index([("analysis_hash", 1)], sparse=True)
+            self.quote_requests.collection.create_index([("notification_digest", 1)], sparse=True)
+            self.quote_requests.collection.create_index([("notification.status", 1), ("created_at", 1)], sparse=True)
 
             # Blog posts indexes
             self.blog_posts.collection.create_index([("slug", 1)], unique=True)
@@ -366,9 +748,18 @@ class DatabaseModels:
 
             # Chat indexes
             self.chat_conversations.collection.create_index([("user_session_id", 1)])
-            self.chat_messages.collection.create_index([("conversation_id", 1)])
+            self.chat_messages.collection.create_index([("conversation_id", 1), ("created_at", 1)])
             self.chat_messages.collection.create_index([("created_at", 1)])
 
+            # Job queue indexes; finished jobs are kept for a week
+            self.jobs.collection.create_index([("status", 1), ("run_at", 1)])
+            self.jobs.collection.create_index([("status", 1), ("lease_expires_at", 1)])
+            self.jobs.collection.create_index([("completed_at", 1)], expireAfterSeconds=7 * 24 * 3600)
+            self.jobs.collection.create_index(
+                [("dedupe_key", 1)], unique=True,
+                partialFilterExpression={"status": "queued", "dedupe_key": {"$exists": True}}
+            )
+
             print("MongoDB indexes created successfully!")
 
         except Exception as e:
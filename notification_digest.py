@@ -0,0 +1,74 @@
+"""
+Coalesced quote notification digests
+
+Every quote used to trigger its own SMS or WhatsApp notification, so a
+promotion meant dozens of separate Twilio calls a minute. Quotes below
+NOTIFICATION_IMMEDIATE_PRIORITY are now held on the quote document and a
+single ``quote_digest`` job, queued when the first quote of a window
+arrives, sends one message listing every held quote by AI priority after
+NOTIFICATION_DIGEST_WINDOW seconds. High-priority quotes still go out on
+their own straight away. A window of 0 turns digests off.
+"""
+
+import os
+import uuid
+from typing import Dict, List
+
+DIGEST_JOB_TYPE = 'quote_digest'
+
+# Twilio concatenates SMS bodies up to 1600 characters
+MAX_DIGEST_LENGTH = 1500
+
+
+class NotificationDigest:
+    """Hold low-priority quote notifications and send them as one digest"""
+
+    def __init__(self, quote_requests, jobs, window: float = 300, immediate_priority: int = 8):
+        self.quote_requests = quote_requests
+        self.jobs = jobs
+        self.window = window
+        self.immediate_priority = immediate_priority
+
+    def defer(self, quote_id: str, priority: int) -> bool:
+        """Add a quote to the pending digest; False if it should be notified now"""
+        if self.window <= 0 or priority >= self.immediate_priority:
+            return False
+        self.quote_requests.queue_for_digest(quote_id, priority)
+        # One digest job per window; later quotes join the queued one
+        self.jobs.enqueue(DIGEST_JOB_TYPE, {'digest_id': f"digest_{uuid.uuid4().hex}"},
+                          delay=self.window, dedupe_key=DIGEST_JOB_TYPE)
+        return True
+
+    def claim(self, digest_id: str) -> List[Dict]:
+        return self.quote_requests.claim_digest(digest_id)
+
+    def finish(self, digest_id: str) -> int:
+        return self.quote_requests.finish_digest(digest_id)
+
+
+def build_digest_message(quotes: List[Dict]) -> str:
+    """One message listing the quotes, highest priority first"""
+    header = f"OrbitX QUOTE DIGEST - {len(quotes)} new quote{'s' if len(quotes) != 1 else ''}\n"
+    lines = []
+    length = len(header)
+    for index, quote in enumerate(quotes, 1):
+        line = (f"\n{index}. [P{quote.get('digest_priority', 5)}] {quote.get('client_name')} - "
+                f"{quote.get('services_requested') or 'Service not specified'}"
+                f" - {quote.get('budget_range') or 'Budget not specified'}"
+                f"\n   {quote.get('email')}")
+        remaining = len(quotes) - index + 1
+        if length + len(line) > MAX_DIGEST_LENGTH - 40 and remaining > 1:
+            lines.append(f"\n... and {remaining} more in the admin panel")
+            break
+        lines.append(line)
+        length += len(line)
+    return header + ''.join(lines)
+
+
+def build_notification_digest(quote_requests, jobs) -> NotificationDigest:
+    """Build the notification digest from environment configuration"""
+    return NotificationDigest(
+        quote_requests, jobs,
+        window=float(os.environ.get('NOTIFICATION_DIGEST_WINDOW', 300)),
+        immediate_priority=int(os.environ.get('NOTIFICATION_IMMEDIATE_PRIORITY', 8))
+    )
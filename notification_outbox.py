@@ -0,0 +1,104 @@
+"""
+Transactional outbox for quote notifications
+
+A quote's notification is written as a pending ``notification`` entry in
+the same insert as the quote itself (see
+QuoteRequestModel.insert_quote_request), so there is no window where the
+quote exists but its notification was never queued. NotificationOutbox
+tails those entries in batches, turns each into a job whose id is derived
+from the quote id, and marks the entries sent.
+
+Relaying is idempotent: if a relay crashes after queueing but before
+marking, or two relays read the same batch, the second insert of the
+same job id is ignored, so a quote is notified at most once per job type.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def notification_job_id(job_type: str, quote_id) -> str:
+    """Job id for a quote's notification, shared by every relay attempt"""
+    return f"{job_type}:{quote_id}"
+
+
+class NotificationOutbox:
+    """Relay pending quote notifications from the outbox to the job queue"""
+
+    def __init__(self, quote_requests, jobs, batch_size: int = 100, poll_interval: float = 1.0):
+        self.quote_requests = quote_requests
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._thread = None
+        self._stopping = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'relayed': 0, 'batches': 0, 'errors': 0}
+        quote_requests.listeners.append(self.wake)
+
+    def relay_batch(self) -> int:
+        """Queue jobs for up to ``batch_size`` pending entries; returns how many were relayed"""
+        entries = self.quote_requests.pending_notifications(limit=self.batch_size)
+        if not entries:
+            return 0
+
+        for entry in entries:
+            notification = entry['notification']
+            self.jobs.enqueue(
+                notification['job_type'],
+                {'quote_id': str(entry['_id']), **notification.get('payload', {})},
+                job_id=notification_job_id(notification['job_type'], entry['_id'])
+            )
+        relayed = self.quote_requests.mark_notifications_sent([entry['_id'] for entry in entries])
+
+        with self._lock:
+            self._stats['relayed'] += relayed
+            self._stats['batches'] += 1
+        return len(entries)
+
+    def start(self):
+        """Start relaying in a background thread (once)"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='notification-outbox', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wake(self):
+        """Relay now instead of at the next poll, e.g. right after a quote is saved"""
+        self._wakeup.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                # Keep draining while batches come back full
+                if self.relay_batch() >= self.batch_size:
+                    continue
+            except Exception as e:
+                logger.error(f"Notification outbox relay failed: {e}")
+                with self._lock:
+                    self._stats['errors'] += 1
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+
+def build_notification_outbox(quote_requests, jobs) -> NotificationOutbox:
+    """Build the notification outbox relay from environment configuration"""
+    return NotificationOutbox(
+        quote_requests, jobs,
+        batch_size=int(os.environ.get('NOTIFICATION_OUTBOX_BATCH_SIZE', 100)),
+        poll_interval=float(os.environ.get('NOTIFICATION_OUTBOX_POLL_INTERVAL', 1))
+    )
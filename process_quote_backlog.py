@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Bulk processing of pending quote requests
+
+When the AI or SMS provider is down, quotes stay in ``quote_requests``
+with ``status: 'pending'`` (a successful notification moves them to
+``notified``). This tool works through that backlog using the same
+pieces as the live pipeline (AIEnhancedSMS, the shared analysis engine
+and the SMS dispatcher):
+
+- pending quotes are streamed from a Mongo cursor in chunks, oldest first,
+- each chunk is analyzed concurrently with asyncio.gather under a
+  semaphore (quotes with a stored analysis are not re-analyzed),
+- the team gets one digest SMS per --digest-size quotes, or one SMS per
+  quote with --mode individual,
+- analyses, notification outcomes and statuses are written back with one
+  bulk_write per chunk,
+- progress is checkpointed in ``backlog_checkpoints`` after every chunk,
+  so an interrupted run resumes where it stopped (--restart starts over).
+  A run that gets through the whole backlog clears its checkpoint, so
+  the next run retries quotes whose SMS failed or that were skipped.
+
+Quotes newer than --min-age-minutes are left to the live pipeline, and
+so are quotes it still owns: an outbox entry not yet relayed, a hold for
+a digest, or a queued or retrying notification job. The live job handlers
+skip quotes that are no longer pending, so a quote is notified once.
+
+Run with: python process_quote_backlog.py --concurrency 20 --mode digest
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from models_mongodb import JobModel, QuoteRequestModel
+from notification_digest import build_digest_message
+from quote_analyzer import is_fallback, quote_content_hash
+from twilio_sms_integration import AIEnhancedSMS
+
+# Load environment
+load_dotenv()
+
+
+class BacklogProcessor:
+    """Analyze, notify and update pending quotes chunk by chunk"""
+
+    def __init__(self, quote_requests: QuoteRequestModel, jobs: JobModel, checkpoints, run_name: str, mode: str = 'digest',
+                 concurrency: int = 10, chunk_size: int = 200, digest_size: int = 20,
+                 min_age_minutes: float = 15, dry_run: bool = False):
+        self.quote_requests = quote_requests
+        self.jobs = jobs
+        self.checkpoints = checkpoints
+        self.run_name = run_name
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.digest_size = digest_size
+        self.min_age_minutes = min_age_minutes
+        self.dry_run = dry_run
+        self.sms = AIEnhancedSMS()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.totals = {'processed': 0, 'analyzed': 0, 'notified': 0, 'failed': 0, 'skipped': 0, 'chunks': 0}
+
+    async def run(self, restart: bool = False, limit: int = None) -> Dict:
+        if restart and not self.dry_run:
+            await asyncio.to_thread(self.checkpoints.delete_one, {'_id': self.run_name})
+        checkpoint = await asyncio.to_thread(self.checkpoints.find_one, {'_id': self.run_name})
+
+        query = {
+            'status': 'pending',
+            'created_at': {'$lt': datetime.utcnow() - timedelta(minutes=self.min_age_minutes)},
+            # Not yet relayed from the outbox, or held for a digest
+            'notification.status': {'$ne': 'pending'},
+            'notification_digest': {'$in': [None, 'sent']}
+        }
+        if checkpoint and not restart:
+            query['_id'] = {'$gt': checkpoint['last_id']}
+            print(f"Resuming after quote {checkpoint['last_id']} ({checkpoint.get('processed', 0)} already processed)")
+
+        cursor = self.quote_requests.collection.find(query).sort('_id', 1).batch_size(self.chunk_size)
+        if limit:
+            cursor = cursor.limit(limit)
+
+        read = 0
+        try:
+            while True:
+                chunk = await asyncio.to_thread(self._next_chunk, cursor)
+                if not chunk:
+                    break
+                read += len(chunk)
+                await self.process_chunk(chunk)
+                processed = (checkpoint or {}).get('processed', 0) + self.totals['processed']
+                print(f"Chunk {self.totals['chunks']}: {len(chunk)} quotes, "
+                      f"{self.totals['notified']} notified, {self.totals['failed']} failed, {processed} total")
+        finally:
+            cursor.close()
+
+        # The checkpoint only resumes interrupted runs; quotes left pending are retried next time
+        if not self.dry_run and not (limit and read >= limit):
+            await asyncio.to_thread(self.checkpoints.delete_one, {'_id': self.run_name})
+        return self.totals
+
+    def _next_chunk(self, cursor) -> List[Dict]:
+        chunk = []
+        for quote in cursor:
+            quote['id'] = str(quote['_id'])
+            chunk.append(quote)
+            if len(chunk) >= self.chunk_size:
+                break
+        return chunk
+
+    async def process_chunk(self, chunk: List[Dict]):
+        # Quotes whose notification job is still queued or retrying belong to the job workers
+        active = await asyncio.to_thread(self.jobs.active_quote_ids, [quote['id'] for quote in chunk])
+        if active:
+            self.totals['skipped'] += len(active)
+            checkpoint_id = chunk[-1]['_id']
+            chunk = [quote for quote in chunk if quote['id'] not in active]
+            if not chunk:
+                if not self.dry_run:
+                    await asyncio.to_thread(self._save_checkpoint, checkpoint_id, 0)
+                self.totals['chunks'] += 1
+                return
+
+        analyses = await asyncio.gather(*(self._analyze(quote) for quote in chunk))
+        for quote, analysis in zip(chunk, analyses):
+            quote['ai_analysis'] = analysis
+
+        if self.dry_run:
+            outcomes = {quote['id']: None for quote in chunk}
+        elif self.mode == 'digest':
+            outcomes = await self._send_digests(chunk)
+        elif self.mode == 'individual':
+            results = await asyncio.gather(*(self._send_individual(quote) for quote in chunk))
+            outcomes = {quote['id']: result for quote, result in zip(chunk, results)}
+        else:
+            outcomes = {quote['id']: None for quote in chunk}
+
+        if not self.dry_run:
+            await asyncio.to_thread(self._write_chunk, chunk, outcomes)
+
+        self.totals['chunks'] += 1
+        self.totals['processed'] += len(chunk)
+        self.totals['notified'] += sum(1 for result in outcomes.values() if result and result['success'])
+        self.totals['failed'] += sum(1 for result in outcomes.values() if result and not result['success'])
+
+    async def _analyze(self, quote: Dict) -> Dict:
+        if quote.get('ai_analysis'):
+            return quote['ai_analysis']
+        async with self.semaphore:
+            analysis = await self.sms.analyze_quote_with_ai(quote)
+        quote['_new_analysis'] = True
+        self.totals['analyzed'] += 1
+        return analysis
+
+    async def _send_individual(self, quote: Dict) -> Dict:
+        async with self.semaphore:
+            return await self.sms.send_sms(self.sms.generate_sms_message(quote, quote['ai_analysis']))
+
+    async def _send_digests(self, chunk: List[Dict]) -> Dict[str, Dict]:
+        ranked = sorted(chunk, key=lambda quote: -quote['ai_analysis'].get('priority', 5))
+        groups = [ranked[start:start + self.digest_size] for start in range(0, len(ranked), self.digest_size)]
+        for quote in ranked:
+            quote['digest_priority'] = quote['ai_analysis'].get('priority', 5)
+
+        async def send(group):
+            async with self.semaphore:
+                return await self.sms.send_sms(build_digest_message(group))
+
+        results = await asyncio.gather(*(send(group) for group in groups))
+        return {quote['id']: result for group, result in zip(groups, results) for quote in group}
+
+    def _write_chunk(self, chunk: List[Dict], outcomes: Dict[str, Dict]):
+        """One bulk write for the chunk's analyses, notification outcomes and statuses, then the checkpoint"""
+        now = datetime.utcnow()
+        channel = 'sms_digest' if self.mode == 'digest' else 'sms'
+        operations = []
+        for quote in chunk:
+            fields = {'backlog_processed_at': now, 'updated_at': now}
+            if quote.get('_new_analysis'):
+                fields['ai_analysis'] = quote['ai_analysis']
+                fields['analyzed_at'] = now
+                if not is_fallback(quote['ai_analysis']):
+                    fields['analysis_hash'] = quote_content_hash(quote)
+
+            update = {'$set': fields}
+            result = outcomes.get(quote['id'])
+            if result is not None:
+                if result['success']:
+                    fields['status'] = 'notified'
+                update['$push'] = {'notifications': {
+                    'channel': channel,
+                    'success': result['success'],
+                    'message_sid': result.get('message_sid'),
+                    'status': result.get('status'),
+                    'error': result.get('error'),
+                    'attempts': result.get('attempts'),
+                    'sent_at': now
+                }}
+            # Only touch quotes still pending, in case the live pipeline got there first
+            operations.append(UpdateOne({'_id': quote['_id'], 'status': 'pending'}, update))
+
+        if operations:
+            self.quote_requests.collection.bulk_write(operations, ordered=False)
+        self._save_checkpoint(chunk[-1]['_id'], len(chunk))
+
+    def _save_checkpoint(self, last_id, processed: int):
+        self.checkpoints.update_one(
+            {'_id': self.run_name},
+            {'$set': {'last_id': last_id, 'updated_at': datetime.utcnow()}, '$inc': {'processed': processed}},
+            upsert=True
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze and notify pending quote requests in bulk')
+    parser.add_argument('--mongo-uri', default=os.environ.get('MONGODB_URI'))
+    parser.add_argument('--mode', choices=['digest', 'individual', 'none'], default='digest',
+                        help='one SMS per --digest-size quotes, one per quote, or analyze only')
+    parser.add_argument('--concurrency', type=int, default=10, help='analyses and sends in flight at once')
+    parser.add_argument('--chunk-size', type=int, default=200, help='quotes read, written and checkpointed together')
+    parser.add_argument('--digest-size', type=int, default=20, help='quotes listed per digest SMS')
+    parser.add_argument('--min-age-minutes', type=float, default=15,
+                        help='skip quotes newer than this, the live pipeline may still notify them')
+    parser.add_argument('--limit', type=int, help='process at most this many quotes')
+    parser.add_argument('--run-name', default='pending_quotes', help='checkpoint to resume from')
+    parser.add_argument('--restart', action='store_true', help='ignore the checkpoint and start from the oldest quote')
+    parser.add_argument('--dry-run', action='store_true', help='analyze without sending or writing anything')
+    args = parser.parse_args()
+
+    if not args.mongo_uri:
+        parser.error('MONGODB_URI is not set; pass --mongo-uri')
+
+    db = MongoClient(args.mongo_uri).get_default_database()
+    processor = BacklogProcessor(
+        QuoteRequestModel(db), JobModel(db), db['backlog_checkpoints'], args.run_name, mode=args.mode,
+        concurrency=args.concurrency, chunk_size=args.chunk_size, digest_size=args.digest_size,
+        min_age_minutes=args.min_age_minutes, dry_run=args.dry_run
+    )
+
+    start = time.perf_counter()
+    totals = asyncio.run(processor.run(restart=args.restart, limit=args.limit))
+    elapsed = time.perf_counter() - start
+    rate = totals['processed'] / elapsed if elapsed else 0
+    print(f"\nProcessed {totals['processed']} quotes in {elapsed:.1f}s ({rate:.1f}/s): "
+          f"{totals['analyzed']} analyzed, {totals['notified']} notified, {totals['failed']} failed, "
+          f"{totals['skipped']} left to the job workers")
+
+
+if __name__ == '__main__':
+    main()
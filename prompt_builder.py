@@ -0,0 +1,139 @@
+"""
+Token-budgeted prompt builder for the OrbitX chatbot
+
+Builds the OpenAI message list within a fixed per-call token budget:
+the system prompt, a compact JSON context, a running summary of older
+turns and as many recent messages as fit, newest first. Oversized
+messages are truncated. Tokens are counted locally with tiktoken when
+its encoding is available, otherwise with a characters-per-token
+estimate.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough characters per token for English text, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+# Tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = ' …'
+
+
+class TokenCounter:
+    """Local token counting and truncation"""
+
+    def __init__(self, encoding_name: str = 'o200k_base'):
+        self.encoding = None
+        try:
+            import tiktoken
+            self.encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.info(f"tiktoken unavailable, estimating prompt tokens from length: {e}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding:
+            return len(self.encoding.encode(text))
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut ``text`` down to at most ``max_tokens`` tokens"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens]) + TRUNCATION_MARKER
+        return text[:max_tokens * CHARS_PER_TOKEN] + TRUNCATION_MARKER
+
+
+class PromptBuilder:
+    """Assemble LLM prompts within a token budget"""
+
+    def __init__(self, system_prompt: str, budget: int = 1800, max_message_tokens: int = 250,
+                 max_context_field_tokens: int = 120, max_summary_tokens: int = 200,
+                 max_history_messages: int = 6, counter: TokenCounter = None):
+        self.system_prompt = system_prompt
+        self.budget = budget
+        self.max_message_tokens = max_message_tokens
+        self.max_context_field_tokens = max_context_field_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self.max_history_messages = max_history_messages
+        self.counter = counter or TokenCounter()
+        self._system_tokens = self.counter.count(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+    def build(self, recent_messages: List[Dict], context_data: Dict, summary: Optional[str] = None) -> List[Dict]:
+        """Build the message list for the OpenAI API"""
+        messages = [{"role": "system", "content": self.system_prompt}]
+        remaining = self.budget - self._system_tokens
+
+        context_summary = self.compact_context(context_data)
+        if context_summary:
+            content = f"User context: {context_summary}"
+            messages.append({"role": "system", "content": content})
+            remaining -= self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+        if summary:
+            content = f"Earlier in this conversation: {summary}"
+            messages.append({"role": "system", "content": content})
+            remaining -= self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+        # Newest messages first until the budget runs out
+        history = []
+        for msg in reversed(recent_messages[-self.max_history_messages:]):
+            content = self.counter.truncate(msg.get('message', ''), self.max_message_tokens)
+            cost = self.counter.count(content) + MESSAGE_OVERHEAD_TOKENS
+            if history and cost > remaining:
+                break
+            remaining -= cost
+            history.append({
+                "role": "user" if msg.get('sender') == 'user' else "assistant",
+                "content": content
+            })
+
+        messages.extend(reversed(history))
+        return messages
+
+    def compact_context(self, context_data: Dict) -> str:
+        """Serialize context without whitespace, truncating long text fields"""
+        if not context_data:
+            return ''
+        compact = {
+            key: self.counter.truncate(value, self.max_context_field_tokens) if isinstance(value, str) else value
+            for key, value in context_data.items()
+        }
+        return json.dumps(compact, separators=(',', ':'), ensure_ascii=False)
+
+    def summarize(self, summary: Optional[str], evicted_messages: List[Dict]) -> Optional[str]:
+        """Fold messages leaving the recent window into the running summary
+
+        Each turn is kept as a short clipped line and the oldest lines are
+        dropped first, so the summary stays within ``max_summary_tokens``.
+        Contact details and services are already carried by the context.
+        """
+        if not evicted_messages:
+            return summary
+
+        lines = summary.split('\n') if summary else []
+        for msg in evicted_messages:
+            speaker = 'User' if msg.get('sender') == 'user' else 'Assistant'
+            text = ' '.join((msg.get('message') or '').split())
+            lines.append(f"{speaker}: {self.counter.truncate(text, 30)}")
+
+        while len(lines) > 1 and self.counter.count('\n'.join(lines)) > self.max_summary_tokens:
+            lines.pop(0)
+        return '\n'.join(lines)
+
+
+def build_prompt_builder(system_prompt: str) -> PromptBuilder:
+    """Build the prompt builder from environment configuration"""
+    return PromptBuilder(
+        system_prompt,
+        budget=int(os.environ.get('CHATBOT_PROMPT_TOKEN_BUDGET', 1800)),
+        max_message_tokens=int(os.environ.get('CHATBOT_MAX_MESSAGE_TOKENS', 250))
+    )
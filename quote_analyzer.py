@@ -0,0 +1,310 @@
+"""
+AI analysis of quote requests
+
+The app, the SMS and WhatsApp integrations and the MCP server all analyze
+quotes through one QuoteAnalysisEngine (``get_analysis_engine()``), so
+the model, caching, concurrency and instrumentation are tuned in one
+place. Quotes submitted within a short window of each other are analyzed
+with a single JSON-mode prompt that returns a priority and estimated
+value per quote, instead of one OpenAI call per quote. Quotes the model
+leaves out of a batch response are retried on their own, and anything
+that still fails gets the standard fallback analysis.
+
+Results are stored on the quote request (``ai_analysis``) together with
+a hash of the fields the analysis depends on, so notifications and the
+admin view read the stored result and identical resubmissions reuse it.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+from llm_client import get_llm_guard
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANALYSIS = {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
+
+BATCH_PROMPT = """Analyze each design quote request below. For each one give a priority (1-10, where 10 is highest priority) and an estimated project value in rupees.
+
+Respond in JSON format:
+{{"results": [{{"id": "<quote id>", "priority": number, "estimated_value": "Rs X,XXX-X,XXX"}}]}}
+
+Quotes:
+{quotes}"""
+
+
+# Quote fields the analysis depends on
+ANALYSIS_HASH_FIELDS = ('client_name', 'services_requested', 'budget_range', 'project_description')
+
+
+def default_analysis() -> Dict:
+    return dict(DEFAULT_ANALYSIS)
+
+
+def is_fallback(analysis: Dict) -> bool:
+    """True for the standard analysis used when the model is unavailable"""
+    return analysis.get('strategy') == DEFAULT_ANALYSIS['strategy']
+
+
+def quote_content_hash(quote_data: Dict) -> str:
+    """Hash of the normalized analysis inputs, shared by identical submissions"""
+    normalized = {
+        field: ' '.join(str(quote_data.get(field) or '').lower().split())
+        for field in ANALYSIS_HASH_FIELDS
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def quote_prompt_fields(quote_id: str, quote_data: Dict) -> Dict:
+    """The quote fields sent to the model"""
+    return {
+        'id': quote_id,
+        'client': quote_data.get('client_name'),
+        'service': quote_data.get('services_requested'),
+        'budget': quote_data.get('budget_range') or 'Not specified',
+        'description': (quote_data.get('project_description') or '')[:200]
+    }
+
+
+def normalize_result(result: Dict) -> Optional[Dict]:
+    """Validate one model result, or None if it is unusable"""
+    try:
+        priority = min(10, max(1, int(result['priority'])))
+    except (KeyError, TypeError, ValueError):
+        return None
+    value = result.get('estimated_value')
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return {"priority": priority, "estimated_value": value.strip(), "strategy": "AI-analyzed response"}
+
+
+class QuoteAnalysisEngine:
+    """Shared async quote analysis used by the app, the SMS and WhatsApp integrations and the MCP server
+
+    Runs on its own event loop thread with one pooled AsyncOpenAI client.
+    Quotes submitted within ``max_wait`` seconds of each other share one
+    JSON-mode prompt, at most ``max_concurrent_batches`` prompts are in
+    flight, and results are cached by quote content hash so repeated
+    analyses of the same quote don't reach the model.
+    """
+
+    def __init__(self, openai_client, max_batch_size: int = 10, max_wait: float = 0.5,
+                 max_concurrent_batches: int = 4, model: str = 'gpt-4o-mini',
+                 cache_size: int = 1024, cache_ttl: float = 3600):
+        self.openai_client = openai_client
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+        self.model = model
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.llm_guard = get_llm_guard()
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._pending = []
+        self._flush_handle = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'cache_hits': 0, 'batches': 0, 'model_calls': 0, 'fallbacks': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='quote-analysis', daemon=True)
+        self._thread.start()
+
+    def submit(self, quote_data: Dict) -> Future:
+        """Queue a quote for analysis; the future resolves to its analysis dict"""
+        return asyncio.run_coroutine_threadsafe(self._analyze(dict(quote_data)), self._loop)
+
+    async def analyze(self, quote_data: Dict) -> Dict:
+        """Analyze a quote from any event loop"""
+        return await asyncio.wrap_future(self.submit(quote_data))
+
+    def analyze_sync(self, quote_data: Dict, timeout: float = 60) -> Dict:
+        """Analyze a quote from a thread, blocking until its batch completes"""
+        try:
+            return self.submit(quote_data).result(timeout=timeout)
+        except FutureTimeoutError:
+            logger.error("Quote analysis timed out, using standard analysis")
+            return default_analysis()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['cached'] = len(self._cache)
+        stats['model'] = self.model
+        return stats
+
+    async def _analyze(self, quote_data: Dict) -> Dict:
+        self._count('requests')
+        if self.openai_client is None:
+            return default_analysis()
+
+        key = quote_content_hash(quote_data)
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.cache_ttl:
+            self._cache.move_to_end(key)
+            self._count('cache_hits')
+            return dict(cached[1])
+
+        # Identical quotes already waiting for the model share its answer
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._loop.create_future()
+            self._inflight[key] = future
+            self._pending.append((quote_data, future))
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            if len(self._pending) >= self.max_batch_size:
+                self._flush()
+            elif self._flush_handle is None:
+                self._flush_handle = self._loop.call_later(self.max_wait, self._flush)
+
+        analysis = await asyncio.shield(future)
+        if is_fallback(analysis):
+            self._count('fallbacks')
+        else:
+            self._cache[key] = (time.monotonic(), analysis)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(analysis)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._loop.create_task(self._analyze_batch(batch))
+
+    async def _analyze_batch(self, batch: List):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+
+        quotes = {f"q{index}": item for index, item in enumerate(batch, 1)}
+        async with self._slots:
+            self._count('batches')
+            try:
+                results = await self._request(quotes)
+            except Exception as e:
+                logger.error(f"Batched quote analysis failed for {len(batch)} quotes: {e}")
+                for _, future in batch:
+                    future.set_result(default_analysis())
+                return
+
+            for quote_id, (quote_data, future) in quotes.items():
+                analysis = results.get(quote_id)
+                if analysis is None and len(quotes) > 1:
+                    # Partial response: give the missing quote a call of its own
+                    try:
+                        analysis = (await self._request({quote_id: (quote_data, future)})).get(quote_id)
+                    except Exception as e:
+                        logger.error(f"Quote analysis retry failed: {e}")
+                future.set_result(analysis or default_analysis())
+
+    async def _request(self, quotes: Dict) -> Dict[str, Dict]:
+        """One JSON-mode call for a set of quotes; returns the valid results by quote id"""
+        fields = [quote_prompt_fields(quote_id, quote_data) for quote_id, (quote_data, _) in quotes.items()]
+        prompt = BATCH_PROMPT.format(quotes=json.dumps(fields, ensure_ascii=False))
+
+        self._count('model_calls')
+        response = await self.llm_guard.acall(
+            lambda timeout: self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                max_tokens=40 * len(quotes) + 60,
+                timeout=timeout
+            )
+        )
+
+        payload = json.loads(response.choices[0].message.content)
+        results = {}
+        for result in payload.get('results', []):
+            if not isinstance(result, dict):
+                continue
+            analysis = normalize_result(result)
+            if analysis and result.get('id') in quotes:
+                results[result['id']] = analysis
+        return results
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+class QuoteAnalysisStore:
+    """Read-through store of AI analyses on ``quote_requests``"""
+
+    def __init__(self, quote_requests, analyze: Callable[[Dict], Dict]):
+        self.quote_requests = quote_requests
+        self.analyze = analyze
+
+    def get(self, quote_request: Dict) -> Dict:
+        """Return the quote's stored analysis, analyzing and storing it on first use"""
+        if quote_request.get('ai_analysis'):
+            return quote_request['ai_analysis']
+
+        content_hash = quote_content_hash(quote_request)
+        analysis = self.quote_requests.find_analysis_by_hash(content_hash)
+        if analysis is None:
+            analysis = self.analyze(quote_request)
+
+        try:
+            self.quote_requests.save_analysis(
+                quote_request['id'], analysis,
+                analysis_hash=None if is_fallback(analysis) else content_hash
+            )
+        except Exception as e:
+            logger.error(f"Failed to store quote analysis: {e}")
+        quote_request['ai_analysis'] = analysis
+        return analysis
+
+
+# Process-wide engine, so every entry point shares one client, one cache and one concurrency cap
+_analysis_engine = None
+_analysis_engine_lock = threading.Lock()
+
+
+def build_analysis_openai_client():
+    """Pooled AsyncOpenAI client for the engine, or None without an API key"""
+    api_key = (os.environ.get('OPENAI_API_KEY') or '').strip()
+    if not api_key or api_key.startswith('REPLACE_WITH'):
+        return None
+
+    import httpx
+    import openai
+    max_connections = int(os.environ.get('QUOTE_ANALYSIS_MAX_CONCURRENT', 4)) * 2
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(float(os.environ.get('OPENAI_READ_TIMEOUT', 30)),
+                                  connect=float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5)))
+        ),
+        max_retries=0  # Retries and hedging are done by the LLM guard
+    )
+
+
+def get_analysis_engine() -> QuoteAnalysisEngine:
+    """Get the shared quote analysis engine, built from environment configuration"""
+    global _analysis_engine
+    if _analysis_engine is None:
+        with _analysis_engine_lock:
+            if _analysis_engine is None:
+                _analysis_engine = QuoteAnalysisEngine(
+                    build_analysis_openai_client(),
+                    max_batch_size=int(os.environ.get('QUOTE_ANALYSIS_BATCH_SIZE', 10)),
+                    max_wait=float(os.environ.get('QUOTE_ANALYSIS_BATCH_WAIT_MS', 500)) / 1000,
+                    max_concurrent_batches=int(os.environ.get('QUOTE_ANALYSIS_MAX_CONCURRENT', 4)),
+                    model=os.environ.get('QUOTE_ANALYSIS_MODEL', 'gpt-4o-mini'),
+                    cache_ttl=float(os.environ.get('QUOTE_ANALYSIS_CACHE_TTL', 3600))
+                )
+    return _analysis_engine
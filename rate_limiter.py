@@ -0,0 +1,311 @@
+"""
+Admission control for the OrbitX chatbot
+
+Every chat turn can cost an OpenAI request and several Mongo writes, so
+turns are rate limited with token buckets keyed by conversation id and by
+client IP, and the number of OpenAI calls in flight is capped.
+
+Buckets and the OpenAI cap live in the worker by default, with the cap
+split evenly between the WEB_CONCURRENCY workers. Set
+CHATBOT_RATE_LIMIT_REDIS_URL (or CHATBOT_STATE_REDIS_URL) to keep both in
+Redis so the limits hold across gunicorn workers exactly.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Refill, spend one token and report the wait for the next one, atomically
+REDIS_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+# Give back a token spent by a request that another bucket then turned away
+REDIS_TOKEN_REFUND_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', tostring(math.min(burst, tokens + 1)))
+end
+return 0
+"""
+
+# Take a slot of the global OpenAI cap; slots of crashed workers expire
+REDIS_SLOT_ACQUIRE_SCRIPT = """
+local max_slots = tonumber(ARGV[1])
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= max_slots then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + ttl, ARGV[4])
+redis.call('EXPIRE', KEYS[1], math.ceil(ttl) + 1)
+return 1
+"""
+
+
+class LocalTokenBuckets:
+    """Per-worker token buckets, least recently used keys evicted first"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Spend one token; return 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def refund(self, key: str, burst: int):
+        """Give back one token spent by ``take``"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(burst, tokens + 1), updated_at)
+
+
+class RedisTokenBuckets:
+    """Token buckets shared by every worker through Redis"""
+
+    def __init__(self, url: str, prefix: str = 'orbitx:rate:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._script = self.client.register_script(REDIS_TOKEN_BUCKET_SCRIPT)
+        self._refund_script = self.client.register_script(REDIS_TOKEN_REFUND_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        return float(self._script(keys=[self.prefix + key], args=[rate, burst, time.time()]))
+
+    def refund(self, key: str, burst: int):
+        self._refund_script(keys=[self.prefix + key], args=[burst])
+
+
+class RateLimiter:
+    """Token-bucket limits per scope (conversation, ip, ...)"""
+
+    def __init__(self, buckets, limits: Dict[str, Tuple[float, int]]):
+        self.buckets = buckets
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'errors': 0}
+
+    def check(self, **identities) -> float:
+        """Spend a token for every identity; return 0 if allowed, else the seconds to wait
+
+        A rejected request spends nothing: tokens already taken from the
+        other scopes are given back. Fails open if the bucket store is
+        unavailable.
+        """
+        taken = []
+        for scope, value in identities.items():
+            if not value or scope not in self.limits:
+                continue
+            rate, burst = self.limits[scope]
+            key = f"{scope}:{value}"
+            try:
+                wait = self.buckets.take(key, rate, burst)
+            except Exception as e:
+                logger.error(f"Rate limit check failed, allowing request: {e}")
+                self._count('errors')
+                continue
+            if wait > 0:
+                self._refund(taken)
+                self._count('limited')
+                return wait
+            taken.append((key, burst))
+        self._count('allowed')
+        return 0.0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def _refund(self, taken):
+        for key, burst in taken:
+            try:
+                self.buckets.refund(key, burst)
+            except Exception as e:
+                logger.error(f"Rate limit refund failed: {e}")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+class LLMAdmission:
+    """Cap on OpenAI calls in flight in this worker
+
+    A turn waits up to ``queue_timeout`` seconds for a slot; if none frees
+    up it is turned away so the caller can answer with its fallback.
+    """
+
+    def __init__(self, max_concurrent: int = 8, queue_timeout: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._stats = {'in_flight': 0, 'admitted': 0, 'rejected': 0}
+
+    def acquire(self) -> bool:
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            return False
+        with self._lock:
+            self._stats['in_flight'] += 1
+            self._stats['admitted'] += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['max_concurrent'] = self.max_concurrent
+        return stats
+
+
+class RedisLLMAdmission(LLMAdmission):
+    """Cap on OpenAI calls in flight across every worker, as leased slots in Redis
+
+    A slot is held for at most ``slot_ttl`` seconds, so slots of a worker
+    that died mid-call free themselves. Fails open if Redis is unavailable.
+    """
+
+    def __init__(self, url: str, max_concurrent: int = 8, queue_timeout: float = 2.0,
+                 slot_ttl: float = 120.0, poll_interval: float = 0.05, key: str = 'orbitx:llm_slots'):
+        super().__init__(max_concurrent, queue_timeout)
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.slot_ttl = slot_ttl
+        self.poll_interval = poll_interval
+        self.key = key
+        self._script = self.client.register_script(REDIS_SLOT_ACQUIRE_SCRIPT)
+        self._held = threading.local()
+
+    def acquire(self) -> bool:
+        slot = uuid.uuid4().hex
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            try:
+                admitted = int(self._script(keys=[self.key], args=[self.max_concurrent, time.time(),
+                                                                   self.slot_ttl, slot]))
+            except Exception as e:
+                logger.error(f"LLM admission check failed, allowing call: {e}")
+                admitted = 1
+            if admitted:
+                self._held.slot = slot
+                with self._lock:
+                    self._stats['in_flight'] += 1
+                    self._stats['admitted'] += 1
+                return True
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self._stats['rejected'] += 1
+                return False
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        with self._lock:
+            self._stats['in_flight'] -= 1
+        slot = getattr(self._held, 'slot', None)
+        self._held.slot = None
+        if slot:
+            try:
+                self.client.zrem(self.key, slot)
+            except Exception as e:
+                logger.error(f"LLM admission release failed, slot expires in {self.slot_ttl}s: {e}")
+
+
+def client_ip(request) -> str:
+    """Client address, honouring X-Forwarded-For set by CHATBOT_TRUSTED_PROXIES proxies"""
+    trusted_proxies = int(os.environ.get('CHATBOT_TRUSTED_PROXIES', 0))
+    forwarded_for = request.headers.get('X-Forwarded-For')
+    if trusted_proxies and forwarded_for:
+        # Each trusted proxy appends the address it received the request from
+        route = [address.strip() for address in forwarded_for.split(',')]
+        if len(route) >= trusted_proxies:
+            return route[-trusted_proxies]
+    return request.remote_addr
+
+
+def build_rate_limiter() -> RateLimiter:
+    """Build the chat rate limiter from environment configuration"""
+    limits = {
+        'conversation': (
+            float(os.environ.get('CHATBOT_RATE_LIMIT_PER_MINUTE', 20)) / 60,
+            int(os.environ.get('CHATBOT_RATE_LIMIT_BURST', 5))
+        ),
+        'ip': (
+            float(os.environ.get('CHATBOT_IP_RATE_LIMIT_PER_MINUTE', 60)) / 60,
+            int(os.environ.get('CHATBOT_IP_RATE_LIMIT_BURST', 15))
+        )
+    }
+
+    redis_url = os.environ.get('CHATBOT_RATE_LIMIT_REDIS_URL') or os.environ.get('CHATBOT_STATE_REDIS_URL')
+    if redis_url:
+        try:
+            return RateLimiter(RedisTokenBuckets(redis_url), limits)
+        except Exception as e:
+            logger.error(f"Redis rate limiter unavailable, using per-worker buckets: {e}")
+    return RateLimiter(LocalTokenBuckets(), limits)
+
+
+def build_llm_admission() -> LLMAdmission:
+    """Build the OpenAI concurrency cap from environment configuration
+
+    CHATBOT_MAX_CONCURRENT_LLM_CALLS is the cap for the whole deployment:
+    enforced in Redis when configured, otherwise split between the
+    WEB_CONCURRENCY workers.
+    """
+    max_concurrent = int(os.environ.get('CHATBOT_MAX_CONCURRENT_LLM_CALLS', 8))
+    queue_timeout = float(os.environ.get('CHATBOT_LLM_QUEUE_TIMEOUT', 2))
+
+    redis_url = os.environ.get('CHATBOT_RATE_LIMIT_REDIS_URL') or os.environ.get('CHATBOT_STATE_REDIS_URL')
+    if redis_url:
+        try:
+            return RedisLLMAdmission(redis_url, max_concurrent=max_concurrent, queue_timeout=queue_timeout)
+        except Exception as e:
+            logger.error(f"Redis LLM admission unavailable, splitting the cap between workers: {e}")
+
+    workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    return LLMAdmission(max_concurrent=max(1, max_concurrent // workers), queue_timeout=queue_timeout)
@@ -3,7 +3,9 @@
 Digital Marketing Website - Run Script
 """
 
-from app import app
+from app import app, is_reloader_parent, start_background_workers
 
 if __name__ == '__main__':
+    if not is_reloader_parent():
+        start_background_workers()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
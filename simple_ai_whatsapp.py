@@ -9,71 +9,18 @@ import urllib.parse
 import webbrowser
 import os
 from dotenv import load_dotenv
-import openai
+from quote_analyzer import get_analysis_engine
 
 # Load environment
 load_dotenv()
 
 class SimpleAIWhatsApp:
     def __init__(self):
-        self.api_key = os.getenv('OPENAI_API_KEY')
         self.target_number = os.getenv('TARGET_WHATSAPP_NUMBER', '919518536672')
 
-        if self.api_key:
-            self.client = openai.AsyncOpenAI(api_key=self.api_key)
-        else:
-            self.client = None
-
     async def analyze_quote(self, quote_data):
-        """Analyze quote with OpenAI (simplified)"""
-        if not self.client:
-            return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
-
-        try:
-            prompt = f"""Analyze this design quote briefly:
-            Client: {quote_data.get('client_name')}
-            Service: {quote_data.get('services_requested')}
-            Budget: {quote_data.get('budget_range', 'Not specified')}
-            Description: {quote_data.get('project_description', '')[:200]}
-
-            Provide priority (1-10) and estimated value in rupees in this format:
-            Priority: X/10
-            Value: Rs X,XXX-X,XXX"""
-
-            response = await self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=100
-            )
-
-            result = response.choices[0].message.content
-
-            # Extract priority and value
-            priority = 5
-            value = "Rs 5,000-15,000"
-
-            lines = result.split('\n')
-            for line in lines:
-                if 'Priority:' in line or 'priority:' in line.lower():
-                    try:
-                        priority = int(line.split(':')[1].split('/')[0].strip())
-                    except:
-                        pass
-                if 'Value:' in line or 'value:' in line.lower():
-                    try:
-                        value = line.split(':')[1].strip()
-                    except:
-                        pass
-
-            return {
-                "priority": priority,
-                "estimated_value": value,
-                "strategy": "AI-analyzed response"
-            }
-
-        except Exception as e:
-            print(f"AI analysis error: {e}")
-            return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
+        """Analyze quote with OpenAI (shared analysis engine)"""
+        return await get_analysis_engine().analyze(quote_data)
 
     async def generate_enhanced_message(self, quote_data, analysis):
         """Generate enhanced WhatsApp message with AI insights"""
@@ -106,8 +53,11 @@ class SimpleAIWhatsApp:
     async def process_and_send(self, quote_data):
         """Complete process: analyze + generate + send WhatsApp"""
         try:
-            print("Analyzing quote with AI...")
-            analysis = await self.analyze_quote(quote_data)
+            # Quotes from the app carry their stored analysis
+            analysis = quote_data.get('ai_analysis')
+            if not analysis:
+                print("Analyzing quote with AI...")
+                analysis = await self.analyze_quote(quote_data)
 
             print("Generating enhanced WhatsApp message...")
             message = await self.generate_enhanced_message(quote_data, analysis)
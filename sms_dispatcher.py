@@ -0,0 +1,197 @@
+"""
+Shared asynchronous Twilio SMS dispatcher
+
+The app and AIEnhancedSMS used to send through the blocking Twilio REST
+client, opening a new HTTP session per message with no limit on
+concurrent sends and no handling of Twilio's 429s. All SMS now go through
+one SMSDispatcher per process, which runs on its own event loop thread
+with a pooled httpx session:
+
+- at most TWILIO_MAX_CONCURRENT_SENDS requests are in flight,
+- sends are paced by a token bucket at TWILIO_MESSAGES_PER_SECOND (the
+  account's queueing limit for the sending number),
+- 429s and 5xx responses are retried after Retry-After or with backoff,
+  as are requests that never reached Twilio (connection failures). A
+  request that fails after it was sent, e.g. a read timeout, is not
+  retried: Twilio may have queued it and a retry would send it twice.
+
+Sync callers use ``send`` (blocks only the calling background thread),
+async callers ``await asend``; both return the same result dict.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+import httpx
+
+from rate_limiter import LocalTokenBuckets
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_BASE_URL = 'https://api.twilio.com'
+
+# Twilio responses worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Transport errors raised before the request was sent, so safe to retry
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class SMSDispatcher:
+    """Concurrency-limited, rate-limited Twilio message sender on a background event loop"""
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str, default_to: str = None,
+                 base_url: str = TWILIO_API_BASE_URL, max_concurrent: int = 4,
+                 messages_per_second: float = 1.0, burst: int = 1, max_attempts: int = 3,
+                 retry_backoff: float = 1.0, timeout: float = 15.0):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+        self.default_to = default_to
+        self.url = f"{base_url.rstrip('/')}/2010-04-01/Accounts/{account_sid}/Messages.json"
+        self.max_concurrent = max_concurrent
+        self.messages_per_second = messages_per_second
+        self.burst = burst
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self._buckets = LocalTokenBuckets()
+        self._lock = threading.Lock()
+        self._stats = {'sent': 0, 'failed': 0, 'retried': 0, 'rate_limited': 0, 'in_flight': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='sms-dispatcher', daemon=True)
+        self._thread.start()
+        self._session = None
+        self._slots = None
+
+    def submit(self, body: str, to: str = None) -> Future:
+        """Queue an SMS; the future resolves to its result dict"""
+        return asyncio.run_coroutine_threadsafe(self._send(body, to or self.default_to), self._loop)
+
+    def send(self, body: str, to: str = None, timeout: float = 120) -> Dict:
+        """Send an SMS from a background thread and wait for the result"""
+        try:
+            return self.submit(body, to).result(timeout=timeout)
+        except Exception as e:
+            return {"success": False, "error": f"SMS dispatch failed: {e}"}
+
+    async def asend(self, body: str, to: str = None) -> Dict:
+        """Send an SMS from any event loop"""
+        return await asyncio.wrap_future(self.submit(body, to))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats['max_concurrent'] = self.max_concurrent
+        stats['messages_per_second'] = self.messages_per_second
+        return stats
+
+    async def _send(self, body: str, to: str) -> Dict:
+        if self._session is None:
+            # Created on the dispatcher loop, shared by every send
+            self._session = httpx.AsyncClient(
+                auth=(self.account_sid, self.auth_token),
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrent,
+                                    max_keepalive_connections=self.max_concurrent)
+            )
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        result = {"success": False, "error": "SMS not attempted"}
+        for attempt in range(1, self.max_attempts + 1):
+            await self._pace()
+            async with self._slots:
+                self._count('in_flight', 1)
+                try:
+                    result, retry_after = await self._post(body, to)
+                finally:
+                    self._count('in_flight', -1)
+
+            result['attempts'] = attempt
+            if result['success'] or retry_after is None or attempt == self.max_attempts:
+                break
+            self._count('retried')
+            await asyncio.sleep(retry_after or self.retry_backoff * 2 ** (attempt - 1))
+
+        self._count('sent' if result['success'] else 'failed')
+        if not result['success']:
+            logger.error(f"SMS to {to} failed: {result['error']}")
+        return result
+
+    async def _pace(self):
+        """Wait for a token from the account's send-rate bucket"""
+        while True:
+            wait = self._buckets.take('twilio', self.messages_per_second, self.burst)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def _post(self, body: str, to: str):
+        """One Messages API request; returns the result and the retry delay (None if final)"""
+        try:
+            response = await self._session.post(self.url, data={'From': self.from_number, 'To': to, 'Body': body})
+        except UNSENT_REQUEST_ERRORS as e:
+            return {"success": False, "error": f"{type(e).__name__}: {e}"}, 0
+        except httpx.HTTPError as e:
+            # The message may have been accepted; retrying could deliver it twice
+            return {"success": False, "error": f"{type(e).__name__}: {e}"}, None
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if response.status_code < 300:
+            return {"success": True, "message_sid": payload.get('sid'), "status": payload.get('status')}, None
+
+        result = {
+            "success": False,
+            "error": payload.get('message') or f"HTTP {response.status_code}",
+            "error_code": payload.get('code'),
+            "http_status": response.status_code
+        }
+        if response.status_code not in RETRYABLE_STATUS_CODES:
+            return result, None
+        if response.status_code == 429:
+            self._count('rate_limited')
+        try:
+            retry_after = float(response.headers.get('Retry-After', 0))
+        except ValueError:
+            retry_after = 0
+        return result, retry_after
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+
+# Process-wide dispatcher, so the app and the SMS integration share one session and one rate limit
+_sms_dispatcher = None
+_sms_dispatcher_lock = threading.Lock()
+
+
+def get_sms_dispatcher() -> Optional[SMSDispatcher]:
+    """Get the shared SMS dispatcher, or None if Twilio is not configured"""
+    global _sms_dispatcher
+    if not (os.getenv('TWILIO_ACCOUNT_SID') and os.getenv('TWILIO_AUTH_TOKEN')):
+        return None
+    if _sms_dispatcher is None:
+        with _sms_dispatcher_lock:
+            if _sms_dispatcher is None:
+                _sms_dispatcher = SMSDispatcher(
+                    os.getenv('TWILIO_ACCOUNT_SID'),
+                    os.getenv('TWILIO_AUTH_TOKEN'),
+                    os.getenv('TWILIO_PHONE_NUMBER'),
+                    default_to=os.getenv('TARGET_PHONE_NUMBER'),
+                    # Optional override, e.g. the local stand-in from fake_api_server.py
+                    base_url=os.getenv('TWILIO_API_BASE_URL') or TWILIO_API_BASE_URL,
+                    max_concurrent=int(os.environ.get('TWILIO_MAX_CONCURRENT_SENDS', 4)),
+                    messages_per_second=float(os.environ.get('TWILIO_MESSAGES_PER_SECOND', 1)),
+                    burst=int(os.environ.get('TWILIO_SEND_BURST', 1)),
+                    max_attempts=int(os.environ.get('TWILIO_SEND_ATTEMPTS', 3))
+                )
+    return _sms_dispatcher
@@ -0,0 +1,95 @@
+/**
+ * Chatbot loader stub for OrbitX Website
+ * Renders the launcher button and pulls in the full chatbot bundle
+ * only when the visitor opens the chat or the browser is idle.
+ */
+
+(function() {
+    const loaderScript = document.currentScript;
+    const bundleUrl = loaderScript ? loaderScript.dataset.bundle : '/static/js/chatbot.js';
+    let bundlePromise = null;
+
+    function loadBundle() {
+        if (!bundlePromise) {
+            bundlePromise = new Promise((resolve, reject) => {
+                const script = document.createElement('script');
+                script.src = bundleUrl;
+                script.async = true;
+                script.onload = () => resolve(window.initOrbitXChatbot());
+                script.onerror = () => {
+                    bundlePromise = null;
+                    reject(new Error('Failed to load chatbot bundle'));
+                };
+                document.body.appendChild(script);
+            });
+        }
+        return bundlePromise;
+    }
+
+    function createLauncher() {
+        const launcher = document.createElement('button');
+        launcher.id = 'orbitx-chat-launcher';
+        launcher.title = 'Chat with OrbitX AI';
+        launcher.setAttribute('aria-label', 'Chat with OrbitX AI');
+        launcher.style.cssText = [
+            'position: fixed',
+            'bottom: 20px',
+            'right: 20px',
+            'z-index: 9999',
+            'width: 70px',
+            'height: 70px',
+            'border-radius: 50%',
+            'background: #0a0a1e',
+            'border: 2px solid rgba(0, 191, 255, 0.3)',
+            'box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3)',
+            'cursor: pointer'
+        ].join(';');
+        launcher.innerHTML = '<span style="display:block;width:32px;height:32px;margin:auto;border-radius:50%;' +
+            'background:linear-gradient(45deg,#00bfff,#ff0066);box-shadow:0 0 20px #00bfff;"></span>';
+
+        launcher.addEventListener('click', () => {
+            launcher.disabled = true;
+            loadBundle()
+                .then((chatbot) => {
+                    launcher.remove();
+                    document.getElementById('chat-notification').style.display = 'none';
+                    chatbot.toggleChat();
+                })
+                .catch((error) => {
+                    launcher.disabled = false;
+                    console.error('Chatbot error:', error);
+                });
+        });
+
+        document.body.appendChild(launcher);
+        return launcher;
+    }
+
+    function scheduleIdleLoad(launcher) {
+        const load = () => loadBundle()
+            .then(() => launcher.remove())
+            .catch(() => {});
+
+        if ('requestIdleCallback' in window) {
+            window.requestIdleCallback(load, { timeout: 5000 });
+        } else {
+            setTimeout(load, 3000);
+        }
+    }
+
+    function init() {
+        if (window.orbitxChatbot) return;
+        const launcher = createLauncher();
+        if (document.readyState === 'complete') {
+            scheduleIdleLoad(launcher);
+        } else {
+            window.addEventListener('load', () => scheduleIdleLoad(launcher));
+        }
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
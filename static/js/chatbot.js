@@ -1,8 +1,12 @@
+// Messages kept in the browser's copy of the transcript
+const MAX_TRANSCRIPT_MESSAGES = 200;
+
 class OrbitXChatbot {
     constructor() {
         this.conversationId = this.getOrCreateConversationId();
         this.isOpen = false;
         this.isTyping = false;
+        this.historyLoaded = false;
         this.userInfo = this.getUserInfo();
         this.init();
     }
@@ -43,7 +47,6 @@ class OrbitXChatbot {
     init() {
         this.createChatWidget();
         this.attachEventListeners();
-        this.loadConversationHistory();
     }
 
     createChatWidget() {
@@ -1234,6 +1237,12 @@ class OrbitXChatbot {
         if (this.isOpen) {
             chatWindow.classList.add('open');
             document.getElementById('chat-input').focus();
+
+            // History is fetched on first open so page views don't hit the API
+            if (!this.historyLoaded) {
+                this.historyLoaded = true;
+                this.loadConversationHistory();
+            }
         } else {
             chatWindow.classList.remove('open');
         }
@@ -1259,18 +1268,40 @@ class OrbitXChatbot {
         this.showTyping();
 
         try {
-            const response = await this.sendToAPI(message);
+            let bubble = null;
+            let text = '';
+
+            const response = await this.streamFromAPI(message, (token) => {
+                // First token replaces the typing indicator with a live bubble
+                if (!bubble) {
+                    this.hideTyping();
+                    this.isTyping = true;
+                    bubble = this.addMessage('', 'bot');
+                }
+                text += token;
+                bubble.innerHTML = this.formatMessage(text);
+                this.scrollToBottom();
+            });
             this.hideTyping();
 
-            if (response.success) {
-                this.addMessage(response.bot_response, 'bot');
+            const finalMessage = response.success ?
+                response.bot_response :
+                (response.bot_response || "Sorry, I couldn't process your message. Please try again.");
 
-                // Handle quote creation
-                if (response.quote_created) {
-                    this.addMessage("🎉 Great! I've created a quote request for you. Our team will be in touch within 2 hours!", 'bot');
-                }
+            if (bubble) {
+                bubble.innerHTML = this.formatMessage(finalMessage);
+                this.scrollToBottom();
             } else {
-                this.addMessage(response.bot_response || "Sorry, I couldn't process your message. Please try again.", 'bot');
+                this.addMessage(finalMessage, 'bot');
+            }
+
+            if (response.success && response.message_id) {
+                this.recordTurn(message, finalMessage, response.message_id);
+            }
+
+            // Handle quote creation
+            if (response.success && response.quote_created) {
+                this.addMessage("🎉 Great! I've created a quote request for you. Our team will be in touch within 2 hours!", 'bot');
             }
         } catch (error) {
             this.hideTyping();
@@ -1301,6 +1332,63 @@ class OrbitXChatbot {
         return await response.json();
     }
 
+    async streamFromAPI(message, onToken) {
+        const response = await fetch('/api/chatbot/message/stream', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+                message: message,
+                conversation_id: this.conversationId,
+                user_info: this.userInfo
+            })
+        });
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.body || !contentType.includes('text/event-stream')) {
+            return await response.json();
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE events are separated by a blank line
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                const data = rawEvent
+                    .split('\n')
+                    .filter(line => line.startsWith('data:'))
+                    .map(line => line.slice(5).trim())
+                    .join('');
+                if (!data) continue;
+
+                const event = JSON.parse(data);
+                if (event.type === 'token') {
+                    onToken(event.content);
+                } else if (event.type === 'done') {
+                    result = event;
+                }
+            }
+        }
+
+        if (!result) {
+            throw new Error('Chat stream ended unexpectedly');
+        }
+        return result;
+    }
+
     addMessage(message, sender) {
         const messagesContainer = document.getElementById('chat-messages');
         const messageTime = this.formatTime(new Date());
@@ -1333,6 +1421,13 @@ class OrbitXChatbot {
         `;
 
         messagesContainer.insertAdjacentHTML('beforeend', messageHTML);
+        this.scrollToBottom();
+
+        return messagesContainer.lastElementChild.querySelector('.bubble-content');
+    }
+
+    scrollToBottom() {
+        const messagesContainer = document.getElementById('chat-messages');
         messagesContainer.scrollTop = messagesContainer.scrollHeight;
     }
 
@@ -1364,17 +1459,80 @@ class OrbitXChatbot {
         document.getElementById('chat-send').disabled = false;
     }
 
+    loadTranscript() {
+        // Local copy of the transcript, so a page load only fetches new messages
+        try {
+            const transcript = JSON.parse(localStorage.getItem('orbitx_chat_transcript'));
+            if (transcript && transcript.conversationId === this.conversationId) {
+                return transcript;
+            }
+        } catch (error) {
+            console.log('Discarding unreadable chat transcript');
+        }
+        return { conversationId: this.conversationId, lastMessageId: null, messages: [] };
+    }
+
+    saveTranscript(transcript) {
+        transcript.messages = transcript.messages.slice(-MAX_TRANSCRIPT_MESSAGES);
+        try {
+            localStorage.setItem('orbitx_chat_transcript', JSON.stringify(transcript));
+        } catch (error) {
+            console.log('Could not store chat transcript');
+        }
+    }
+
+    recordTurn(userMessage, botMessage, messageId) {
+        const transcript = this.loadTranscript();
+        transcript.messages.push({ sender: 'user', message: userMessage });
+        transcript.messages.push({ sender: 'bot', message: botMessage });
+        transcript.lastMessageId = messageId;
+        this.saveTranscript(transcript);
+    }
+
+    renderTranscript(messages) {
+        const messagesContainer = document.getElementById('chat-messages');
+        // Clear welcome message if we have history
+        messagesContainer.innerHTML = '';
+
+        messages.forEach(msg => {
+            this.addMessage(msg.message, msg.sender);
+        });
+    }
+
     async loadConversationHistory() {
+        const transcript = this.loadTranscript();
+        if (transcript.messages.length > 0) {
+            this.renderTranscript(transcript.messages);
+        }
+
         try {
-            const response = await fetch(`/api/chatbot/history/${this.conversationId}`);
+            let url = `/api/chatbot/history/${encodeURIComponent(this.conversationId)}`;
+            const headers = {};
+            if (transcript.lastMessageId) {
+                url += `?since=${encodeURIComponent(transcript.lastMessageId)}`;
+                headers['If-None-Match'] = `"${transcript.lastMessageId}"`;
+            }
+
+            const response = await fetch(url, { headers: headers });
+            if (response.status === 304) return;
+
             const data = await response.json();
+            if (!data.success) return;
 
-            if (data.success && data.messages.length > 0) {
-                const messagesContainer = document.getElementById('chat-messages');
-                // Clear welcome message if we have history
-                messagesContainer.innerHTML = '';
+            if (data.full) {
+                transcript.messages = [];
+            }
+            const newMessages = data.messages.map(msg => ({ sender: msg.sender, message: msg.message }));
+            transcript.messages.push(...newMessages);
+            transcript.lastMessageId = data.last_message_id;
+            this.saveTranscript(transcript);
 
-                data.messages.forEach(msg => {
+            if (data.full) {
+                if (transcript.messages.length > 0) {
+                    this.renderTranscript(transcript.messages);
+                }
+            } else {
+                newMessages.forEach(msg => {
                     this.addMessage(msg.message, msg.sender);
                 });
             }
@@ -1384,10 +1542,19 @@ class OrbitXChatbot {
     }
 }
 
-// Initialize chatbot when page loads
-document.addEventListener('DOMContentLoaded', function() {
+// Initialize chatbot once the bundle is available (loaded on demand by chatbot-loader.js)
+function initOrbitXChatbot() {
     // Only initialize if not already initialized
     if (!window.orbitxChatbot) {
         window.orbitxChatbot = new OrbitXChatbot();
     }
-});
\ No newline at end of file
+    return window.orbitxChatbot;
+}
+
+window.initOrbitXChatbot = initOrbitXChatbot;
+
+if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', initOrbitXChatbot);
+} else {
+    initOrbitXChatbot();
+}
@@ -0,0 +1,88 @@
+"""
+Shared fixtures: an in-memory Mongo (mongomock) behind DatabaseModels,
+a Flask app context and a fake OpenAI client.
+"""
+
+from types import SimpleNamespace
+
+import mongomock
+import pytest
+from flask import Flask
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from models_mongodb import DatabaseModels
+
+
+def _bulk_write(self, requests, ordered=True, **kwargs):
+    """mongomock's bulk_write predates pymongo 4.9's operation API; apply the operations one by one"""
+    inserted = matched = modified = 0
+    for index, operation in enumerate(requests):
+        try:
+            if isinstance(operation, InsertOne):
+                self.insert_one(operation._doc)
+                inserted += 1
+            elif isinstance(operation, UpdateOne):
+                result = self.update_one(operation._filter, operation._doc, upsert=bool(operation._upsert))
+                matched += result.matched_count
+                modified += result.modified_count
+            else:
+                raise TypeError(f"Unsupported bulk operation: {operation!r}")
+        except DuplicateKeyError as e:
+            raise BulkWriteError({'writeErrors': [{'index': index, 'code': 11000, 'errmsg': str(e)}],
+                                  'nInserted': inserted})
+    return SimpleNamespace(inserted_count=inserted, matched_count=matched, modified_count=modified)
+
+
+mongomock.collection.Collection.bulk_write = _bulk_write
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().db
+
+
+@pytest.fixture
+def models(db):
+    return DatabaseModels(db)
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    with app.app_context():
+        yield app
+
+
+class FakeCompletions:
+    """Chat completions that answer every prompt with ``reply``"""
+
+    def __init__(self, reply: str = 'Hello'):
+        self.reply = reply
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get('stream'):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+                         for token in ('Hel', 'lo')])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+@pytest.fixture
+def openai_client():
+    return SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()))
+
+
+@pytest.fixture
+def app_module(models, monkeypatch):
+    """The app module wired to the in-memory models, without background workers"""
+    monkeypatch.setenv('MONGODB_URI', 'mongodb://localhost:1/test?serverSelectionTimeoutMS=50')
+    import app as app_module
+    from notification_digest import NotificationDigest
+
+    monkeypatch.setattr(app_module, 'db_models', models)
+    # No digest window, so every quote is notified on its own
+    monkeypatch.setattr(app_module, 'quote_digest', NotificationDigest(models.quote_requests, models.jobs, window=0))
+    with app_module.app.app_context():
+        yield app_module
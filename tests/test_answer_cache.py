@@ -0,0 +1,44 @@
+"""Normalized-question answer cache"""
+
+from answer_cache import AnswerCache
+from message_analyzer import MessageAnalyzer
+
+analyzer = MessageAnalyzer()
+
+
+def key(cache, message, context=None, previous_reply=None):
+    return cache.key_for(message, analyzer.analyze(message), context or {}, previous_reply)
+
+
+def test_rewordings_of_an_opening_question_share_an_answer():
+    cache = AnswerCache()
+    cache.set(key(cache, 'How much is a logo?'), 'From Rs 2,000', {})
+
+    assert cache.get(key(cache, 'how much is the logo')) == 'From Rs 2,000'
+
+
+def test_follow_ups_are_keyed_on_the_reply_they_follow():
+    cache = AnswerCache()
+    cache.set(key(cache, 'tell me more', previous_reply='We design logos.'), 'Our logo process...', {})
+
+    assert cache.get(key(cache, 'tell me more', previous_reply='We build websites.')) is None
+    assert cache.get(key(cache, 'tell me more')) is None
+    assert cache.get(key(cache, 'Tell me more!', previous_reply='We design logos.')) == 'Our logo process...'
+
+
+def test_personal_details_are_never_cached():
+    cache = AnswerCache()
+
+    assert key(cache, 'my email is bob@example.com') is None
+    assert key(cache, 'call me on 9876543210') is None
+
+    cache_key = key(cache, 'what do you think', {'user_name': 'Bob'})
+    cache.set(cache_key, 'Great idea, Bob!', {'user_name': 'Bob'})
+    assert cache.get(cache_key) is None
+
+
+def test_entries_expire():
+    cache = AnswerCache(ttl=-1)
+    cache.set('k', 'answer', {})
+
+    assert cache.get('k') is None
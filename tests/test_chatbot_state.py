@@ -0,0 +1,108 @@
+"""Conversation state cache and write-behind persistence"""
+
+import pytest
+
+from chatbot import OrbitXChatbot
+from chatbot_state import ConversationStateStore, LocalStateCache
+
+
+@pytest.fixture
+def bot(app, models, openai_client):
+    return OrbitXChatbot(openai_client, models)
+
+
+def stored_context(models, conversation_id):
+    return models.chat_conversations.collection.find_one({'_id': conversation_id})['context']
+
+
+def test_cached_state_is_not_shared_with_the_turn(models):
+    store = ConversationStateStore(models, cache=LocalStateCache())
+    state = store.load('c1')
+    state.context_data['user_name'] = 'Bob'
+    store.save(state)
+
+    loaded = store.load('c1')
+    loaded.context_data['user_email'] = 'bob@example.com'
+    loaded.recent_messages.append({'sender': 'user', 'message': 'hi'})
+
+    again = store.load('c1')
+    assert again.context_data == {'user_name': 'Bob'}
+    assert again.recent_messages == []
+
+
+def test_overlapping_turns_on_one_conversation_both_reach_mongo(bot, models):
+    bot.process_message('c1', 'my name is bob')
+    bot.state_store.flush()
+
+    # Two requests of the same conversation in flight at once
+    first = bot._begin_turn('c1', 'my email is bob@example.com')
+    second = bot._begin_turn('c1', 'we also need a logo design')
+    bot._finish_turn(first, 'Thanks')
+    bot._finish_turn(second, 'Great')
+    bot.state_store.flush()
+
+    context = stored_context(models, 'c1')
+    assert context['user_email'] == 'bob@example.com'
+    assert context['services_interested'] == ['logo']
+
+    # The next turn sees both, whichever worker serves it
+    for store in (bot.state_store, ConversationStateStore(models, cache=LocalStateCache())):
+        context = store.load('c1').context_data
+        assert context['user_email'] == 'bob@example.com'
+        assert context['services_interested'] == ['logo']
+
+
+def test_abandoned_turn_leaves_cached_state_untouched(bot, models):
+    bot.process_message('c1', 'my name is bob')
+    bot.state_store.flush()
+
+    bot._begin_turn('c1', 'my email is bob@example.com')
+
+    assert 'user_email' not in bot.state_store.load('c1').context_data
+
+
+def test_turn_on_a_stale_worker_merges_and_reloads(bot, models, openai_client):
+    other = OrbitXChatbot(openai_client, models)
+    bot.process_message('c1', 'my name is bob')
+    bot.state_store.flush()
+
+    # Another worker moves the conversation on while this one holds a cached copy
+    other.process_message('c1', 'my email is bob@example.com')
+    other.state_store.flush()
+    assert 'user_email' not in bot.state_store.load('c1').context_data
+
+    bot.process_message('c1', 'we also need a logo design')
+    bot.state_store.flush()
+
+    stored = models.chat_conversations.collection.find_one({'_id': 'c1'})
+    assert stored['version'] == 3
+    assert stored['context']['user_email'] == 'bob@example.com'
+    assert stored['context']['services_interested'] == ['logo']
+    # The conflict evicted the stale copy
+    assert bot.state_store.load('c1').context_data['user_email'] == 'bob@example.com'
+
+
+def test_failed_writes_are_retried(models):
+    store = ConversationStateStore(models, cache=LocalStateCache(), retry_backoff=0)
+    state = store.load('c1')
+    collection = models.chat_conversations.collection
+    real_bulk_write = collection.bulk_write
+    failures = iter([ConnectionError('reset'), ConnectionError('reset')])
+
+    def flaky_bulk_write(operations, **kwargs):
+        error = next(failures, None)
+        if error:
+            raise error
+        return real_bulk_write(operations, **kwargs)
+
+    collection.bulk_write = flaky_bulk_write
+    conversations = models.chat_conversations
+    update = dict(context_changes={'user_name': 'Bob'}, messages=[])
+    store.persist_turn(collection, 'c1',
+                       conversations.turn_update('c1', version=state.version, **update),
+                       conversations.turn_update('c1', **update))
+    store.flush()
+
+    stored = collection.find_one({'_id': 'c1'})
+    assert stored['context'] == {'user_name': 'Bob'}
+    assert stored['version'] == 1
@@ -0,0 +1,25 @@
+"""Access to the internal metrics endpoint"""
+
+import pytest
+
+
+@pytest.fixture
+def client(app_module, openai_client, monkeypatch):
+    monkeypatch.setattr(app_module, 'openai_client', openai_client)
+    return app_module.app.test_client()
+
+
+def test_stats_are_disabled_without_a_token(client, monkeypatch):
+    monkeypatch.delenv('STATS_API_TOKEN', raising=False)
+    assert client.get('/api/chatbot/stats').status_code == 404
+
+
+def test_stats_require_the_bearer_token(client, monkeypatch):
+    monkeypatch.setenv('STATS_API_TOKEN', 's3cret')
+
+    assert client.get('/api/chatbot/stats').status_code == 404
+    assert client.get('/api/chatbot/stats', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+
+    response = client.get('/api/chatbot/stats', headers={'Authorization': 'Bearer s3cret'})
+    assert response.status_code == 200
+    assert response.get_json()['success'] is True
@@ -0,0 +1,29 @@
+"""Streaming chatbot replies"""
+
+from chatbot import OrbitXChatbot
+
+
+def test_disconnect_mid_stream_still_saves_the_turn(app, models, openai_client):
+    bot = OrbitXChatbot(openai_client, models)
+    # Long enough to skip the fast path and the answer cache
+    message = 'my email is bob@example.com and I would like to know how you usually work with new clients'
+
+    events = bot.process_message_stream('c1', message)
+    assert next(events) == {'type': 'token', 'content': 'Hel'}
+    events.close()
+    bot.state_store.flush()
+
+    messages = list(models.chat_messages.collection.find({'conversation_id': 'c1'}).sort('created_at', 1))
+    assert [(m['sender'], m['message']) for m in messages] == [('user', message), ('bot', 'Hel')]
+    conversation = models.chat_conversations.collection.find_one({'_id': 'c1'})
+    assert conversation['context']['user_email'] == 'bob@example.com'
+    assert bot.state_store.load('c1').context_data['user_email'] == 'bob@example.com'
+
+
+def test_full_stream_ends_with_done(app, models, openai_client):
+    bot = OrbitXChatbot(openai_client, models)
+
+    events = list(bot.process_message_stream('c1', 'hello, could you tell me a little about how your agency works?'))
+
+    assert [e['content'] for e in events if e['type'] == 'token'] == ['Hel', 'lo']
+    assert events[-1]['type'] == 'done' and events[-1]['bot_response'] == 'Hello'
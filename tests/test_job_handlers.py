@@ -0,0 +1,71 @@
+"""Quote notification job handlers"""
+
+import webbrowser
+
+import pytest
+
+
+@pytest.fixture
+def quote_id(models):
+    return models.quote_requests.create_quote_request(
+        client_name='Bob', email='bob@example.com', project_description='A logo for a bakery',
+        services_requested='logo'
+    )
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    urls = []
+    monkeypatch.setattr(webbrowser, 'open', urls.append)
+    return urls
+
+
+def test_chatbot_quote_is_sent_by_sms_in_production(app_module, models, quote_id, monkeypatch, opened):
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    sent = []
+
+    def send_sms_message(message, quote_ids=None):
+        sent.append(message)
+        models.quote_requests.record_notification(quote_ids, 'sms', {'success': True})
+        return True
+
+    monkeypatch.setattr(app_module, 'send_sms_message', send_sms_message)
+    app_module.process_chatbot_quote_job({'quote_id': quote_id, 'priority': 7})
+
+    assert len(sent) == 1 and 'AI Priority: 7/10' in sent[0]
+    assert opened == []
+    assert models.quote_requests.get_by_id(quote_id)['status'] == 'notified'
+
+
+def test_chatbot_quote_sms_failure_in_production_retries_the_job(app_module, models, quote_id, monkeypatch):
+    monkeypatch.setenv('FLASK_ENV', 'production')
+    monkeypatch.setattr(app_module, 'send_sms_message', lambda message, quote_ids=None: False)
+
+    with pytest.raises(RuntimeError):
+        app_module.process_chatbot_quote_job({'quote_id': quote_id})
+    assert models.quote_requests.get_by_id(quote_id)['status'] == 'pending'
+
+
+def test_chatbot_quote_opens_whatsapp_in_development(app_module, models, quote_id, monkeypatch, opened):
+    monkeypatch.setenv('FLASK_ENV', 'development')
+
+    app_module.process_chatbot_quote_job({'quote_id': quote_id})
+
+    assert len(opened) == 1 and opened[0].startswith('https://wa.me/')
+    quote = models.quote_requests.get_by_id(quote_id)
+    assert quote['status'] == 'notified' and quote['notifications'][0]['channel'] == 'whatsapp'
+
+
+def test_handlers_skip_quotes_that_were_already_notified(app_module, models, quote_id, monkeypatch, opened):
+    models.quote_requests.update_one({'_id': quote_id}, {'status': 'notified'})
+    monkeypatch.setattr(app_module, 'send_sms_message', lambda *a, **k: pytest.fail('SMS sent twice'))
+
+    for handler in (app_module.process_quote_whatsapp_job, app_module.process_quote_sms_job,
+                    app_module.process_chatbot_quote_job):
+        handler({'quote_id': quote_id})
+    assert opened == []
+
+
+def test_importing_the_app_starts_no_background_threads(app_module):
+    assert not app_module.job_workers._threads
+    assert app_module.notification_outbox._thread is None
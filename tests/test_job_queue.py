@@ -0,0 +1,85 @@
+"""Job claiming, leases and retries"""
+
+from datetime import datetime, timedelta
+
+from job_queue import JobWorkerPool
+
+
+def make_pool(models, handlers, **kwargs):
+    return JobWorkerPool(models.jobs, handlers, base_backoff=0, max_backoff=0, **kwargs)
+
+
+def job(models, job_id):
+    return models.jobs.collection.find_one({'_id': job_id})
+
+
+def test_completed_job_is_not_claimed_again(models):
+    seen = []
+    pool = make_pool(models, {'ping': seen.append})
+    job_id = models.jobs.enqueue('ping', {'n': 1}, job_id='ping:1')
+
+    assert pool.run_once()
+    assert not pool.run_once()
+    assert seen == [{'n': 1}]
+    assert job(models, job_id)['status'] == 'done'
+
+
+def test_failed_job_is_retried_then_given_up(models):
+    def broken(payload):
+        raise RuntimeError('boom')
+
+    pool = make_pool(models, {'broken': broken})
+    job_id = models.jobs.enqueue('broken', {}, max_attempts=2, job_id='broken:1')
+
+    assert pool.run_once()
+    assert job(models, job_id)['status'] == 'queued'
+    assert pool.run_once()
+    stored = job(models, job_id)
+    assert stored['status'] == 'failed'
+    assert stored['attempts'] == 2
+    assert stored['last_error'] == 'RuntimeError: boom'
+    assert pool.stats() == {'completed': 0, 'retried': 1, 'failed': 1, 'lost_leases': 0, 'workers': 0}
+
+
+def test_expired_lease_is_claimed_by_another_worker(models):
+    job_id = models.jobs.enqueue('ping', {}, job_id='ping:1')
+    assert models.jobs.claim('dead-worker', visibility_timeout=300)['_id'] == job_id
+    assert models.jobs.claim('other-worker', visibility_timeout=300) is None
+
+    # The first worker died; its lease runs out
+    models.jobs.collection.update_one({'_id': job_id},
+                                      {'$set': {'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)}})
+    reclaimed = models.jobs.claim('other-worker', visibility_timeout=300)
+    assert reclaimed['locked_by'] == 'other-worker'
+    assert reclaimed['attempts'] == 2
+
+    # The first worker can no longer settle the job
+    assert not models.jobs.complete(job_id, 'dead-worker')
+    assert models.jobs.complete(job_id, 'other-worker')
+
+
+def test_lost_lease_is_counted_not_completed(models):
+    def slow(payload):
+        # Another worker takes over while this one is still running
+        models.jobs.collection.update_one({'_id': 'ping:1'}, {'$set': {'locked_by': 'other-worker'}})
+
+    pool = make_pool(models, {'ping': slow})
+    models.jobs.enqueue('ping', {}, job_id='ping:1')
+    assert pool.run_once()
+    assert pool.stats()['lost_leases'] == 1
+    assert job(models, 'ping:1')['status'] == 'running'
+
+
+def test_job_id_and_dedupe_key_add_a_job_once(models):
+    assert models.jobs.enqueue('ping', {}, job_id='ping:1') == 'ping:1'
+    assert models.jobs.enqueue('ping', {}, job_id='ping:1') == 'ping:1'
+
+    first = models.jobs.enqueue('digest', {}, dedupe_key='digest')
+    assert models.jobs.enqueue('digest', {}, dedupe_key='digest') == first
+    assert models.jobs.collection.count_documents({}) == 2
+
+
+def test_delayed_job_waits_for_its_run_time(models):
+    pool = make_pool(models, {'ping': lambda payload: None})
+    models.jobs.enqueue('ping', {}, delay=60)
+    assert not pool.run_once()
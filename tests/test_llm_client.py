@@ -0,0 +1,86 @@
+"""Deadlines, retries and the circuit breaker of the LLM guard"""
+
+import asyncio
+import time
+
+import pytest
+
+from llm_client import CircuitBreaker, LLMGuard, LLMUnavailableError
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    return breaker
+
+
+def failing(error):
+    def request(timeout):
+        raise error
+    return request
+
+
+def test_retryable_failures_open_the_breaker():
+    guard = LLMGuard(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(2):
+        with pytest.raises(LLMUnavailableError):
+            guard.call(failing(APIError(503)))
+    assert guard.breaker.state == 'open'
+    assert guard.stats()['retries'] == 2
+
+    with pytest.raises(LLMUnavailableError, match='circuit breaker is open'):
+        guard.call(lambda timeout: 'ok')
+    assert guard.stats()['short_circuited'] == 1
+
+
+def test_rejected_requests_are_not_retried_and_keep_the_breaker_closed():
+    guard = LLMGuard(breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(LLMUnavailableError):
+        guard.call(failing(APIError(400)))
+    assert guard.breaker.state == 'closed'
+    assert guard.stats()['retries'] == 0
+
+
+def test_half_open_trial_answered_with_a_rejection_closes_the_breaker():
+    guard = LLMGuard(breaker=open_breaker())
+    with pytest.raises(LLMUnavailableError):
+        guard.call(failing(APIError(400)))
+    assert guard.breaker.state == 'closed'
+    assert guard.call(lambda timeout: 'ok') == 'ok'
+
+
+def test_calls_past_the_deadline_time_out():
+    guard = LLMGuard(breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(LLMUnavailableError, match='deadline'):
+        guard.call(lambda timeout: time.sleep(0.5), deadline=0.05)
+    assert guard.breaker.state == 'open'
+    assert guard.stats()['timeouts'] == 1
+
+
+def test_cancelled_half_open_trial_lets_the_next_call_through():
+    guard = LLMGuard(breaker=open_breaker())
+
+    async def slow(timeout):
+        await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(guard.acall(slow))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    async def answer(timeout):
+        return 'ok'
+
+    asyncio.run(cancel_trial())
+    assert guard.breaker.state == 'open'
+    assert asyncio.run(guard.acall(answer)) == 'ok'
+    assert guard.breaker.state == 'closed'
@@ -0,0 +1,65 @@
+"""Holding low-priority quote notifications for one digest"""
+
+from notification_digest import DIGEST_JOB_TYPE, MAX_DIGEST_LENGTH, NotificationDigest, build_digest_message
+
+
+def save_quote(models, name):
+    return models.quote_requests.create_quote_request(
+        client_name=name, email=f'{name.lower()}@example.com', project_description='A logo',
+        services_requested='logo'
+    )
+
+
+def test_low_priority_quotes_share_one_digest_job(models):
+    digest = NotificationDigest(models.quote_requests, models.jobs, window=300, immediate_priority=8)
+
+    assert digest.defer(save_quote(models, 'Ann'), 3)
+    assert digest.defer(save_quote(models, 'Bob'), 6)
+    assert not digest.defer(save_quote(models, 'Cat'), 9)
+
+    assert models.jobs.collection.count_documents({'type': DIGEST_JOB_TYPE}) == 1
+
+
+def test_claimed_digest_lists_quotes_by_priority_until_finished(models):
+    digest = NotificationDigest(models.quote_requests, models.jobs)
+    digest.defer(save_quote(models, 'Ann'), 3)
+    digest.defer(save_quote(models, 'Bob'), 6)
+
+    quotes = digest.claim('digest_1')
+    assert [quote['client_name'] for quote in quotes] == ['Bob', 'Ann']
+    # A retried digest job gets the same quotes back
+    assert [quote['id'] for quote in digest.claim('digest_1')] == [quote['id'] for quote in quotes]
+
+    assert digest.finish('digest_1') == 2
+    assert digest.claim('digest_1') == []
+    assert digest.claim('digest_2') == []
+
+
+def test_zero_window_notifies_every_quote_now(models):
+    digest = NotificationDigest(models.quote_requests, models.jobs, window=0)
+    assert not digest.defer(save_quote(models, 'Ann'), 1)
+    assert models.jobs.collection.count_documents({}) == 0
+
+
+def test_long_digest_is_cut_to_one_sms():
+    quotes = [{'client_name': f'Client {index}', 'email': f'c{index}@example.com',
+               'services_requested': 'Logo design', 'digest_priority': 5} for index in range(40)]
+    message = build_digest_message(quotes)
+    assert len(message) <= MAX_DIGEST_LENGTH
+    assert message.startswith('OrbitX QUOTE DIGEST - 40 new quotes')
+    assert 'more in the admin panel' in message
+
+
+def test_digest_job_sends_one_sms_and_marks_quotes(app_module, models, monkeypatch):
+    digest = NotificationDigest(models.quote_requests, models.jobs)
+    monkeypatch.setattr(app_module, 'quote_digest', digest)
+    for name in ('Ann', 'Bob'):
+        digest.defer(save_quote(models, name), 4)
+    sent = []
+    monkeypatch.setattr(app_module, 'send_sms_message',
+                        lambda message, quote_ids=None: sent.append((message, quote_ids)) or True)
+
+    app_module.process_quote_digest_job({'digest_id': 'digest_1'})
+
+    assert len(sent) == 1 and len(sent[0][1]) == 2
+    assert models.quote_requests.collection.count_documents({'notification_digest': 'sent'}) == 2
@@ -0,0 +1,47 @@
+"""Relaying quote notifications from the outbox to the job queue"""
+
+from notification_outbox import NotificationOutbox, notification_job_id
+
+
+def save_quote(models, name='Ann'):
+    return models.quote_requests.insert_quote_request(
+        client_name=name, email=f'{name.lower()}@example.com', project_description='A logo',
+        notification='quote_notification', notification_payload={'source': 'form'}
+    )
+
+
+def test_pending_entries_become_jobs_once(models):
+    outbox = NotificationOutbox(models.quote_requests, models.jobs)
+    quote = save_quote(models)
+
+    assert outbox.relay_batch() == 1
+    assert outbox.relay_batch() == 0
+
+    job = models.jobs.collection.find_one({'_id': notification_job_id('quote_notification', quote['_id'])})
+    assert job['payload'] == {'quote_id': str(quote['_id']), 'source': 'form'}
+    stored = models.quote_requests.collection.find_one({'_id': quote['_id']})
+    assert stored['notification']['status'] == 'sent'
+    assert outbox.stats()['relayed'] == 1
+
+
+def test_relay_that_crashed_before_marking_does_not_queue_twice(models, monkeypatch):
+    outbox = NotificationOutbox(models.quote_requests, models.jobs)
+    save_quote(models)
+
+    # A previous relay queued the job and died before marking the entry sent
+    with monkeypatch.context() as patch:
+        patch.setattr(models.quote_requests, 'mark_notifications_sent', lambda quote_ids: 0)
+        outbox.relay_batch()
+
+    assert outbox.relay_batch() == 1
+    assert models.jobs.collection.count_documents({}) == 1
+
+
+def test_relay_drains_in_batches(models):
+    outbox = NotificationOutbox(models.quote_requests, models.jobs, batch_size=2)
+    for name in ('Ann', 'Bob', 'Cat'):
+        save_quote(models, name)
+
+    assert outbox.relay_batch() == 2
+    assert outbox.relay_batch() == 1
+    assert models.jobs.collection.count_documents({}) == 3
@@ -0,0 +1,73 @@
+"""Bulk processing of the pending quote backlog"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from process_quote_backlog import BacklogProcessor
+
+
+class FakeSMS:
+    """Stands in for AIEnhancedSMS; sends to clients in ``failing`` fail"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def analyze_quote_with_ai(self, quote):
+        return {'priority': 5, 'estimated_value': 'Rs 5,000', 'strategy': 'Standard response'}
+
+    def generate_sms_message(self, quote, analysis):
+        return quote['client_name']
+
+    async def send_sms(self, message):
+        self.sent.append(message)
+        return {'success': message not in self.failing, 'error': 'undelivered'}
+
+
+@pytest.fixture
+def add_quote(models):
+    created_at = datetime.utcnow() - timedelta(hours=1)
+
+    def add(client_name, **fields):
+        return models.quote_requests.collection.insert_one({
+            'client_name': client_name, 'email': f'{client_name}@example.com',
+            'status': 'pending', 'created_at': created_at, **fields
+        }).inserted_id
+    return add
+
+
+def run(models, db, sms):
+    processor = BacklogProcessor(models.quote_requests, models.jobs, db['backlog_checkpoints'], 'test',
+                                 mode='individual', chunk_size=2)
+    processor.sms = sms
+    return asyncio.run(processor.run())
+
+
+def test_failed_quotes_are_retried_by_the_next_run(models, db, add_quote):
+    for name in ('a', 'b', 'c'):
+        add_quote(name)
+
+    first = FakeSMS(failing={'b'})
+    assert run(models, db, first)['failed'] == 1
+    assert db['backlog_checkpoints'].count_documents({}) == 0
+
+    second = FakeSMS()
+    run(models, db, second)
+    assert second.sent == ['b']
+    assert models.quote_requests.collection.count_documents({'status': 'pending'}) == 0
+
+
+def test_quotes_owned_by_the_live_pipeline_are_skipped(models, db, add_quote):
+    add_quote('outbox', notification={'status': 'pending'})
+    add_quote('held', notification_digest='pending')
+    queued = add_quote('queued')
+    models.jobs.enqueue('quote_sms', {'quote_id': str(queued)})
+    add_quote('free')
+
+    sms = FakeSMS()
+    totals = run(models, db, sms)
+
+    assert sms.sent == ['free']
+    assert totals['skipped'] == 1
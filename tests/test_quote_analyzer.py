@@ -0,0 +1,89 @@
+"""Batched quote analysis"""
+
+import json
+from concurrent.futures import wait
+from types import SimpleNamespace
+
+from llm_client import LLMGuard
+from quote_analyzer import QuoteAnalysisEngine, is_fallback
+
+
+class FakeAsyncCompletions:
+    """JSON-mode completions scoring every quote in the prompt, except ``skip`` on its first call"""
+
+    def __init__(self, skip=(), fail=False):
+        self.skip = set(skip)
+        self.fail = fail
+        self.prompts = []
+
+    async def create(self, **kwargs):
+        if self.fail:
+            raise RuntimeError('model down')
+        quotes = json.loads(kwargs['messages'][0]['content'].split('Quotes:\n', 1)[1])
+        self.prompts.append(quotes)
+        results = [{'id': quote['id'], 'priority': 7, 'estimated_value': 'Rs 10,000-20,000'}
+                   for quote in quotes
+                   if not (quote['client'] in self.skip and len(self.prompts) == 1)]
+        content = json.dumps({'results': results})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def engine_with(completions, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    engine = QuoteAnalysisEngine(client, max_wait=0.05, **kwargs)
+    # Failures here must not trip the process-wide breaker
+    engine.llm_guard = LLMGuard()
+    return engine
+
+
+def quote(name):
+    return {'client_name': name, 'services_requested': 'logo', 'project_description': 'A logo'}
+
+
+def analyze_all(engine, quotes):
+    futures = [engine.submit(data) for data in quotes]
+    wait(futures, timeout=5)
+    return [future.result() for future in futures]
+
+
+def test_quotes_submitted_together_share_one_prompt():
+    completions = FakeAsyncCompletions()
+    engine = engine_with(completions)
+
+    results = analyze_all(engine, [quote('Ann'), quote('Bob'), quote('Cat')])
+
+    assert [result['priority'] for result in results] == [7, 7, 7]
+    assert len(completions.prompts) == 1 and len(completions.prompts[0]) == 3
+    assert engine.stats()['batches'] == 1
+
+
+def test_repeated_quote_is_answered_from_the_cache():
+    completions = FakeAsyncCompletions()
+    engine = engine_with(completions)
+
+    first = engine.analyze_sync(quote('Ann'))
+    again = engine.analyze_sync({**quote('ANN'), 'project_description': '  a   logo '})
+
+    assert again == first
+    assert len(completions.prompts) == 1
+    assert engine.stats()['cache_hits'] == 1
+
+
+def test_quote_missing_from_a_batch_is_retried_alone():
+    completions = FakeAsyncCompletions(skip={'Bob'})
+    engine = engine_with(completions)
+
+    results = analyze_all(engine, [quote('Ann'), quote('Bob')])
+
+    assert not any(is_fallback(result) for result in results)
+    assert [len(prompt) for prompt in completions.prompts] == [2, 1]
+    assert completions.prompts[1][0]['client'] == 'Bob'
+
+
+def test_failed_batch_falls_back_and_is_not_cached():
+    completions = FakeAsyncCompletions(fail=True)
+    engine = engine_with(completions)
+
+    assert is_fallback(engine.analyze_sync(quote('Ann')))
+    completions.fail = False
+    assert not is_fallback(engine.analyze_sync(quote('Ann')))
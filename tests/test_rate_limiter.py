@@ -0,0 +1,46 @@
+import threading
+
+import rate_limiter
+from rate_limiter import LLMAdmission, LocalTokenBuckets, RateLimiter
+
+
+def make_limiter(**limits):
+    return RateLimiter(LocalTokenBuckets(), limits)
+
+
+def test_bucket_allows_burst_then_waits():
+    buckets = LocalTokenBuckets()
+    assert buckets.take('k', rate=1.0, burst=2) == 0
+    assert buckets.take('k', rate=1.0, burst=2) == 0
+    assert buckets.take('k', rate=1.0, burst=2) > 0
+
+
+def test_rejection_by_one_scope_spends_nothing_from_the_others():
+    limiter = make_limiter(conversation=(0.001, 2), ip=(0.001, 1))
+
+    assert limiter.check(conversation='c1', ip='1.1.1.1') == 0
+    # The IP bucket is empty; the conversation token must come back
+    assert limiter.check(conversation='c1', ip='1.1.1.1') > 0
+    assert limiter.check(conversation='c1', ip='2.2.2.2') == 0
+    assert limiter.check(conversation='c1', ip='3.3.3.3') > 0
+
+
+def test_admission_rejects_after_queue_timeout():
+    admission = LLMAdmission(max_concurrent=1, queue_timeout=0.01)
+    assert admission.acquire()
+    assert not admission.acquire()
+    admission.release()
+    assert admission.acquire()
+    admission.release()
+    assert admission.stats()['rejected'] == 1
+
+
+def test_admission_cap_is_split_between_workers(monkeypatch):
+    monkeypatch.delenv('CHATBOT_RATE_LIMIT_REDIS_URL', raising=False)
+    monkeypatch.delenv('CHATBOT_STATE_REDIS_URL', raising=False)
+    monkeypatch.setenv('CHATBOT_MAX_CONCURRENT_LLM_CALLS', '8')
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+    assert rate_limiter.build_llm_admission().max_concurrent == 2
+
+    monkeypatch.setenv('WEB_CONCURRENCY', '16')
+    assert rate_limiter.build_llm_admission().max_concurrent == 1
@@ -0,0 +1,58 @@
+"""Twilio dispatcher retries"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from sms_dispatcher import SMSDispatcher
+
+
+def dispatcher_with(handler):
+    dispatcher = SMSDispatcher('AC123', 'token', '+15550000000', messages_per_second=1000,
+                               burst=10, retry_backoff=0)
+    calls = []
+
+    def counting(request):
+        calls.append(request)
+        return handler(len(calls))
+
+    async def open_session():
+        dispatcher._session = httpx.AsyncClient(transport=httpx.MockTransport(counting))
+        dispatcher._slots = asyncio.Semaphore(dispatcher.max_concurrent)
+
+    asyncio.run_coroutine_threadsafe(open_session(), dispatcher._loop).result()
+    return dispatcher, calls
+
+
+def raise_error(error):
+    def handler(attempt):
+        raise error('boom')
+    return handler
+
+
+def test_connect_errors_are_retried():
+    dispatcher, calls = dispatcher_with(raise_error(httpx.ConnectError))
+    result = dispatcher.send('hi', to='+15551111111')
+    assert not result['success']
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize('error', [httpx.ReadTimeout, httpx.RemoteProtocolError])
+def test_errors_after_sending_are_not_retried(error):
+    dispatcher, calls = dispatcher_with(raise_error(error))
+    result = dispatcher.send('hi', to='+15551111111')
+    assert not result['success']
+    assert len(calls) == 1
+
+
+def test_server_errors_are_retried_until_accepted():
+    def handler(attempt):
+        if attempt == 1:
+            return httpx.Response(503, json={'message': 'busy'})
+        return httpx.Response(201, json={'sid': 'SM1', 'status': 'queued'})
+
+    dispatcher, calls = dispatcher_with(handler)
+    result = dispatcher.send('hi', to='+15551111111')
+    assert result['success'] and result['message_sid'] == 'SM1'
+    assert len(calls) == 2
@@ -7,84 +7,29 @@ Much more reliable than WhatsApp Web automation
 import os
 import asyncio
 from dotenv import load_dotenv
-import openai
-from twilio.rest import Client
+from quote_analyzer import get_analysis_engine
+from sms_dispatcher import get_sms_dispatcher
 
 # Load environment
 load_dotenv()
 
 class AIEnhancedSMS:
-    def __init__(self):
+    def __init__(self, quote_requests=None):
         # Twilio configuration
         self.twilio_account_sid = os.getenv('TWILIO_ACCOUNT_SID')
         self.twilio_auth_token = os.getenv('TWILIO_AUTH_TOKEN')
         self.twilio_phone_number = os.getenv('TWILIO_PHONE_NUMBER')  # Your Twilio number
         self.target_phone_number = os.getenv('TARGET_PHONE_NUMBER', '+919518536672')  # Your phone
 
-        # OpenAI configuration
-        self.openai_api_key = os.getenv('OPENAI_API_KEY')
+        # Optional QuoteRequestModel to record send outcomes on
+        self.quote_requests = quote_requests
 
-        # Initialize clients
-        if self.twilio_account_sid and self.twilio_auth_token:
-            self.twilio_client = Client(self.twilio_account_sid, self.twilio_auth_token)
-        else:
-            self.twilio_client = None
-
-        if self.openai_api_key:
-            self.openai_client = openai.AsyncOpenAI(api_key=self.openai_api_key)
-        else:
-            self.openai_client = None
+        # Initialize clients; SMS go through the shared dispatcher
+        self.sms_dispatcher = get_sms_dispatcher()
 
     async def analyze_quote_with_ai(self, quote_data):
         """Analyze quote with OpenAI for priority and value estimation"""
-        if not self.openai_client:
-            return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
-
-        try:
-            prompt = f"""Analyze this design quote briefly:
-            Client: {quote_data.get('client_name')}
-            Service: {quote_data.get('services_requested')}
-            Budget: {quote_data.get('budget_range', 'Not specified')}
-            Description: {quote_data.get('project_description', '')[:200]}
-
-            Provide priority (1-10) and estimated value in rupees in this format:
-            Priority: X/10
-            Value: Rs X,XXX-X,XXX"""
-
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=100
-            )
-
-            result = response.choices[0].message.content
-
-            # Extract priority and value
-            priority = 5
-            value = "Rs 5,000-15,000"
-
-            lines = result.split('\n')
-            for line in lines:
-                if 'Priority:' in line or 'priority:' in line.lower():
-                    try:
-                        priority = int(line.split(':')[1].split('/')[0].strip())
-                    except:
-                        pass
-                if 'Value:' in line or 'value:' in line.lower():
-                    try:
-                        value = line.split(':')[1].strip()
-                    except:
-                        pass
-
-            return {
-                "priority": priority,
-                "estimated_value": value,
-                "strategy": "AI-analyzed response"
-            }
-
-        except Exception as e:
-            print(f"AI analysis error: {e}")
-            return {"priority": 5, "estimated_value": "Rs 5,000-15,000", "strategy": "Standard response"}
+        return await get_analysis_engine().analyze(quote_data)
 
     def generate_sms_message(self, quote_data, analysis):
         """Generate enhanced SMS message with AI insights"""
@@ -110,45 +55,36 @@ Action: Send quote to {quote_data.get('email')}"""
 
         return message
 
-    def send_sms(self, message):
+    async def send_sms(self, message, quote_id=None):
         """Send SMS via Twilio"""
-        if not self.twilio_client:
+        if not self.sms_dispatcher:
             return {
                 "success": False,
                 "error": "Twilio not configured"
             }
 
-        try:
-            # Twilio SMS
-            sms = self.twilio_client.messages.create(
-                body=message,
-                from_=self.twilio_phone_number,
-                to=self.target_phone_number
-            )
-
-            return {
-                "success": True,
-                "message_sid": sms.sid,
-                "status": sms.status
-            }
-
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e)
-            }
+        result = await self.sms_dispatcher.asend(message, to=self.target_phone_number)
+        if quote_id and self.quote_requests is not None:
+            try:
+                self.quote_requests.record_notification([quote_id], 'sms', result)
+            except Exception as e:
+                print(f"Failed to record SMS outcome: {e}")
+        return result
 
     async def process_quote_request(self, quote_data):
         """Complete process: analyze + generate + send SMS"""
         try:
-            print("Analyzing quote with AI...")
-            analysis = await self.analyze_quote_with_ai(quote_data)
+            # Quotes from the app carry their stored analysis
+            analysis = quote_data.get('ai_analysis')
+            if not analysis:
+                print("Analyzing quote with AI...")
+                analysis = await self.analyze_quote_with_ai(quote_data)
 
             print("Generating enhanced SMS message...")
             message = self.generate_sms_message(quote_data, analysis)
 
             print("Sending SMS...")
-            sms_result = self.send_sms(message)
+            sms_result = await self.send_sms(message, quote_id=quote_data.get('id'))
 
             return {
                 "success": sms_result["success"],
@@ -8,15 +8,20 @@ import asyncio
 import json
 import logging
 import os
+import sys
 from typing import Any, Dict, List, Optional
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
-from mcp.types import Resource, Tool, TextContent
-import httpx
-import openai
-from datetime import datetime
+from mcp.types import Tool, TextContent
 from dotenv import load_dotenv
 
+# MCP clients start this server as a standalone script from this directory, so
+# the shared quote analysis engine and digest helpers at the repository root
+# are only importable once the root is on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from notification_digest import build_digest_message
+from quote_analyzer import get_analysis_engine, is_fallback, quote_content_hash
+
 # Load environment variables
 load_dotenv()
 
@@ -24,8 +29,11 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-openai_client = None
+# Quote requests collection for stored AI analyses, set when MONGODB_URI is configured
+quote_requests = None
+
+# Quotes analyzed at once by process_quote_batch
+BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", 10))
 
 class WhatsAppMCPServer:
     def __init__(self):
@@ -44,6 +52,7 @@ class WhatsAppMCPServer:
                     inputSchema={
                         "type": "object",
                         "properties": {
+                            "quote_id": {"type": "string"},
                             "client_name": {"type": "string"},
                             "email": {"type": "string"},
                             "phone": {"type": "string"},
@@ -57,6 +66,25 @@ class WhatsAppMCPServer:
                         "required": ["client_name", "email", "services_requested", "project_description"]
                     }
                 ),
+                Tool(
+                    name="process_quote_batch",
+                    description="Analyze many quote requests concurrently and open one WhatsApp digest of the batch",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "quotes": {
+                                "type": "array",
+                                "items": {"type": "object"},
+                                "description": "Quote requests with the same fields as process_quote_request"
+                            },
+                            "send_digest": {
+                                "type": "boolean",
+                                "description": "Open a WhatsApp digest listing the batch by priority (default true)"
+                            }
+                        },
+                        "required": ["quotes"]
+                    }
+                ),
                 Tool(
                     name="send_whatsapp_message",
                     description="Send a WhatsApp message to specified number",
@@ -88,6 +116,8 @@ class WhatsAppMCPServer:
 
             if name == "process_quote_request":
                 return await self.process_quote_request(arguments)
+            elif name == "process_quote_batch":
+                return await self.process_quote_batch(arguments)
             elif name == "send_whatsapp_message":
                 return await self.send_whatsapp_message(arguments)
             elif name == "analyze_quote_priority":
@@ -98,8 +128,8 @@ class WhatsAppMCPServer:
     async def process_quote_request(self, quote_data: Dict[str, Any]) -> List[TextContent]:
         """Process quote request with OpenAI and send WhatsApp"""
         try:
-            # Step 1: Analyze quote with OpenAI
-            analysis = await self.analyze_with_openai(quote_data)
+            # Step 1: Stored analysis, or analyze quote with OpenAI
+            analysis = await self.get_analysis(quote_data)
 
             # Step 2: Generate WhatsApp message
             whatsapp_message = await self.generate_whatsapp_message(quote_data, analysis)
@@ -119,58 +149,115 @@ class WhatsAppMCPServer:
                 text=f"❌ Error processing quote: {str(e)}"
             )]
 
-    async def analyze_with_openai(self, quote_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze quote using OpenAI GPT-4"""
-        try:
-            global openai_client
-            if not openai_client:
-                return {"priority": 5, "estimated_value": "TBD", "strategy": "Standard response"}
-
-            prompt = f"""
-            Analyze this design quote request and provide:
-            1. Priority score (1-10, where 10 is highest priority)
-            2. Estimated project value in ₹
-            3. Response strategy
-            4. Urgency level
-
-            Quote Details:
-            - Client: {quote_data.get('client_name')}
-            - Service: {quote_data.get('services_requested')}
-            - Budget: {quote_data.get('budget_range', 'Not specified')}
-            - Timeline: {quote_data.get('timeline', 'Not specified')}
-            - Description: {quote_data.get('project_description')}
-
-            Respond in JSON format:
-            {{
-                "priority": number,
-                "estimated_value": "₹X,XXX - ₹X,XXX",
-                "strategy": "response approach",
-                "urgency": "low/medium/high"
-            }}
-            """
-
-            response = await openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[{"role": "user", "content": prompt}],
-                response_format={"type": "json_object"},
-                max_tokens=500
+    async def process_quote_batch(self, args: Dict[str, Any]) -> List[TextContent]:
+        """Analyze a batch of quotes concurrently
+
+        Each quote's result is sent as an MCP progress notification as soon
+        as its analysis finishes (when the client asked for progress), and
+        the full list is returned at the end.
+        """
+        quotes = args.get("quotes") or []
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        report_progress = self.progress_reporter()
+
+        async def analyze(index: int, quote_data: Dict[str, Any]):
+            async with semaphore:
+                try:
+                    return index, quote_data, await self.get_analysis(quote_data), None
+                except Exception as e:
+                    return index, quote_data, None, str(e)
+
+        results = []
+        contents = []
+        for finished in asyncio.as_completed([analyze(index, quote) for index, quote in enumerate(quotes, 1)]):
+            index, quote_data, analysis, error = await finished
+            if error:
+                logger.error(f"Error analyzing quote {index}: {error}")
+                text = f"❌ Quote {index} ({quote_data.get('client_name')}): {error}"
+            else:
+                results.append({**quote_data, "digest_priority": analysis.get("priority", 5)})
+                text = (f"✅ Quote {index} - {quote_data.get('client_name')}: Priority {analysis.get('priority', 'N/A')}/10, "
+                        f"Est. Value {analysis.get('estimated_value', 'N/A')}")
+            contents.append(TextContent(type="text", text=text))
+            if report_progress:
+                await report_progress(len(contents), len(quotes), text)
+
+        summary = f"Processed {len(results)} of {len(quotes)} quotes"
+        if results and args.get("send_digest", True):
+            results.sort(key=lambda quote: -quote["digest_priority"])
+            status = await self.send_to_whatsapp(
+                os.getenv("TARGET_WHATSAPP_NUMBER", "919518536672"), build_digest_message(results)
             )
+            summary += f"\nWhatsApp digest: {status}"
+        contents.append(TextContent(type="text", text=summary))
+        return contents
 
-            return json.loads(response.choices[0].message.content)
+    def progress_reporter(self):
+        """Progress notifier for the current tool call, or None if the client sent no progress token"""
+        try:
+            context = self.server.request_context
+        except LookupError:
+            return None
+        token = context.meta.progressToken if context.meta else None
+        if token is None:
+            return None
+
+        async def report(progress: int, total: int, message: str):
+            try:
+                await context.session.send_progress_notification(
+                    token, progress, total=total, message=message, related_request_id=context.request_id
+                )
+            except Exception as e:
+                logger.error(f"Progress notification failed: {e}")
+        return report
+
+    async def get_analysis(self, quote_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analysis stored by the app for this quote, or a fresh OpenAI analysis"""
+        if quote_data.get('ai_analysis'):
+            return quote_data['ai_analysis']
+
+        if quote_requests is not None:
+            try:
+                stored = await asyncio.to_thread(self.find_stored_analysis, quote_data)
+                if stored:
+                    return stored
+            except Exception as e:
+                logger.error(f"Stored analysis lookup failed: {e}")
 
-        except Exception as e:
-            logger.error(f"OpenAI analysis error: {e}")
-            return {"priority": 5, "estimated_value": "TBD", "strategy": "Standard response"}
+        analysis = await self.analyze_with_openai(quote_data)
+
+        if quote_requests is not None and quote_data.get('quote_id') and not is_fallback(analysis):
+            try:
+                await asyncio.to_thread(
+                    quote_requests.save_analysis, quote_data['quote_id'], analysis, quote_content_hash(quote_data)
+                )
+            except Exception as e:
+                logger.error(f"Failed to store quote analysis: {e}")
+        return analysis
+
+    def find_stored_analysis(self, quote_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Look up the analysis by quote id, then by the hash of the quote's content"""
+        if quote_data.get('quote_id'):
+            quote = quote_requests.get_by_id(quote_data['quote_id'])
+            if quote and quote.get('ai_analysis'):
+                return quote['ai_analysis']
+        return quote_requests.find_analysis_by_hash(quote_content_hash(quote_data))
+
+    async def analyze_with_openai(self, quote_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze quote using the shared analysis engine"""
+        return await get_analysis_engine().analyze(quote_data)
 
     async def generate_whatsapp_message(self, quote_data: Dict[str, Any], analysis: Dict[str, Any]) -> str:
         """Generate personalized WhatsApp message"""
 
-        # Get urgency emoji
+        # Get urgency emoji, from the priority when the analysis has no urgency
+        priority = analysis.get("priority", 5)
+        urgency = analysis.get("urgency") or ("high" if priority >= 8 else "medium" if priority >= 6 else "low")
         urgency_emoji = {
             "high": "🔥",
             "medium": "⭐",
             "low": "📝"
-        }.get(analysis.get("urgency", "medium"), "📝")
+        }.get(urgency, "📝")
 
         message = f"""{urgency_emoji} NEW QUOTE REQUEST - OrbitX
 
@@ -210,11 +297,8 @@ class WhatsAppMCPServer:
 
             logger.info(f"Opening WhatsApp for {phone_number}: {message[:100]}...")
 
-            # Open WhatsApp Web automatically
-            webbrowser.open(whatsapp_url)
-
-            # Wait a moment for the browser to open
-            await asyncio.sleep(2)
+            # Open WhatsApp Web without blocking the event loop
+            await asyncio.to_thread(webbrowser.open, whatsapp_url)
 
             return f"✅ WhatsApp opened successfully! URL: {whatsapp_url[:100]}..."
 
@@ -237,7 +321,7 @@ class WhatsAppMCPServer:
     async def analyze_quote_priority(self, args: Dict[str, Any]) -> List[TextContent]:
         """Tool handler for quote analysis"""
         quote_data = args.get("quote_data", {})
-        analysis = await self.analyze_with_openai(quote_data)
+        analysis = await self.get_analysis(quote_data)
 
         return [TextContent(
             type="text",
@@ -246,20 +330,28 @@ class WhatsAppMCPServer:
 
 async def main():
     """Main server entry point"""
-    global openai_client
-
-    # Initialize OpenAI client with API key from environment
-    try:
-        api_key = os.getenv("OPENAI_API_KEY")
-        if api_key and api_key.startswith("sk-"):
-            openai_client = openai.AsyncOpenAI(api_key=api_key)
-            logger.info("✅ OpenAI client initialized successfully")
-            logger.info(f"🔑 API Key: {api_key[:10]}...{api_key[-5:]}")
-        else:
-            logger.warning("❌ OPENAI_API_KEY not found or invalid - AI analysis will be disabled")
-            logger.info("💡 Make sure your .env file contains: OPENAI_API_KEY=sk-proj-...")
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI client: {e}")
+
+    # Quote analysis goes through the engine shared with the app
+    api_key = os.getenv("OPENAI_API_KEY")
+    if api_key and api_key.startswith("sk-"):
+        logger.info("✅ OpenAI analysis enabled")
+        logger.info(f"🔑 API Key: {api_key[:10]}...{api_key[-5:]}")
+    else:
+        logger.warning("❌ OPENAI_API_KEY not found or invalid - AI analysis will be disabled")
+        logger.info("💡 Make sure your .env file contains: OPENAI_API_KEY=sk-proj-...")
+    get_analysis_engine()
+
+    # Connect to the app database so stored quote analyses are reused
+    global quote_requests
+    mongodb_uri = os.getenv("MONGODB_URI")
+    if mongodb_uri:
+        try:
+            from pymongo import MongoClient
+            from models_mongodb import QuoteRequestModel
+            quote_requests = QuoteRequestModel(MongoClient(mongodb_uri).get_default_database())
+            logger.info("✅ Connected to MongoDB for stored quote analyses")
+        except Exception as e:
+            logger.error(f"MongoDB unavailable, quotes will be analyzed with OpenAI: {e}")
 
     # Create and run MCP server
     whatsapp_server = WhatsAppMCPServer()
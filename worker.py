@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+OrbitX background job worker
+
+Relays the quote notification outbox and processes the jobs queue
+outside the web workers. Run alongside the web app with
+JOB_WORKERS_IN_PROCESS=false:
+
+    JOB_WORKERS_IN_PROCESS=false gunicorn --config gunicorn.conf.py app:app
+    python worker.py
+"""
+
+import signal
+import threading
+
+# Importing the app starts no background threads; this process starts the pool itself
+from app import app, job_workers, notification_outbox
+
+
+def main():
+    stopping = threading.Event()
+
+    def shutdown(signum, frame):
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    notification_outbox.start()
+    job_workers.start()
+    app.logger.info(f"Job worker running with {job_workers.concurrency} threads")
+    stopping.wait()
+
+    app.logger.info("Job worker stopping, finishing running jobs")
+    notification_outbox.stop()
+    job_workers.stop()
+
+
+if __name__ == '__main__':
+    main()